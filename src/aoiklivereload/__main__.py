@@ -0,0 +1,202 @@
+# coding: utf-8
+"""
+Command line entry point that runs a program under the supervisor, without \
+modifying the program.
+
+Run:
+```
+python -m aoiklivereload [options] -- script.py args
+python -m aoiklivereload [options] -- -m module args
+```
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import argparse
+import logging
+import sys
+
+# Local imports
+from .aoiklivereload import LiveReloader
+from .supervisor import Supervisor
+
+
+def main(args=None):
+    """
+    Main function.
+
+    :param args:
+        Command line arguments list. Default is `sys.argv[1:]`.
+
+    :return:
+        Exit code.
+    """
+    # Create arguments parser
+    parser = argparse.ArgumentParser(
+        prog='python -m aoiklivereload',
+        usage='%(prog)s [options] -- script.py args',
+        description='Run a program, and restart it on module file changes.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--backend',
+        choices=LiveReloader.BACKEND_VALUES,
+        default=None,
+        help='File system event backend. '
+        'Default is watchdog if installed, otherwise inotify.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--watch-mode',
+        choices=LiveReloader.WATCH_MODE_VALUES,
+        default=LiveReloader.WATCH_MODE_V_PRECISE,
+        help='Watch mode. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--relevance-mode',
+        choices=LiveReloader.RELEVANCE_MODE_VALUES,
+        default=LiveReloader.RELEVANCE_MODE_V_DIRECTORY,
+        help='Which changed files restart the program. `module` restarts '
+        'only on its loaded module files and new files in its packages. '
+        'Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--include',
+        action='append',
+        default=None,
+        help='Glob pattern of paths to watch. Can be repeated.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=None,
+        help='Glob pattern of paths not to watch. Can be repeated.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--watch-system',
+        action='store_true',
+        help='Watch the standard library and site packages too.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--extra-path',
+        action='append',
+        default=None,
+        help='Extra file path to watch. Can be repeated.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1,
+        help='Interval in seconds between two change checks. '
+        'Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--debounce-interval',
+        type=float,
+        default=0.1,
+        help='Quiet window in seconds after the last file change before '
+        'restarting. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--verify-content',
+        action='store_true',
+        help='Restart only if module file content has changed.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--daemon-socket',
+        default=None,
+        help='Watcher daemon socket path, in daemon backend.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--stop-timeout',
+        type=float,
+        default=5,
+        help='Time in seconds to wait for the program to exit after '
+        'SIGTERM before killing it. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        'command',
+        nargs=argparse.REMAINDER,
+        help='Program script path or `-m module`, and its arguments.',
+    )
+
+    # Parse arguments
+    parsed_args = parser.parse_args(args)
+
+    # Get program arguments
+    cmd_args = parsed_args.command
+
+    # If the arguments start with the separator
+    if cmd_args and cmd_args[0] == '--':
+        # Remove the separator
+        cmd_args = cmd_args[1:]
+
+    # If not have program, or `-m` has no module name
+    if not cmd_args or (cmd_args[0] == '-m' and len(cmd_args) < 2):
+        # Print usage and exit
+        parser.error('Program script path or `-m module` is required.')
+
+    # If is in Windows
+    if sys.platform == 'win32':
+        # Print error
+        sys.stderr.write(
+            'Supervisor is not supported on {}.\n'.format(sys.platform)
+        )
+
+        # Return error code
+        return 1
+
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO, format='aoiklivereload: %(message)s'
+    )
+
+    # Create supervisor
+    supervisor = Supervisor(
+        cmd_args=cmd_args,
+        stop_timeout=parsed_args.stop_timeout,
+        backend=parsed_args.backend,
+        watch_mode=parsed_args.watch_mode,
+        relevance_mode=parsed_args.relevance_mode,
+        include=parsed_args.include,
+        exclude=parsed_args.exclude,
+        exclude_system=not parsed_args.watch_system,
+        extra_paths=parsed_args.extra_path,
+        interval=parsed_args.interval,
+        debounce_interval=parsed_args.debounce_interval,
+        verify_content=parsed_args.verify_content,
+        daemon_socket_path=parsed_args.daemon_socket,
+    )
+
+    # Run the program until interrupted, and return its exit code
+    return supervisor.run()
+
+
+# If is run as main module
+if __name__ == '__main__':
+    # Call main function
+    sys.exit(main())
@@ -0,0 +1,701 @@
+# coding: utf-8
+"""
+Pre-reload hooks for common servers, used with \
+`LiveReloader.add_pre_reload_hook`.
+
+Each hook stops accepting new requests, and waits for in-flight requests to \
+finish within the given time, so that they are not cut off by the reload.
+
+Usage:
+```
+reloader.add_pre_reload_hook(TornadoDrainHook(http_server))
+
+reloader.add_pre_reload_hook(flush_logs)
+```
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import logging
+import sys
+import threading
+import time
+
+
+__all__ = (
+    'SanicDrainHook',
+    'TornadoDrainHook',
+    'WSGIDrainMiddleware',
+    'flush_logs',
+)
+
+
+def flush_logs(timeout):
+    """
+    Pre-reload hook that flushes logging handlers, `sys.stdout` and \
+    `sys.stderr`, so that buffered output is not lost when the current \
+    process is replaced.
+
+    :param timeout:
+        Remaining drain time in seconds. Not used.
+
+    :return:
+        None.
+    """
+    # Get loggers
+    loggers = [logging.getLogger()] + [
+        x for x in list(logging.Logger.manager.loggerDict.values())
+        if isinstance(x, logging.Logger)
+    ]
+
+    # For each logger
+    for logger in loggers:
+        # For each handler
+        for handler in list(logger.handlers):
+            try:
+                # Flush the handler
+                handler.flush()
+
+            # If have error, e.g. the stream is closed
+            except Exception:  # pylint: disable=broad-except
+                # Ignore
+                pass
+
+    # For each standard stream
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            # Flush the stream
+            stream.flush()
+
+        # If have error, e.g. the stream is closed
+        except Exception:  # pylint: disable=broad-except
+            # Ignore
+            pass
+
+
+class _RequestCounter(object):
+    """
+    Thread-safe counter of in-flight requests.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+            None.
+        """
+        # Condition for the count
+        self._condition = threading.Condition()
+
+        # Number of in-flight requests
+        self._count = 0
+
+    def increment(self):
+        """
+        Increment the count when a request starts.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._condition:
+            # Increment the count
+            self._count += 1
+
+    def decrement(self):
+        """
+        Decrement the count when a request finishes.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._condition:
+            # Decrement the count
+            self._count -= 1
+
+            # If not have in-flight requests
+            if self._count <= 0:
+                # Wake up waiters
+                self._condition.notify_all()
+
+    def wait_zero(self, timeout):
+        """
+        Wait until not have in-flight requests.
+
+        :param timeout:
+            Time to wait in seconds.
+
+        :return:
+            Whether not have in-flight requests.
+        """
+        # Get deadline
+        deadline = time.time() + timeout
+
+        # With the lock
+        with self._condition:
+            # While have in-flight requests
+            while self._count > 0:
+                # Get remaining time
+                remaining_time = deadline - time.time()
+
+                # If timed out
+                if remaining_time <= 0:
+                    # Return not drained
+                    return False
+
+                # Wait for requests to finish
+                self._condition.wait(remaining_time)
+
+            # Return drained
+            return True
+
+
+class TornadoDrainHook(object):
+    """
+    Pre-reload hook that drains a Tornado `HTTPServer`.
+
+    The hook stops the server from accepting connections, then waits for \
+    in-flight requests to finish. Idle keep-alive connections are not \
+    waited for.
+
+    Must be created before the server handles requests. The server's \
+    request callback must be an `HTTPServerConnectionDelegate`, e.g. a \
+    `tornado.web.Application`.
+    """
+
+    def __init__(self, http_server, io_loop=None):
+        """
+        Constructor.
+
+        :param http_server:
+            `tornado.httpserver.HTTPServer` object.
+
+        :param io_loop:
+            IOLoop the server runs on. Default is the current IOLoop.
+
+        :return:
+            None.
+        """
+        # External imports
+        import tornado.httputil
+        import tornado.ioloop
+
+        # If the request callback is not a delegate
+        if not isinstance(
+            http_server.request_callback,
+            tornado.httputil.HTTPServerConnectionDelegate,
+        ):
+            # Get error message
+            error_msg = (
+                'Invalid request callback: {}. Must be an'
+                ' `HTTPServerConnectionDelegate`.'
+            ).format(repr(http_server.request_callback))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store the server
+        self._http_server = http_server
+
+        # Store the IOLoop
+        self._io_loop = io_loop or tornado.ioloop.IOLoop.current()
+
+        # In-flight requests counter
+        self._counter = _RequestCounter()
+
+        # Get Tornado-based delegate class that counts in-flight requests
+        server_delegate_class, _ = _get_tornado_counting_classes()
+
+        # Wrap the request callback to count in-flight requests
+        http_server.request_callback = server_delegate_class(
+            http_server.request_callback, self._counter
+        )
+
+    def __call__(self, timeout):
+        """
+        Stop accepting connections, and wait for in-flight requests to \
+        finish.
+
+        :param timeout:
+            Remaining drain time in seconds.
+
+        :return:
+            None.
+        """
+        # Stop accepting connections on the IOLoop's thread
+        self._io_loop.add_callback(self._http_server.stop)
+
+        # Wait for in-flight requests to finish
+        self._counter.wait_zero(timeout)
+
+
+# Tornado-based classes, created on first use so that Tornado is not
+# required to import this module
+_TORNADO_COUNTING_CLASSES = []
+
+
+def _get_tornado_counting_classes():
+    """
+    Get Tornado-based delegate classes that count in-flight requests.
+
+    :return:
+        Tuple of server connection delegate class and message delegate \
+        class.
+    """
+    # If the classes have been created
+    if _TORNADO_COUNTING_CLASSES:
+        # Return the classes
+        return tuple(_TORNADO_COUNTING_CLASSES)
+
+    # External imports
+    from tornado.httputil import HTTPMessageDelegate
+    from tornado.httputil import HTTPServerConnectionDelegate
+
+    class CountingMessageDelegate(HTTPMessageDelegate):
+        """
+        `HTTPMessageDelegate` that counts the request as in-flight from \
+        receiving its headers until its response is finished or the \
+        connection is closed.
+        """
+
+        def __init__(self, delegate, request_conn, counter):
+            """
+            Constructor.
+
+            :param delegate:
+                Wrapped `HTTPMessageDelegate` object.
+
+            :param request_conn:
+                `HTTPConnection` object of the request.
+
+            :param counter:
+                `_RequestCounter` object.
+
+            :return:
+                None.
+            """
+            # Store the wrapped delegate
+            self._delegate = delegate
+
+            # Store the counter
+            self._counter = counter
+
+            # Whether the request is counted as in-flight
+            self._is_counted = False
+
+            # Get the connection's `finish` method
+            finish_func = request_conn.finish
+
+            def finish_wrapper():
+                """
+                Finish the response, and uncount the request.
+
+                :return:
+                    `finish`'s result.
+                """
+                try:
+                    # Finish the response
+                    return finish_func()
+
+                finally:
+                    # Uncount the request
+                    self._uncount()
+
+            # Uncount the request when its response is finished
+            request_conn.finish = finish_wrapper
+
+        def headers_received(self, start_line, headers):
+            """
+            Count the request, and call the wrapped delegate.
+
+            :return:
+                The wrapped delegate's result.
+            """
+            # If the request is not counted
+            if not self._is_counted:
+                # Set the flag
+                self._is_counted = True
+
+                # Count the request
+                self._counter.increment()
+
+            # Call the wrapped delegate
+            return self._delegate.headers_received(start_line, headers)
+
+        def data_received(self, chunk):
+            """
+            Call the wrapped delegate.
+
+            :return:
+                The wrapped delegate's result.
+            """
+            # Call the wrapped delegate
+            return self._delegate.data_received(chunk)
+
+        def finish(self):
+            """
+            Call the wrapped delegate.
+
+            :return:
+                The wrapped delegate's result.
+            """
+            # Call the wrapped delegate
+            return self._delegate.finish()
+
+        def on_connection_close(self):
+            """
+            Call the wrapped delegate, and uncount the request.
+
+            :return:
+                The wrapped delegate's result.
+            """
+            try:
+                # Call the wrapped delegate
+                return self._delegate.on_connection_close()
+
+            finally:
+                # Uncount the request
+                self._uncount()
+
+        def _uncount(self):
+            """
+            Uncount the request if it is counted.
+
+            :return:
+                None.
+            """
+            # If the request is counted
+            if self._is_counted:
+                # Clear the flag
+                self._is_counted = False
+
+                # Uncount the request
+                self._counter.decrement()
+
+    class CountingServerDelegate(HTTPServerConnectionDelegate):
+        """
+        `HTTPServerConnectionDelegate` that wraps message delegates in \
+        `CountingMessageDelegate`.
+        """
+
+        def __init__(self, delegate, counter):
+            """
+            Constructor.
+
+            :param delegate:
+                Wrapped `HTTPServerConnectionDelegate` object.
+
+            :param counter:
+                `_RequestCounter` object.
+
+            :return:
+                None.
+            """
+            # Store the wrapped delegate
+            self._delegate = delegate
+
+            # Store the counter
+            self._counter = counter
+
+        def start_request(self, server_conn, request_conn):
+            """
+            Call the wrapped delegate, and wrap its message delegate.
+
+            :return:
+                `CountingMessageDelegate` object.
+            """
+            # Return wrapped message delegate
+            return CountingMessageDelegate(
+                self._delegate.start_request(server_conn, request_conn),
+                request_conn,
+                self._counter,
+            )
+
+        def on_close(self, server_conn):
+            """
+            Call the wrapped delegate.
+
+            :return:
+                The wrapped delegate's result.
+            """
+            # Call the wrapped delegate
+            return self._delegate.on_close(server_conn)
+
+    # Store the classes
+    _TORNADO_COUNTING_CLASSES[:] = [
+        CountingServerDelegate, CountingMessageDelegate
+    ]
+
+    # Return the classes
+    return tuple(_TORNADO_COUNTING_CLASSES)
+
+
+class SanicDrainHook(object):
+    """
+    Pre-reload hook that stops a Sanic app gracefully.
+
+    The hook stops the app's event loop. Sanic then closes the server and \
+    waits up to its `GRACEFUL_SHUTDOWN_TIMEOUT` config for in-flight \
+    requests to finish. The hook returns when the server has stopped.
+
+    Must be created before the app runs.
+    """
+
+    def __init__(self, app, exit_delay=1):
+        """
+        Constructor.
+
+        :param app:
+            Sanic app object.
+
+        :param exit_delay:
+            Time to block the app's thread after the server has stopped, in \
+            seconds, so that the reloader replaces the current process \
+            before the program ends.
+
+        :return:
+            None.
+        """
+        # Store the app
+        self._app = app
+
+        # Store exit delay
+        self._exit_delay = exit_delay
+
+        # Event loop the app runs on
+        self._loop = None
+
+        # Event set when the server has stopped
+        self._stopped_event = threading.Event()
+
+        # Register listener to get the event loop
+        app.register_listener(self._on_before_server_start,
+                              'before_server_start')
+
+        # Register listener to know when the server has stopped
+        app.register_listener(self._on_after_server_stop,
+                              'after_server_stop')
+
+    def _on_before_server_start(self, app, loop):
+        """
+        Store the event loop the app runs on.
+
+        :return:
+            None.
+        """
+        # Store the event loop
+        self._loop = loop
+
+    def _on_after_server_stop(self, app, loop):
+        """
+        Notify the hook, and delay the program's end.
+
+        :return:
+            None.
+        """
+        # If the server was stopped by the hook
+        if self._stopped_event.is_set():
+            # Return
+            return
+
+        # Set the event
+        self._stopped_event.set()
+
+        # Delay the program's end so that the reloader replaces the current
+        # process first
+        time.sleep(self._exit_delay)
+
+    def __call__(self, timeout):
+        """
+        Stop the app, and wait for it to shut down gracefully.
+
+        :param timeout:
+            Remaining drain time in seconds.
+
+        :return:
+            None.
+        """
+        # Get event loop
+        loop = self._loop
+
+        # If the app is not running
+        if loop is None:
+            # Return
+            return
+
+        # Stop the app on the event loop's thread
+        loop.call_soon_threadsafe(self._app.stop)
+
+        # Wait for the server to stop
+        self._stopped_event.wait(timeout)
+
+
+class WSGIDrainMiddleware(object):
+    """
+    WSGI middleware that counts in-flight requests, and is a pre-reload hook \
+    that drains them.
+
+    Once draining, new requests are answered with `503 Service Unavailable` \
+    so that clients retry, e.g. on the new process.
+
+    Usage:
+    ```
+    app = WSGIDrainMiddleware(app)
+
+    reloader.add_pre_reload_hook(app.drain)
+    ```
+    """
+
+    def __init__(self, app, retry_after=1):
+        """
+        Constructor.
+
+        :param app:
+            WSGI app.
+
+        :param retry_after:
+            `Retry-After` header value in seconds of `503` responses.
+
+        :return:
+            None.
+        """
+        # Store the WSGI app
+        self._app = app
+
+        # Store `Retry-After` header value
+        self._retry_after = retry_after
+
+        # In-flight requests counter
+        self._counter = _RequestCounter()
+
+        # Whether is draining
+        self._is_draining = False
+
+    def __call__(self, environ, start_response):
+        """
+        WSGI app.
+
+        :param environ:
+            WSGI environ dict.
+
+        :param start_response:
+            WSGI `start_response` function.
+
+        :return:
+            Response body iterable.
+        """
+        # If is draining
+        if self._is_draining:
+            # Start `503` response
+            start_response('503 Service Unavailable', [
+                ('Content-Type', 'text/plain'),
+                ('Retry-After', str(self._retry_after)),
+                ('Connection', 'close'),
+            ])
+
+            # Return response body
+            return [b'Service Unavailable']
+
+        # Count the request
+        self._counter.increment()
+
+        try:
+            # Call the WSGI app
+            result = self._app(environ, start_response)
+
+        # If have error
+        except BaseException:
+            # Uncount the request
+            self._counter.decrement()
+
+            # Raise the error
+            raise
+
+        # Return response body that uncounts the request when closed
+        return _ClosingIterable(result, self._counter.decrement)
+
+    def drain(self, timeout):
+        """
+        Pre-reload hook that rejects new requests, and waits for in-flight \
+        requests to finish.
+
+        :param timeout:
+            Remaining drain time in seconds.
+
+        :return:
+            None.
+        """
+        # Set the flag
+        self._is_draining = True
+
+        # Wait for in-flight requests to finish
+        self._counter.wait_zero(timeout)
+
+
+class _ClosingIterable(object):
+    """
+    Response body iterable that calls a function when closed by the WSGI \
+    server, after the response is sent.
+    """
+
+    def __init__(self, iterable, on_close):
+        """
+        Constructor.
+
+        :param iterable:
+            Wrapped response body iterable.
+
+        :param on_close:
+            Function called when closed.
+
+        :return:
+            None.
+        """
+        # Store the wrapped iterable
+        self._iterable = iterable
+
+        # Store the function
+        self._on_close = on_close
+
+    def __iter__(self):
+        """
+        Iterate the wrapped iterable.
+
+        :return:
+            Iterator.
+        """
+        # Return iterator of the wrapped iterable
+        return iter(self._iterable)
+
+    def close(self):
+        """
+        Close the wrapped iterable, and call the function.
+
+        :return:
+            None.
+        """
+        # Get the function
+        on_close = self._on_close
+
+        # If the function has been called
+        if on_close is None:
+            # Return
+            return
+
+        # Clear the function so that it is called once
+        self._on_close = None
+
+        try:
+            # Get the wrapped iterable's `close` method
+            close_func = getattr(self._iterable, 'close', None)
+
+            # If have `close` method
+            if close_func is not None:
+                # Close the wrapped iterable
+                close_func()
+
+        finally:
+            # Call the function
+            on_close()
@@ -0,0 +1,116 @@
+# coding: utf-8
+"""
+Tests of `adapters` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import threading
+import time
+import unittest
+
+# Local imports
+from .adapters import WSGIDrainMiddleware
+
+
+def _app(environ, start_response):
+    """
+    WSGI app that responds `OK`.
+
+    :param environ:
+        WSGI environ dict.
+
+    :param start_response:
+        WSGI `start_response` function.
+
+    :return:
+        Response body iterable.
+    """
+    # Start response
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+
+    # Return response body
+    return [b'OK']
+
+
+class WSGIDrainMiddlewareTest(unittest.TestCase):
+    """
+    Tests of `WSGIDrainMiddleware`.
+    """
+
+    def setUp(self):
+        """
+        Create the middleware, and start an in-flight request.
+
+        :return:
+            None.
+        """
+        # Create the middleware
+        self.app = WSGIDrainMiddleware(_app)
+
+        # Response statuses
+        self.statuses = []
+
+        # Start a request whose response body is not closed yet
+        self.body = self._request()
+
+    def _request(self):
+        """
+        Call the middleware.
+
+        :return:
+            Response body iterable.
+        """
+        # Call the middleware, recording the response status
+        return self.app(
+            {}, lambda status, headers: self.statuses.append(status)
+        )
+
+    def test_drain_waits_for_request(self):
+        """
+        Test draining rejects new requests, and returns when the in-flight \
+        request finishes.
+        """
+        # Close the in-flight request's response body soon
+        timer = threading.Timer(0.2, self.body.close)
+
+        # Start the timer
+        timer.start()
+
+        # Get start time
+        start_time = time.time()
+
+        try:
+            # Drain, with time longer than the request
+            self.app.drain(10)
+
+        finally:
+            # Wait for the timer
+            timer.join()
+
+        # Drain returns when the request finishes
+        self.assertLess(time.time() - start_time, 5)
+
+        # New requests are rejected
+        self._request()
+
+        self.assertEqual(
+            self.statuses, ['200 OK', '503 Service Unavailable']
+        )
+
+    def test_drain_timeout(self):
+        """
+        Test draining returns after the timeout if the in-flight request \
+        does not finish.
+        """
+        # Get start time
+        start_time = time.time()
+
+        # Drain
+        self.app.drain(0.2)
+
+        # Drain returns after the timeout
+        self.assertGreaterEqual(time.time() - start_time, 0.2)
+
+        # Close the in-flight request's response body
+        self.body.close()
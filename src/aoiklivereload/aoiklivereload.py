@@ -5,15 +5,55 @@ Live reloader that detects module file changes and reloads the program.
 from __future__ import absolute_import
 
 # Standard imports
+import ast
+import binascii
+import errno
+import fnmatch
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import marshal
+import mmap
+import multiprocessing
 import os
+import py_compile
+import re
+import runpy
+import select
+import socket
+import struct
 import subprocess
 import sys
+import sysconfig
+import tempfile
 import threading
 import time
+import traceback
 
-# External imports
-from watchdog.events import FileSystemEventHandler
-from watchdog.observers import Observer
+# Local imports
+from . import inotify
+from . import polling
+from .import_hook import ImportHookFinder
+from .import_hook import PENDING_MODULE_RETRY_COUNT
+from .import_hook import get_module_file_path
+
+
+try:
+    # External imports
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    # `watchdog` is optional when `inotify` backend is used.
+    #
+    # `LiveReloader` only needs `FileSystemEventHandler`'s `dispatch`, which
+    # it overrides.
+    #
+    FileSystemEventHandler = object
+
+    # Observer class not available
+    Observer = None
 
 
 try:
@@ -24,6 +64,63 @@ except ImportError:
     from thread import interrupt_main
 
 
+try:
+    # Python 3.4+
+    from importlib import reload as reload_module
+except ImportError:
+    # Python 2
+    from imp import reload as reload_module
+
+
+# Time when this module is imported.
+#
+# Used to tell process startup time from application initialization time in
+# reload stats.
+#
+_IMPORT_TIME = time.time()
+
+
+# Monotonic clock function
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+# Logger
+_LOGGER = logging.getLogger(__name__)
+
+
+# Hash function for file fingerprints.
+#
+# `blake2b` is fast and available in Python 3.6+. Fall back to `md5`.
+#
+if hasattr(hashlib, 'blake2b'):
+    def _hash_bytes(data):
+        """
+        Hash given bytes.
+
+        :param data:
+            Bytes-like object.
+
+        :return:
+            8-byte digest.
+        """
+        # Return digest
+        return hashlib.blake2b(data, digest_size=8).digest()
+
+else:
+    def _hash_bytes(data):
+        """
+        Hash given bytes.
+
+        :param data:
+            Bytes-like object.
+
+        :return:
+            8-byte digest.
+        """
+        # Return digest
+        return hashlib.md5(data).digest()[:8]
+
+
 # Version
 __version__ = '0.1.0'
 
@@ -34,6 +131,328 @@ __all__ = (
 )
 
 
+class PathFilter(object):
+    """
+    Path filter that decides whether a path should be watched.
+
+    All patterns are precompiled into one regular expression, and match \
+    results are cached, so that each path is matched at most once.
+    """
+
+    def __init__(self, include=None, exclude=None, exclude_prefixes=None):
+        """
+        Constructor.
+
+        :param include:
+            Glob patterns of paths to include. Default is include all.
+
+        :param exclude:
+            Glob patterns of paths to exclude.
+
+        :param exclude_prefixes:
+            Directory paths whose own paths and descendant paths are \
+            excluded.
+
+        :return:
+            None.
+        """
+        # Store include regex, or None if include all
+        self._include_regex = self._compile_regex(
+            globs=include,
+            prefixes=None,
+        )
+
+        # Store exclude regex, or None if exclude none
+        self._exclude_regex = self._compile_regex(
+            globs=exclude,
+            prefixes=exclude_prefixes,
+        )
+
+        # Dict that maps path to match result
+        self._cache = {}
+
+        # Dict that maps path to pattern match result
+        self._pattern_cache = {}
+
+    @staticmethod
+    def _compile_regex(globs, prefixes):
+        """
+        Compile glob patterns and prefix paths into one regular expression.
+
+        :param globs:
+            Glob patterns.
+
+        :param prefixes:
+            Directory paths.
+
+        :return:
+            Compiled regular expression, or None if no patterns given.
+        """
+        # Regular expression parts
+        regex_parts = []
+
+        # For each glob pattern
+        for glob in globs or ():
+            # Convert to regular expression
+            regex_parts.append(fnmatch.translate(os.path.normcase(glob)))
+
+        # For each prefix path
+        for prefix in prefixes or ():
+            # Get normalized absolute path
+            prefix = os.path.normcase(os.path.abspath(prefix)).rstrip('\\/')
+
+            # Match the prefix path itself or any of its descendant paths
+            regex_parts.append(re.escape(prefix) + r'(?:[\\/]|\Z)')
+
+        # If have no patterns
+        if not regex_parts:
+            # Return None
+            return None
+
+        # Combine into one regular expression
+        regex_text = '|'.join('(?:{})'.format(x) for x in regex_parts)
+
+        # Return compiled regular expression
+        return re.compile(regex_text)
+
+    def match(self, path):
+        """
+        Test whether given path should be watched.
+
+        A directory path is also tested with a trailing path separator, so \
+        that pattern `/app/*` matches directory `/app`.
+
+        :param path:
+            Absolute path.
+
+        :return:
+            Boolean.
+        """
+        # Get cached result
+        result = self._cache.get(path, None)
+
+        # If have cached result
+        if result is not None:
+            # Return cached result
+            return result
+
+        # If the path does not match the patterns
+        if not self.match_patterns(path):
+            # Result is not watch
+            result = False
+
+        # If the path is not an existing directory or file.
+        #
+        # E.g. paths inside zip files, or paths of frozen modules.
+        #
+        elif not os.path.exists(path):
+            # Result is not watch
+            result = False
+
+        # If none of above
+        else:
+            # Result is watch
+            result = True
+
+        # Cache the result
+        self._cache[path] = result
+
+        # Return the result
+        return result
+
+    def match_patterns(self, path):
+        """
+        Test whether given path matches the include patterns and does not \
+        match the exclude patterns, without checking the path exists.
+
+        Used for paths in file system events, which may have been removed.
+
+        :param path:
+            Absolute path.
+
+        :return:
+            Boolean.
+        """
+        # Get cached result
+        result = self._pattern_cache.get(path, None)
+
+        # If have cached result
+        if result is not None:
+            # Return cached result
+            return result
+
+        # Get normalized path
+        norm_path = os.path.normcase(path)
+
+        # Get normalized path with trailing separator
+        norm_dir_path = norm_path.rstrip('\\/') + os.path.sep
+
+        # Get include regex
+        include_regex = self._include_regex
+
+        # Get exclude regex
+        exclude_regex = self._exclude_regex
+
+        # If the path is not included
+        if include_regex is not None \
+                and include_regex.match(norm_path) is None \
+                and include_regex.match(norm_dir_path) is None:
+            # Result is not watch
+            result = False
+
+        # If the path is excluded
+        elif exclude_regex is not None \
+                and (
+                    exclude_regex.match(norm_path) is not None or
+                    exclude_regex.match(norm_dir_path) is not None
+                ):
+            # Result is not watch
+            result = False
+
+        # If none of above
+        else:
+            # Result is watch
+            result = True
+
+        # Cache the result
+        self._pattern_cache[path] = result
+
+        # Return the result
+        return result
+
+
+def get_system_paths():
+    """
+    Get directory paths of the standard library and site packages.
+
+    :return:
+        Set of directory paths.
+    """
+    # Directory paths
+    dir_path_s = set()
+
+    # Get install paths of current interpreter
+    install_paths = sysconfig.get_paths()
+
+    # For each install path key of the standard library and site packages
+    for key in ('stdlib', 'platstdlib', 'purelib', 'platlib'):
+        # Get the install path
+        dir_path = install_paths.get(key, None)
+
+        # If have the install path
+        if dir_path:
+            # Add to directory paths
+            dir_path_s.add(os.path.abspath(dir_path))
+
+    # Return directory paths
+    return dir_path_s
+
+
+def get_file_fingerprint(path):
+    """
+    Get fingerprint of given file.
+
+    :param path:
+        File path.
+
+    :return:
+        Tuple of (size, mtime in nanoseconds, 8-byte content digest), or \
+        None if the file can not be read.
+    """
+    try:
+        # Open the file
+        with open(path, 'rb') as file_obj:
+            # Get file status
+            stat_obj = os.fstat(file_obj.fileno())
+
+            # Get file size
+            size = stat_obj.st_size
+
+            # If the file is empty.
+            #
+            # Empty file can not be memory mapped.
+            #
+            if size == 0:
+                # Hash empty bytes
+                digest = _hash_bytes(b'')
+
+            # If the file is not empty
+            else:
+                # Memory map the file to avoid copying its content
+                mmap_obj = mmap.mmap(
+                    file_obj.fileno(), 0, access=mmap.ACCESS_READ
+                )
+
+                try:
+                    # Hash the file content
+                    digest = _hash_bytes(mmap_obj)
+
+                finally:
+                    # Close the memory map
+                    mmap_obj.close()
+
+    # If have error
+    except (IOError, OSError, ValueError):
+        # Return None
+        return None
+
+    # Return fingerprint
+    return (size, _get_mtime_ns(stat_obj), digest)
+
+
+def compile_file(path):
+    """
+    Compile given source file to bytecode file in `__pycache__`.
+
+    Same as `LiveReloader.PRECOMPILE_CODE`, which is run in worker \
+    processes.
+
+    :param path:
+        Source file path.
+
+    :return:
+        Error message if compilation failed, otherwise None.
+    """
+    try:
+        # Compile the file
+        py_compile.compile(path, doraise=True)
+
+    # If the source code has error, e.g. `SyntaxError`
+    except py_compile.PyCompileError as exc:
+        # Return error message
+        return exc.msg
+
+    # If have error, e.g. the file has been removed
+    except (IOError, OSError):
+        # Ignore
+        return None
+
+    # Return no error
+    return None
+
+
+def _get_mtime_ns(stat_obj):
+    """
+    Get modification time in nanoseconds from given file status.
+
+    :param stat_obj:
+        File status object.
+
+    :return:
+        Modification time in nanoseconds.
+    """
+    # Get modification time in nanoseconds, available in Python 3.3+
+    mtime_ns = getattr(stat_obj, 'st_mtime_ns', None)
+
+    # If not have modification time in nanoseconds
+    if mtime_ns is None:
+        # Convert from modification time in seconds
+        mtime_ns = int(stat_obj.st_mtime * 1000000000)
+
+    # Return modification time in nanoseconds
+    return mtime_ns
+
+
 class LiveReloader(FileSystemEventHandler):
     """
     Live reloader that detects module file changes and reloads the program.
@@ -46,10 +465,163 @@ class LiveReloader(FileSystemEventHandler):
 
     RELOAD_MODE_V_SPAWN_WAIT = 'spawn_wait'
 
+    RELOAD_MODE_V_FORK_SERVER = 'fork_server'
+
+    RELOAD_MODE_V_IN_PROCESS = 'in_process'
+
+    RELOAD_MODE_V_BLUE_GREEN = 'blue_green'
+
     RELOAD_MODE_VALUES = (
         RELOAD_MODE_V_EXEC,
         RELOAD_MODE_V_SPAWN_EXIT,
         RELOAD_MODE_V_SPAWN_WAIT,
+        RELOAD_MODE_V_FORK_SERVER,
+        RELOAD_MODE_V_IN_PROCESS,
+        RELOAD_MODE_V_BLUE_GREEN,
+    )
+
+    # Reload modes allowed as `in_process` mode's fallback
+    FALLBACK_RELOAD_MODE_VALUES = (
+        RELOAD_MODE_V_EXEC,
+        RELOAD_MODE_V_SPAWN_EXIT,
+        RELOAD_MODE_V_SPAWN_WAIT,
+        RELOAD_MODE_V_BLUE_GREEN,
+    )
+
+    # Environment variable name that marks a `fork_server` child process.
+    #
+    # Value is the file descriptor of the child process's end of the control
+    # socket pair, over which the child process requests reload.
+    #
+    FORK_SERVER_CHILD_ENV_KEY = 'AOIKLIVERELOAD_FORK_SERVER_CHILD'
+
+    # Environment variable name that passes listening sockets to the new
+    # process.
+    #
+    # Value is JSON object that maps socket name to list of file descriptor,
+    # address family and socket type.
+    #
+    LISTEN_FDS_ENV_KEY = 'AOIKLIVERELOAD_LISTEN_FDS'
+
+    # Environment variable name that passes reload timestamps to the new
+    # process. Value is JSON object.
+    RELOAD_TIMES_ENV_KEY = 'AOIKLIVERELOAD_RELOAD_TIMES'
+
+    # Environment variable name that passes the pipe file descriptor the new
+    # process writes to in `mark_ready`, in `blue_green` mode
+    READY_FD_ENV_KEY = 'AOIKLIVERELOAD_READY_FD'
+
+    # Discovery mode constants
+    DISCOVERY_MODE_V_SCAN = 'scan'
+
+    DISCOVERY_MODE_V_IMPORT_HOOK = 'import_hook'
+
+    DISCOVERY_MODE_VALUES = (
+        DISCOVERY_MODE_V_SCAN,
+        DISCOVERY_MODE_V_IMPORT_HOOK,
+    )
+
+    # Watch mode constants
+    WATCH_MODE_V_RECURSIVE = 'recursive'
+
+    WATCH_MODE_V_PRECISE = 'precise'
+
+    WATCH_MODE_VALUES = (
+        WATCH_MODE_V_RECURSIVE,
+        WATCH_MODE_V_PRECISE,
+    )
+
+    # Relevance mode constants
+    RELEVANCE_MODE_V_DIRECTORY = 'directory'
+
+    RELEVANCE_MODE_V_MODULE = 'module'
+
+    RELEVANCE_MODE_VALUES = (
+        RELEVANCE_MODE_V_DIRECTORY,
+        RELEVANCE_MODE_V_MODULE,
+    )
+
+    # Watchdog event types caused by reading files, not changing them.
+    #
+    # Emitted by newer `watchdog` versions on Linux.
+    #
+    READ_EVENT_TYPES = ('opened', 'closed_no_write')
+
+    # Watch state cache file format version
+    CACHE_VERSION = 1
+
+    # Time in seconds after the watcher starts before module file paths
+    # loaded from the watch state cache but not imported are no longer
+    # watched
+    CACHE_RECONCILE_DELAY = 30
+
+    # Time in seconds after a write within which another write may leave a
+    # file's modification time unchanged, because of coarse file system
+    # timestamps, e.g. 2 seconds on FAT.
+    #
+    # When verifying content, a file modified more recently than this is
+    # hashed even if its size and modification time match the fingerprint.
+    #
+    MTIME_RESOLUTION = 2
+
+    # Number of change checks to retry looking up a recorded module that is
+    # not in `sys.modules`, in `import_hook` discovery mode
+    PENDING_MODULE_RETRY_COUNT = PENDING_MODULE_RETRY_COUNT
+
+    # Minimum number of files to compile in worker processes when
+    # precompiling.
+    #
+    # Fewer files are compiled in the current thread because starting
+    # worker processes takes longer than compiling a few files.
+    #
+    PRECOMPILE_POOL_MIN_FILES = 4
+
+    # Code run by the precompile worker processes that compile given files.
+    #
+    # Same as `compile_file`. Error messages are written to stdout in JSON.
+    #
+    PRECOMPILE_CODE = (
+        'import json, py_compile, sys\n'
+        'error_msgs = []\n'
+        'for path in sys.argv[1:]:\n'
+        '    try:\n'
+        '        py_compile.compile(path, doraise=True)\n'
+        '    except py_compile.PyCompileError as exc:\n'
+        '        error_msgs.append(exc.msg)\n'
+        '    except (IOError, OSError):\n'
+        '        pass\n'
+        'sys.stdout.write(json.dumps(error_msgs))\n'
+    )
+
+    # Code run by the preflight subprocess that imports given modules.
+    #
+    # The first argument is the current process's `sys.path` in JSON.
+    #
+    PREFLIGHT_IMPORT_CODE = (
+        'import importlib, json, sys\n'
+        'sys.path[:] = json.loads(sys.argv[1])\n'
+        'for name in sys.argv[2:]:\n'
+        '    importlib.import_module(name)\n'
+    )
+
+    # Factor to multiply the check interval by after an idle check, in
+    # adaptive interval
+    INTERVAL_BACKOFF_FACTOR = 2
+
+    # Backend constants
+    BACKEND_V_WATCHDOG = 'watchdog'
+
+    BACKEND_V_INOTIFY = 'inotify'
+
+    BACKEND_V_POLLING = 'polling'
+
+    BACKEND_V_DAEMON = 'daemon'
+
+    BACKEND_VALUES = (
+        BACKEND_V_WATCHDOG,
+        BACKEND_V_INOTIFY,
+        BACKEND_V_POLLING,
+        BACKEND_V_DAEMON,
     )
 
     def __init__(
@@ -58,6 +630,30 @@ class LiveReloader(FileSystemEventHandler):
         force_exit=False,
         extra_paths=None,
         interval=1,
+        discovery_mode=None,
+        watch_mode=None,
+        include=None,
+        exclude=None,
+        exclude_system=True,
+        debounce_interval=0.1,
+        debounce_max_wait=1,
+        verify_content=False,
+        preload_modules=None,
+        fallback_reload_mode=None,
+        reload_stats_callback=None,
+        backend=None,
+        min_interval=None,
+        max_interval=None,
+        daemon_socket_path=None,
+        cache_dir=None,
+        precompile=False,
+        precompile_dependents=False,
+        preflight=False,
+        preflight_import=False,
+        preflight_timeout=10,
+        drain_timeout=10,
+        ready_timeout=30,
+        relevance_mode=None,
     ):
         """
         Constructor.
@@ -72,6 +668,27 @@ class LiveReloader(FileSystemEventHandler):
                 - 'exec': Replace the current process with a new process.
                 - 'spawn_exit': Spawn a subprocess, the current process exits.
                 - 'spawn_wait': Spawn a subprocess, the current process waits.
+                - 'fork_server': The current process becomes a supervisor \
+                  that imports `preload_modules` once, then forks a child \
+                  process that re-runs the program. On reload the child \
+                  exits and a new child is forked, so only modules in \
+                  watched directories are imported again. Not available on \
+                  Windows.
+                - 'in_process': Reload changed modules and modules that \
+                  depend on them in the current process using \
+                  `importlib.reload`, in dependency order. Fall back to \
+                  `fallback_reload_mode` if reloading fails, if the main \
+                  module or an extra path is changed. Notice modules are \
+                  reloaded in the watcher thread, and objects created from \
+                  old modules are not updated.
+                - 'blue_green': Spawn a subprocess, wait until it calls \
+                  `mark_ready`, then call pre-reload hooks and exit the \
+                  current process. Both processes serve during the overlap \
+                  if listening sockets are registered, e.g. by \
+                  `get_listening_socket`. If the subprocess exits or is not \
+                  ready in `ready_timeout`, it is killed and the current \
+                  process keeps running until next file change. Not \
+                  available on Windows.
 
         :param force_exit:
             In `spawn_exit` mode, whether call `os._exit` to force the \
@@ -81,422 +698,4169 @@ class LiveReloader(FileSystemEventHandler):
             Extra file paths to watch for changes.
 
         :param interval:
-            Sleep interval between two change checks, in seconds.
+            Sleep interval between two change checks, in seconds. In \
+            `polling` backend, also the interval between two polls.
+
+            If `min_interval` or `max_interval` differs from `interval`, \
+            the interval is adaptive: it starts at `min_interval`, is \
+            doubled after each idle check up to `max_interval`, and goes \
+            back to `min_interval` after file changes or newly watched \
+            paths.
+
+        :param discovery_mode:
+            How to discover module files to watch.
+
+            Default is 'scan'.
+
+            Allowed values:
+                - 'scan': Rescan `sys.modules` in each change check.
+                - 'import_hook': Scan `sys.modules` once, then install a \
+                  `sys.meta_path` finder that records newly imported \
+                  modules, so that a change check costs nothing when \
+                  nothing is imported.
+
+        :param watch_mode:
+            How to watch directories.
+
+            Default is 'recursive'.
+
+            Allowed values:
+                - 'recursive': Watch directories in `sys.path` and module \
+                  directories recursively.
+                - 'precise': Watch only directories that contain loaded \
+                  module files or extra paths, non-recursively. This uses \
+                  much fewer OS watches, e.g. inotify watches on Linux.
+
+        :param include:
+            Glob patterns of module and `sys.path` directory paths to watch.
+
+            Default is watch all.
+
+            Patterns are matched against absolute paths, with `*` matching \
+            path separators too, e.g. `/home/aoik/project/*`.
+
+        :param exclude:
+            Glob patterns of module and `sys.path` directory paths not to \
+            watch.
+
+        :param exclude_system:
+            Whether not watch the standard library and site packages \
+            directories given by `sysconfig`. Default is not watch.
+
+            Module paths that do not exist, e.g. paths inside zip files or \
+            of frozen modules, are never watched.
+
+            Extra paths are watched regardless of these filters.
+
+        :param debounce_interval:
+            Quiet window after the last file change before reloading, in \
+            seconds. A burst of file changes within the quiet window causes \
+            only one reload.
+
+            Default is 0.1. If 0, reload on the first file change.
+
+        :param debounce_max_wait:
+            Maximum time to wait since the first file change of a burst \
+            before reloading, in seconds, in case file changes keep coming.
+
+        :param verify_content:
+            Whether verify a changed module file's content has actually \
+            changed before reloading, using fingerprints of size, \
+            modification time and content hash taken when the module file \
+            is discovered. This suppresses reloads caused by touching files \
+            or rewriting identical content. Default is not verify.
+
+        :param preload_modules:
+            In `fork_server` mode, names of modules the supervisor process \
+            imports before forking, e.g. stable third-party modules that \
+            are slow to import.
+
+        :param fallback_reload_mode:
+            In `in_process` mode, reload mode to use when modules can not be \
+            reloaded in process.
+
+            Default is 'spawn_wait' for Windows and 'exec' otherwise.
+
+            Allowed values: 'exec', 'spawn_exit', 'spawn_wait'.
+
+        :param reload_stats_callback:
+            Function called with a reload stats dict when the new process \
+            calls `mark_ready`, or when an `in_process` reload finishes. \
+            See `mark_ready` for the dict's keys.
+
+        :param backend:
+            File system event backend.
+
+            Default is 'watchdog' if `watchdog` is installed, otherwise \
+            'inotify'.
+
+            Allowed values:
+                - 'watchdog': Use `watchdog` package's observer, which uses \
+                  one emitter thread per watch.
+                - 'inotify': Use one inotify file descriptor and one reader \
+                  thread for all watches. Events are read in large batches \
+                  and decoded without creating event objects. Linux only, \
+                  and `watchdog` is not needed.
+                - 'polling': Poll watched directories with `stat` every \
+                  `interval` seconds. A directory is re-listed only when \
+                  its modification time has changed, and only loaded \
+                  module files and extra paths are checked for in-place \
+                  changes. Use \
+                  for NFS, SMB, and bind mounts of containers and virtual \
+                  machines, where file system events are not delivered. \
+                  `watchdog` is not needed.
+                - 'daemon': Subscribe to watch paths at a watcher daemon \
+                  started by `python -m aoiklivereload.daemon`, so that \
+                  processes watching the same directories share one set of \
+                  OS watches. Not available on Windows.
+
+        :param min_interval:
+            Minimum adaptive check interval, in seconds. Default is \
+            `interval`.
+
+        :param max_interval:
+            Maximum adaptive check interval, in seconds. Default is \
+            `interval`.
+
+        :param daemon_socket_path:
+            In `daemon` backend, the watcher daemon's Unix domain socket \
+            path. Default is the watcher daemon's default.
+
+        :param cache_dir:
+            Directory to store the watch state cache in, e.g. \
+            `LiveReloader.get_default_cache_dir()`. Default is not use the \
+            cache.
+
+            The cache stores watched module file paths, and fingerprints \
+            if `verify_content` is on. It is saved before reloading, and \
+            loaded by the new process when the watcher starts, so that all \
+            module directories are watched immediately instead of as the \
+            program imports them, and fingerprints of unchanged files are \
+            not taken again. Cached module file paths that are not \
+            imported are no longer watched after \
+            `CACHE_RECONCILE_DELAY` seconds.
+
+            The cache file is keyed by Python executable, version, \
+            `sys.path` and the main script path.
+
+        :param precompile:
+            Whether compile changed module files to bytecode files in \
+            `__pycache__` before reloading, so that the new process does \
+            not compile them on import. Many files are compiled in \
+            parallel in worker processes. If a file fails to compile, e.g. \
+            has `SyntaxError`, the error is printed and the reload is \
+            aborted until next file change. Default is not precompile.
+
+        :param precompile_dependents:
+            Whether precompile loaded modules that depend on changed \
+            modules too. Default is not.
+
+        :param preflight:
+            Whether check changed module files compile before reloading. \
+            If a file fails to compile, the error is printed, the reload is \
+            aborted and the current process keeps running until next file \
+            change. Implied by `precompile`. Default is not check.
+
+        :param preflight_import:
+            Whether import changed modules and modules that depend on them \
+            in a short-lived subprocess before reloading, after the compile \
+            check. If the import fails or times out, the error is printed, \
+            the reload is aborted and the current process keeps running \
+            until next file change. The main module is not imported because \
+            importing it runs the program. Implies `preflight`. Default is \
+            not import.
+
+        :param preflight_timeout:
+            Time to wait for the preflight import subprocess to exit, in \
+            seconds, before killing it and aborting the reload.
+
+        :param drain_timeout:
+            Total time given to pre-reload hooks added by \
+            `add_pre_reload_hook`, in seconds. Default is 10.
+
+        :param ready_timeout:
+            In `blue_green` mode, and for `WorkerPool` workers, time to \
+            wait for the new process to call `mark_ready`, in seconds. \
+            Default is 30.
+
+        :param relevance_mode:
+            Which changed `.py` files in watched directories trigger reload.
+
+            Default is 'directory'.
+
+            Allowed values:
+                - 'directory': Any `.py` file in watched directories.
+                - 'module': Only module files loaded by the current process, \
+                  and new files in directories of packages the current \
+                  process imported. Useful when several programs share \
+                  watched directories, e.g. services in a monorepo.
+
+            Extra paths always trigger reload.
 
         :return:
             None.
         """
         # If reload mode is not given
         if reload_mode is None:
-            # If in Windows
-            if sys.platform == 'win32':
-                # Use default `spawn_wait`
-                reload_mode = self.RELOAD_MODE_V_SPAWN_WAIT
-
-            # If not in Windows
-            else:
-                # Use default `exec`
-                reload_mode = self.RELOAD_MODE_V_EXEC
+            # Use default reload mode
+            reload_mode = self._get_default_reload_mode()
 
         # If reload mode is not valid
         if reload_mode not in self.RELOAD_MODE_VALUES:
             # Get error message
             error_msg = 'Invalid reload mode: {}.'.format(repr(reload_mode))
 
-            # Raise error
-            raise ValueError(error_msg)
+            # Raise error
+            raise ValueError(error_msg)
+
+        # If reload mode is `fork_server` but `os.fork` is not available, or
+        # is `blue_green` but in Windows
+        if (reload_mode == self.RELOAD_MODE_V_FORK_SERVER
+                and not hasattr(os, 'fork')) \
+                or (reload_mode == self.RELOAD_MODE_V_BLUE_GREEN
+                    and sys.platform == 'win32'):
+            # Get error message
+            error_msg = 'Reload mode {} is not supported on {}.'.format(
+                repr(reload_mode), sys.platform
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store reload mode
+        self._reload_mode = reload_mode
+
+        # If fallback reload mode is not given
+        if fallback_reload_mode is None:
+            # Use default reload mode
+            fallback_reload_mode = self._get_default_reload_mode()
+
+        # If fallback reload mode is not valid
+        if fallback_reload_mode not in self.FALLBACK_RELOAD_MODE_VALUES:
+            # Get error message
+            error_msg = 'Invalid fallback reload mode: {}.'.format(
+                repr(fallback_reload_mode)
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store fallback reload mode
+        self._fallback_reload_mode = fallback_reload_mode
+
+        # Store names of modules to preload in `fork_server` mode
+        self._preload_modules = tuple(preload_modules or ())
+
+        # If discovery mode is not given
+        if discovery_mode is None:
+            # Use default `scan`
+            discovery_mode = self.DISCOVERY_MODE_V_SCAN
+
+        # If discovery mode is not valid
+        if discovery_mode not in self.DISCOVERY_MODE_VALUES:
+            # Get error message
+            error_msg = 'Invalid discovery mode: {}.'.format(
+                repr(discovery_mode)
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store discovery mode
+        self._discovery_mode = discovery_mode
+
+        # If watch mode is not given
+        if watch_mode is None:
+            # Use default `recursive`
+            watch_mode = self.WATCH_MODE_V_RECURSIVE
+
+        # If watch mode is not valid
+        if watch_mode not in self.WATCH_MODE_VALUES:
+            # Get error message
+            error_msg = 'Invalid watch mode: {}.'.format(repr(watch_mode))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store watch mode
+        self._watch_mode = watch_mode
+
+        # If relevance mode is not given
+        if relevance_mode is None:
+            # Use default `directory`
+            relevance_mode = self.RELEVANCE_MODE_V_DIRECTORY
+
+        # If relevance mode is not valid
+        if relevance_mode not in self.RELEVANCE_MODE_VALUES:
+            # Get error message
+            error_msg = 'Invalid relevance mode: {}.'.format(
+                repr(relevance_mode)
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store relevance mode
+        self._relevance_mode = relevance_mode
+
+        # If backend is not given
+        if backend is None:
+            # Use `watchdog` if installed, otherwise `inotify`
+            backend = self.BACKEND_V_WATCHDOG if Observer is not None \
+                else self.BACKEND_V_INOTIFY
+
+        # If backend is not valid
+        if backend not in self.BACKEND_VALUES:
+            # Get error message
+            error_msg = 'Invalid backend: {}.'.format(repr(backend))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # If backend is `watchdog` but `watchdog` is not installed
+        if backend == self.BACKEND_V_WATCHDOG and Observer is None:
+            # Get error message
+            error_msg = 'Backend {} requires package `watchdog`.'.format(
+                repr(backend)
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # If backend is `inotify` but inotify is not available
+        if backend == self.BACKEND_V_INOTIFY and not inotify.is_available():
+            # Get error message
+            error_msg = 'Backend {} is not supported on {}.'.format(
+                repr(backend), sys.platform
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # If backend is `daemon` but Unix domain socket is not available
+        if backend == self.BACKEND_V_DAEMON \
+                and not hasattr(socket, 'AF_UNIX'):
+            # Get error message
+            error_msg = 'Backend {} is not supported on {}.'.format(
+                repr(backend), sys.platform
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store backend
+        self._backend = backend
+
+        # Store watcher daemon's socket path
+        self._daemon_socket_path = daemon_socket_path
+
+        # Store watch state cache directory
+        self._cache_dir = cache_dir
+
+        # Watch state cache file path
+        self._cache_path = None
+
+        # If use watch state cache
+        if cache_dir is not None:
+            # Get cache key, computed in the constructor so that a new
+            # process computes the same key at the same point
+            cache_key = repr((
+                sys.executable,
+                sys.version,
+                tuple(sys.path),
+                os.path.abspath(sys.argv[0]) if sys.argv else '',
+            )).encode('utf-8')
+
+            # Get cache file path
+            self._cache_path = os.path.join(
+                cache_dir,
+                'watch_state_{}.marshal'.format(
+                    binascii.hexlify(_hash_bytes(cache_key)).decode('ascii')
+                ),
+            )
+
+        # Store whether precompile changed module files
+        self._precompile = bool(precompile)
+
+        # Store whether precompile dependent modules too
+        self._precompile_dependents = bool(precompile_dependents)
+
+        # Store whether trial import changed modules before reloading
+        self._preflight_import = bool(preflight_import)
+
+        # Store whether check changed module files compile before reloading
+        self._preflight = bool(preflight) or self._preflight_import
+
+        # Store preflight import timeout
+        self._preflight_timeout = preflight_timeout
+
+        # Store drain timeout
+        self._drain_timeout = drain_timeout
+
+        # Store ready timeout
+        self._ready_timeout = ready_timeout
+
+        # Module file paths loaded from the watch state cache, watched until
+        # reconciled
+        self._cached_module_file_paths = set()
+
+        # Time when the watch state cache was loaded, or None if not loaded
+        self._cache_load_time = None
+
+        # Whether cached module file paths have been reconciled
+        self._is_cache_reconciled = False
+
+        # Create path filter
+        self._path_filter = PathFilter(
+            include=include,
+            exclude=exclude,
+            exclude_prefixes=(get_system_paths() if exclude_system else None),
+        )
+
+        # Store whether force exit
+        self._force_exit = bool(force_exit)
+
+        # Convert given extra paths to absolute
+        self._extra_paths = set(
+            os.path.abspath(x) for x in (extra_paths or ())
+        )
+
+        # Store check interval
+        self._interval = interval
+
+        # Store minimum check interval
+        self._min_interval = interval if min_interval is None \
+            else min_interval
+
+        # Store maximum check interval
+        self._max_interval = interval if max_interval is None \
+            else max_interval
+
+        # If the minimum check interval is greater than the maximum
+        if self._min_interval > self._max_interval:
+            # Get error message
+            error_msg = 'Invalid interval bounds: {} > {}.'.format(
+                repr(self._min_interval), repr(self._max_interval)
+            )
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Current check interval
+        self._current_interval = self._min_interval
+
+        # Number of file change events since the watcher started.
+        #
+        # Compared between checks to tell whether the watcher is idle.
+        #
+        self._change_event_count = 0
+
+        # Value of `_change_event_count` at the last check
+        self._checked_change_event_count = 0
+
+        # Event set to wake up the watcher thread's sleep early
+        self._watcher_wake_event = threading.Event()
+
+        # Store debounce quiet window
+        self._debounce_interval = debounce_interval
+
+        # Store debounce max wait
+        self._debounce_max_wait = debounce_max_wait
+
+        # Lock for debounce states
+        self._debounce_lock = threading.Lock()
+
+        # Debounce timer
+        self._debounce_timer = None
+
+        # Time of the first file change in current burst
+        self._debounce_first_time = None
+
+        # Time of the last file change in current burst
+        self._debounce_last_time = None
+
+        # Number of file change events in current burst
+        self._debounce_event_count = 0
+
+        # Changed file paths in current burst
+        self._debounce_file_paths = set()
+
+        # Whether a reload has been started
+        self._is_reloading = False
+
+        # Number of file change events coalesced into the last reload
+        self._reload_event_count = 0
+
+        # Changed file paths coalesced into the last reload
+        self._reload_file_paths = set()
+
+        # Wall clock time of the first file change in current burst
+        self._debounce_first_wall_time = None
+
+        # Dict that maps reload stage name to wall clock time of the last
+        # reload
+        self._reload_times = {}
+
+        # Store reload stats callback
+        self._reload_stats_callback = reload_stats_callback
+
+        # Set of watch paths
+        self._watch_paths = set()
+
+        # Prefix index of watch paths, used by `dispatch`.
+        #
+        # Replaced as a whole when watch paths change, so that `dispatch`
+        # never sees a partially built index.
+        #
+        self._watch_path_index = {}
+
+        # Number of watches in use
+        self._watch_count = 0
+
+        # Set of watch directory paths before finding short paths.
+        #
+        # Used in `import_hook` discovery mode.
+        #
+        self._watch_dir_paths = set()
+
+        # `sys.path` snapshot taken when `_watch_dir_paths` is updated.
+        #
+        # Used in `import_hook` discovery mode.
+        #
+        self._sys_path_snapshot = None
+
+        # Import hook finder.
+        #
+        # Used in `import_hook` discovery mode.
+        #
+        self._import_hook_finder = None
+
+        # Dict that maps name of recorded module that is not in
+        # `sys.modules` yet to number of retries so far.
+        #
+        # Used in `import_hook` discovery mode.
+        #
+        self._pending_module_names = {}
+
+        # Set of watched module file paths
+        self._module_file_paths = set()
+
+        # Whether watched module file paths are changed since fingerprints
+        # and package directory listings were last updated
+        self._module_file_paths_changed = False
+
+        # Dict that maps imported package's directory path to names of files
+        # in the directory when the package was found.
+        #
+        # Used in `module` relevance mode to tell new files.
+        #
+        self._package_dir_listings = {}
+
+        # Dict that maps module file path to tuple of (file size, mtime in
+        # nanoseconds, set of imported module names), used by
+        # `_get_imported_module_names`
+        self._imported_names_cache = {}
+
+        # Store whether verify content
+        self._verify_content = bool(verify_content)
+
+        # Dict that maps file path to fingerprint tuple
+        self._fingerprints = {}
+
+        # Dict that maps socket name to registered listening socket
+        self._sockets = {}
+
+        # List of pre-reload hooks
+        self._pre_reload_hooks = []
+
+        # Event loop `watch` runs on. Debounce timers and reloads are
+        # scheduled on it if set.
+        self._async_loop = None
+
+        # Future `watch` waits on, set to reload mode when the program needs
+        # to end for `spawn_exit` and `spawn_wait` modes
+        self._async_reload_future = None
+
+        # `asyncio.Event` that wakes up `watch`'s sleep between checks, like
+        # `_watcher_wake_event` for the watcher thread
+        self._async_wake_event = None
+
+        # Whether the watcher thread should stop
+        self._watcher_to_stop = False
+
+    def _get_default_reload_mode(self):
+        """
+        Get default reload mode of current platform.
+
+        :return:
+            Reload mode.
+        """
+        # If in Windows
+        if sys.platform == 'win32':
+            # Use default `spawn_wait`
+            return self.RELOAD_MODE_V_SPAWN_WAIT
+
+        # If not in Windows
+        else:
+            # Use default `exec`
+            return self.RELOAD_MODE_V_EXEC
+
+    def start_watcher_thread(self):
+        """
+        Start watcher thread.
+
+        In `fork_server` mode, if the current process is not a child process \
+        forked by the supervisor, the current process becomes the \
+        supervisor and this function never returns.
+
+        :return:
+            Watcher thread object.
+        """
+        # If reload mode is `fork_server` and is not in a child process
+        if self._reload_mode == self.RELOAD_MODE_V_FORK_SERVER \
+                and not os.environ.get(self.FORK_SERVER_CHILD_ENV_KEY):
+            # Run fork server, never return
+            self.run_fork_server()
+
+        # Create watcher thread
+        watcher_thread = threading.Thread(target=self.run_watcher)
+
+        # Set whether the thread is daemon
+        watcher_thread.setDaemon(self._is_daemon_thread())
+
+        # Start watcher thread
+        watcher_thread.start()
+
+        # Return watcher thread
+        return watcher_thread
+
+    def run_fork_server(self):
+        """
+        Fork server's function, used in `fork_server` mode.
+
+        Preload modules, then fork a child process to run the program. If \
+        the child process requests reload over the control socket before \
+        exiting, fork a new one.
+
+        Listening sockets the child process registered are passed to the \
+        fork server with the reload request, and are kept open while no \
+        child process is running, so that connections wait in the accept \
+        queue instead of being refused.
+
+        :return:
+            Not return. Exit with the child process's exit code.
+        """
+        # For each module to preload
+        for module_name in self._preload_modules:
+            # Import the module
+            importlib.import_module(module_name)
+
+        # Run in a loop
+        while True:
+            # If have listening sockets passed from the previous child
+            # process
+            if self._sockets:
+                # Put socket infos in env dict, so that the child process
+                # gets the sockets using `get_inherited_socket`
+                os.environ[self.LISTEN_FDS_ENV_KEY] = json.dumps(dict(
+                    (name, [sock.fileno(), int(sock.family), int(sock.type)])
+                    for name, sock in self._sockets.items()
+                ))
+
+            # Create control socket pair
+            control_sock, child_control_sock = socket.socketpair(
+                socket.AF_UNIX, socket.SOCK_DGRAM
+            )
+
+            # Fork a child process
+            child_pid = os.fork()
+
+            # If is in the child process
+            if child_pid == 0:
+                # Close the fork server's end
+                control_sock.close()
+
+                # Run the program, never return
+                self._run_fork_server_child(child_control_sock)
+
+            # Close the child process's end
+            child_control_sock.close()
+
+            try:
+                # Wait for the child process to exit
+                exit_code = self._wait_fork_server_child(child_pid)
+
+                # Receive reload request sent before the child process
+                # exited
+                is_reload = self._receive_fork_server_reload(control_sock)
+
+            finally:
+                # Close the control socket
+                control_sock.close()
+
+            # If the child process does not request reload
+            if not is_reload:
+                # Exit with the child process's exit code
+                sys.exit(exit_code)
+
+    def _receive_fork_server_reload(self, control_sock):
+        """
+        Receive reload request from the exited child process, and replace \
+        registered listening sockets with the ones passed with the request.
+
+        :param control_sock:
+            The fork server's end of the control socket pair.
+
+        :return:
+            Whether the child process requested reload.
+        """
+        # Do not block if the child process did not send a request
+        control_sock.setblocking(False)
+
+        # File descriptors passed with the request
+        fds = []
+
+        try:
+            # If can receive file descriptors, in Python 3.3+
+            if hasattr(control_sock, 'recvmsg'):
+                # Receive the request and file descriptors
+                data, ancdata, _, _ = control_sock.recvmsg(
+                    65536, socket.CMSG_SPACE(64 * 4)
+                )
+
+                # For each ancillary data item
+                for level, cmsg_type, cmsg_data in ancdata:
+                    # If is file descriptors
+                    if level == socket.SOL_SOCKET \
+                            and cmsg_type == socket.SCM_RIGHTS:
+                        # Get file descriptors, 4 bytes each
+                        fds.extend(
+                            struct.unpack(
+                                '{}i'.format(len(cmsg_data) // 4),
+                                cmsg_data[:len(cmsg_data) // 4 * 4],
+                            )
+                        )
+
+            # If can not receive file descriptors
+            else:
+                # Receive the request
+                data = control_sock.recv(65536)
+
+        # If have error, e.g. no request was sent
+        except socket.error:
+            # Not reload
+            return False
+
+        try:
+            # Get dict that maps socket name to list of file descriptor index,
+            # address family and socket type
+            sock_info_s = json.loads(data.decode('utf-8'))
+
+            # Dict that maps socket name to socket object
+            new_sockets = {}
+
+            # For each socket name and info
+            for name, (index, family, sock_type) in sock_info_s.items():
+                # If the file descriptor is passed
+                if index < len(fds):
+                    # Create socket object, which duplicates the file
+                    # descriptor
+                    new_sockets[name] = socket.fromfd(
+                        fds[index], family, sock_type
+                    )
+
+        # If the request is not valid
+        except (ValueError, TypeError):
+            # Treat as reload without sockets
+            new_sockets = {}
+
+        finally:
+            # For each received file descriptor
+            for fd in fds:
+                # Close the file descriptor
+                os.close(fd)
+
+        # For each old socket
+        for sock in self._sockets.values():
+            # Close the socket
+            sock.close()
+
+        # Store the new sockets
+        self._sockets = new_sockets
+
+        # If not have sockets
+        if not new_sockets:
+            # Remove socket infos from env dict
+            os.environ.pop(self.LISTEN_FDS_ENV_KEY, None)
+
+        # Return reload
+        return True
+
+    def _wait_fork_server_child(self, child_pid):
+        """
+        Wait for given child process to exit.
+
+        :param child_pid:
+            Child process ID.
+
+        :return:
+            Child process's exit code.
+        """
+        # Run in a loop
+        while True:
+            try:
+                # Wait for the child process to exit
+                _, status = os.waitpid(child_pid, 0)
+
+                # Stop waiting
+                break
+
+            # If have `KeyboardInterrupt`.
+            #
+            # The child process in the same process group gets it too.
+            #
+            except KeyboardInterrupt:
+                # Keep waiting for the child process to exit
+                continue
+
+        # If the child process exited normally
+        if os.WIFEXITED(status):
+            # Return the exit code
+            return os.WEXITSTATUS(status)
+
+        # If the child process was killed by a signal
+        else:
+            # Return shell-style exit code
+            return 128 + os.WTERMSIG(status)
+
+    def _run_fork_server_child(self, control_sock):
+        """
+        Run the program in a child process forked by the fork server.
+
+        :param control_sock:
+            The child process's end of the control socket pair. Kept open \
+            until the child process exits.
+
+        :return:
+            Not return. Exit the child process.
+        """
+        # Mark the process as a child process, and pass the control socket.
+        #
+        # This is seen by the reloader created when the program runs again.
+        #
+        os.environ[self.FORK_SERVER_CHILD_ENV_KEY] = \
+            str(control_sock.fileno())
+
+        # For each socket registered in the fork server
+        for sock in self._sockets.values():
+            # Detach the socket object without closing the file descriptor,
+            # which is passed to the program using env dict and closed by
+            # `get_inherited_socket`
+            sock.detach()
+
+        # Clear registered sockets, which are not used by this reloader
+        self._sockets = {}
+
+        # Get names of preloaded modules
+        preload_module_name_s = set(self._preload_modules)
+
+        # For each loaded module
+        for module_name, module in list(sys.modules.items()):
+            # If the module is preloaded, or is the main module
+            if module_name in preload_module_name_s \
+                    or module_name == '__main__':
+                # Keep the module
+                continue
+
+            # Get module file path
+            module_file_path = self._get_module_file_path(module)
+
+            # If the module is in a watched directory
+            if module_file_path is not None and self._path_filter.match(
+                os.path.dirname(module_file_path)
+            ):
+                # Remove the module so that it is imported again
+                del sys.modules[module_name]
+
+        # Exit code
+        exit_code = 0
+
+        try:
+            # Get main module's spec.
+            #
+            # It is not None if the program was run using `python -m`.
+            #
+            main_spec = getattr(sys.modules['__main__'], '__spec__', None)
+
+            # If the program was run using `python -m`
+            if main_spec is not None:
+                # Run the main module again
+                runpy.run_module(
+                    main_spec.name, run_name='__main__', alter_sys=True
+                )
+
+            # If the program was run using a file path
+            else:
+                # Run the main file again
+                runpy.run_path(sys.argv[0], run_name='__main__')
+
+        # If have `SystemExit`
+        except SystemExit as exc:
+            # Get exit code
+            exit_code = exc.code
+
+            # If the exit code is None
+            if exit_code is None:
+                # Use 0
+                exit_code = 0
+
+            # If the exit code is not integer, e.g. an error message
+            elif not isinstance(exit_code, int):
+                # Print the error message
+                sys.stderr.write('{}\n'.format(exit_code))
+
+                # Use 1
+                exit_code = 1
+
+        # If have other error
+        except BaseException:  # pylint: disable=broad-except
+            # Print traceback
+            traceback.print_exc()
+
+            # Use 1
+            exit_code = 1
+
+        # Exit the child process
+        self._exit_fork_server_child(exit_code)
+
+    def _exit_fork_server_child(self, exit_code):
+        """
+        Exit the child process forked by the fork server immediately.
+
+        :param exit_code:
+            Exit code.
+
+        :return:
+            Not return.
+        """
+        # Flush standard streams because `os._exit` does not
+        sys.stdout.flush()
+
+        # Flush standard streams because `os._exit` does not
+        sys.stderr.flush()
+
+        # Exit immediately, without running code of the fork server's stack
+        os._exit(exit_code)  # pylint: disable=protected-access
+
+    def watch(self):
+        """
+        Create a coroutine that watches for module file changes on the \
+        running asyncio event loop. Requires Python 3.5+.
+
+        Usage:
+        ```
+        await reloader.watch()
+        ```
+        or:
+        ```
+        loop.create_task(reloader.watch())
+        ```
+
+        On Linux, inotify events are read by an event loop reader callback \
+        so no watcher thread or watchdog observer thread is used. Debounce \
+        timers and reloads are scheduled on the event loop.
+
+        In `spawn_exit` and `spawn_wait` modes, the coroutine spawns the \
+        new process and raises `SystemExit` to end the program, instead of \
+        interrupting the main thread.
+
+        Not supported in `fork_server` and `blue_green` modes.
+
+        :return:
+            Coroutine object.
+        """
+        # Import here because the module requires Python 3.5+
+        from .asyncio_watcher import watch
+
+        # Return coroutine object
+        return watch(self)
+
+    def _is_daemon_thread(self):
+        """
+        Get whether threads that may call `reload` should be daemon.
+
+        :return:
+            Boolean.
+        """
+        # If the reload mode is `spawn_wait`
+        if self._reload_mode == self.RELOAD_MODE_V_SPAWN_WAIT:
+            # Use non-daemon thread
+            return False
+
+        # If the reload mode is `in_process` and may fall back to
+        # `spawn_wait`
+        elif self._reload_mode == self.RELOAD_MODE_V_IN_PROCESS and \
+                self._fallback_reload_mode == self.RELOAD_MODE_V_SPAWN_WAIT:
+            # Use non-daemon thread
+            return False
+
+        # If none of above
+        else:
+            # Use daemon thread
+            return True
+
+    def run_watcher(self):
+        """
+        Watcher thread's function.
+
+        :return:
+            None.
+        """
+        # Create observer
+        observer = self._create_observer()
+
+        # Start observer
+        observer.start()
+
+        # Dict that maps file path to `watch object`
+        watche_obj_map = {}
+
+        # Run change check in a loop
+        while not self._watcher_to_stop:
+            # Run change check
+            is_changed = self._run_watcher_tick(observer, watche_obj_map)
+
+            # If backend is `polling` or `daemon`
+            if self._backend in (
+                self.BACKEND_V_POLLING, self.BACKEND_V_DAEMON
+            ):
+                # Poll watched directories
+                self._poll_observer(observer)
+
+            # Get next check interval
+            interval = self._get_next_interval(is_changed)
+
+            # Sleep before next check, or until woken up
+            self._watcher_wake_event.wait(interval)
+
+            # Clear the event for next sleep
+            self._watcher_wake_event.clear()
+
+        # Stop observer
+        observer.stop()
+
+        # If have import hook finder
+        if self._import_hook_finder is not None:
+            # Uninstall the import hook finder
+            self._uninstall_import_hook()
+
+    def stop_watcher(self):
+        """
+        Stop the watcher thread after its current check.
+
+        :return:
+            None.
+        """
+        # Set stop flag
+        self._watcher_to_stop = True
+
+        # Wake up the watcher's sleep
+        self._wake_watcher()
+
+    def _wake_watcher(self):
+        """
+        Wake up the watcher thread's sleep, or `watch`'s sleep if watching \
+        on an event loop.
+
+        :return:
+            None.
+        """
+        # Wake up the watcher thread's sleep
+        self._watcher_wake_event.set()
+
+        # Get event loop `watch` runs on
+        loop = self._async_loop
+
+        # Get `watch`'s wake event
+        async_wake_event = self._async_wake_event
+
+        # If is watching on an event loop
+        if loop is not None and async_wake_event is not None:
+            # Wake up `watch`'s sleep, in the event loop's thread
+            loop.call_soon_threadsafe(async_wake_event.set)
+
+    def _get_next_interval(self, is_changed):
+        """
+        Get the interval to sleep before next check.
+
+        The interval is doubled after each idle check up to \
+        `max_interval`, and goes back to `min_interval` after file changes \
+        or newly watched paths.
+
+        :param is_changed:
+            Whether watch paths are changed in the check.
+
+        :return:
+            Interval in seconds.
+        """
+        # Get number of file change events
+        change_event_count = self._change_event_count
+
+        # If have file changes since last check, or watch paths are changed
+        if is_changed or \
+                change_event_count != self._checked_change_event_count:
+            # Use minimum interval
+            self._current_interval = self._min_interval
+
+        # If is idle
+        else:
+            # Back off, up to maximum interval
+            self._current_interval = min(
+                self._current_interval * self.INTERVAL_BACKOFF_FACTOR,
+                self._max_interval,
+            )
+
+        # Store number of file change events
+        self._checked_change_event_count = change_event_count
+
+        # Return the interval
+        return self._current_interval
+
+    def _create_observer(self):
+        """
+        Create observer of the backend.
+
+        :return:
+            Observer object that has watchdog observer's `start`, `stop`, \
+            `schedule` and `unschedule` methods.
+        """
+        # If backend is `inotify`
+        if self._backend == self.BACKEND_V_INOTIFY:
+            # Return inotify observer
+            return inotify.InotifyObserver()
+
+        # If backend is `polling`
+        elif self._backend == self.BACKEND_V_POLLING:
+            # Return polling observer
+            return polling.PollingObserver()
+
+        # If backend is `daemon`
+        elif self._backend == self.BACKEND_V_DAEMON:
+            # Import here so that the module can be run by
+            # `python -m aoiklivereload.daemon` without being imported by
+            # the package first
+            from .daemon import DaemonObserver
+
+            # Return watcher daemon observer
+            return DaemonObserver(
+                socket_path=self._daemon_socket_path,
+            )
+
+        # If backend is `watchdog`
+        else:
+            # Return watchdog observer
+            return Observer()
+
+    def _poll_observer(self, observer):
+        """
+        Poll watched directories in `polling` backend, or let the watcher \
+        daemon poll in `daemon` backend.
+
+        :param observer:
+            `PollingObserver` or `DaemonObserver` object.
+
+        :return:
+            None.
+        """
+        # Check loaded module files for in-place changes.
+        #
+        # Other files in watched directories are only checked for creation
+        # and removal, so that a poll costs one `stat` call per module file.
+        #
+        observer.track_files(self._module_file_paths)
+
+        # Check extra paths for in-place changes
+        observer.track_files(self._extra_paths)
+
+        # Poll watched directories
+        observer.check()
+
+    def _run_watcher_tick(self, observer, watche_obj_map):
+        """
+        Run one change check of watch paths, and schedule or unschedule \
+        watches accordingly.
+
+        :param observer:
+            Observer object that has watchdog observer's `schedule` and \
+            `unschedule` methods.
+
+        :param watche_obj_map:
+            Dict that maps file path to `watch object`. Updated in place.
+
+        :return:
+            Whether watch paths are changed.
+        """
+        # Whether watch recursively
+        is_recursive = (self._watch_mode == self.WATCH_MODE_V_RECURSIVE)
+
+        # If use watch state cache
+        if self._cache_path is not None:
+            # Load or reconcile cached module file paths
+            cache_state = self._update_cache()
+
+        # If not use watch state cache
+        else:
+            # No cache state change
+            cache_state = None
+
+        # If discovery mode is `import_hook`
+        if self._discovery_mode == self.DISCOVERY_MODE_V_IMPORT_HOOK:
+            # Get new watch paths, or None if not changed
+            new_watch_path_s = self._find_watch_paths_incrementally()
+
+            # If cached module file paths are just reconciled, and the
+            # import hook is installed
+            if cache_state == 'reconciled' and new_watch_path_s is None:
+                # Rescan to remove cached module file paths not imported
+                self._watch_dir_paths = self._find_watch_dir_paths()
+
+                # Get final watch paths
+                new_watch_path_s = self._get_final_watch_paths(
+                    self._watch_dir_paths
+                )
+
+        # If discovery mode is not `import_hook`
+        else:
+            # Get new watch paths
+            new_watch_path_s = self._find_watch_paths()
+
+        # If watched module files are changed
+        if self._module_file_paths_changed:
+            # If relevance mode is `module`
+            if self._relevance_mode == self.RELEVANCE_MODE_V_MODULE:
+                # List directories of newly imported packages
+                self._update_package_dir_listings()
+
+            # If need verify content
+            if self._verify_content:
+                # Update fingerprints
+                self._update_fingerprints()
+
+            # Clear the flag
+            self._module_file_paths_changed = False
+
+        # If cached module file paths are just reconciled
+        if cache_state == 'reconciled':
+            # Save watch state cache for next process
+            self._save_cache()
+
+        # If the watch paths are not changed
+        if new_watch_path_s is None \
+                or new_watch_path_s == self._watch_paths:
+            # Skip scheduling watches
+            return False
+
+        # Get current watch paths
+        old_watch_path_s = set(watche_obj_map)
+
+        # For each new watch path
+        for new_watch_path in new_watch_path_s:
+            # Remove from the old watch paths if exists
+            old_watch_path_s.discard(new_watch_path)
+
+            # If the new watch path was not watched
+            if new_watch_path not in watche_obj_map:
+                try:
+                    # Schedule a watch
+                    watch_obj = observer.schedule(
+                        # 2KGRW
+                        # `FileSystemEventHandler` instance
+                        self,
+                        # File path to watch
+                        new_watch_path,
+                        # Whether recursive
+                        recursive=is_recursive,
+                    )
+
+                    # Store the watch obj
+                    watche_obj_map[new_watch_path] = watch_obj
+
+                # If have error
+                except OSError:
+                    # Set the watch object be None
+                    watche_obj_map[new_watch_path] = None
+
+        # For each old watch path that is not in the new watch paths
+        for old_watch_path in old_watch_path_s:
+            # Get watch object
+            watch_obj = watche_obj_map.pop(old_watch_path, None)
+
+            # If have watch object
+            if watch_obj is not None:
+                # Unschedule the watch
+                observer.unschedule(watch_obj)
+
+        # Build and store new watch paths' prefix index
+        self._watch_path_index = self._build_path_index(
+            paths=new_watch_path_s,
+            recursive=is_recursive,
+        )
+
+        # Store new watch paths
+        self._watch_paths = new_watch_path_s
+
+        # Store number of watches in use
+        self._watch_count = sum(
+            1 for x in watche_obj_map.values() if x is not None
+        )
+
+        # Return changed
+        return True
+
+    def get_watch_count(self):
+        """
+        Get number of watches in use.
+
+        In `recursive` watch mode, each watch covers a directory tree and \
+        the OS may use one watch per sub-directory internally.
+
+        In `precise` watch mode, each watch covers one directory.
+
+        :return:
+            Number of watches in use.
+        """
+        # Return number of watches in use
+        return self._watch_count
+
+    def _find_watch_paths(self):
+        """
+        Find paths to watch.
+
+        :return:
+            Paths to watch.
+        """
+        # Find watch directory paths
+        watch_path_s = self._find_watch_dir_paths()
+
+        # Get final watch paths
+        watch_path_s = self._get_final_watch_paths(watch_path_s)
+
+        # Return the watch paths
+        return watch_path_s
+
+    def _get_final_watch_paths(self, dir_paths):
+        """
+        Get final watch paths from watch directory paths.
+
+        :param dir_paths:
+            Watch directory paths.
+
+        :return:
+            Set of final watch paths.
+        """
+        # If watch mode is `precise`
+        if self._watch_mode == self.WATCH_MODE_V_PRECISE:
+            # Watch each directory as is
+            return set(dir_paths)
+
+        # If watch mode is not `precise`.
+        #
+        # Find short paths of these watch paths.
+        # E.g. if both `/home` and `/home/aoik` exist, only keep `/home`.
+        #
+        return self._find_short_paths(dir_paths)
+
+    def _find_watch_dir_paths(self):
+        """
+        Find directory paths to watch, before finding short paths.
+
+        Watched module file paths are stored to `_module_file_paths` too.
+
+        :return:
+            Set of directory paths to watch.
+        """
+        # If watch mode is `recursive`
+        if self._watch_mode == self.WATCH_MODE_V_RECURSIVE:
+            # Add directory paths in `sys.path` to watch paths
+            watch_path_s = self._filter_paths(
+                os.path.abspath(x) for x in sys.path
+            )
+
+        # If watch mode is not `recursive`
+        else:
+            # Watch only module directories and extra paths' directories
+            watch_path_s = set()
+
+        # For each extra path
+        for extra_path in self._extra_paths or ():
+            # Get the extra path's directory path
+            extra_dir_path = os.path.dirname(os.path.abspath(extra_path))
+
+            # Add to watch paths
+            watch_path_s.add(extra_dir_path)
+
+        # Watched module file paths
+        module_file_path_s = set()
+
+        # Get loaded module file paths
+        module_file_paths = self._get_module_file_paths()
+
+        # If have module file paths loaded from watch state cache
+        if self._cached_module_file_paths:
+            # Watch them too until reconciled
+            module_file_paths = list(module_file_paths) + \
+                list(self._cached_module_file_paths)
+
+        # For each module file path
+        for module_file_path in module_file_paths:
+            # Get module directory path
+            module_dir_path = os.path.dirname(module_file_path)
+
+            # If the module directory should be watched
+            if self._path_filter.match(module_dir_path):
+                # Add to watch paths
+                watch_path_s.add(module_dir_path)
+
+                # Add to watched module file paths
+                module_file_path_s.add(module_file_path)
+
+        # If watched module file paths are changed
+        if module_file_path_s != self._module_file_paths:
+            # Store watched module file paths
+            self._module_file_paths = module_file_path_s
+
+            # Set the flag
+            self._module_file_paths_changed = True
+
+        # Return the watch paths
+        return watch_path_s
+
+    def _get_module_file_paths(self):
+        """
+        Get loaded modules' source file paths.
+
+        :return:
+            List of module file paths.
+        """
+        # Module file paths
+        module_file_paths = []
+
+        # For each module in `sys.modules`
+        for module in list(sys.modules.values()):
+            # Get module file path
+            module_file_path = self._get_module_file_path(module)
+
+            # If have module file path
+            if module_file_path is not None:
+                # Add to module file paths
+                module_file_paths.append(module_file_path)
+
+        # Return module file paths
+        return module_file_paths
+
+    def _filter_paths(self, paths):
+        """
+        Filter given paths using the path filter.
+
+        :param paths:
+            Absolute paths.
+
+        :return:
+            Set of paths that should be watched.
+        """
+        # Get match function
+        match = self._path_filter.match
+
+        # Return paths that should be watched
+        return set(x for x in paths if match(x))
+
+    def _get_module_file_path(self, module):
+        """
+        Get given module's source file path.
+
+        :param module:
+            Module object.
+
+        :return:
+            Module file's absolute path, or None if the module has no file \
+            path.
+        """
+        # Return module file path
+        return get_module_file_path(module)
+
+    def _find_watch_paths_incrementally(self):
+        """
+        Find paths to watch, using modules recorded by the import hook.
+
+        Used in `import_hook` discovery mode.
+
+        The first call installs the import hook and scans `sys.modules`. \
+        Later calls only look up modules imported since last call.
+
+        :return:
+            Paths to watch, or None if not changed since last call.
+        """
+        # If the import hook is not installed
+        if self._import_hook_finder is None:
+            # Install the import hook before scanning so that no module
+            # imported in between is missed
+            self._install_import_hook()
+
+            # Take `sys.path` snapshot
+            self._sys_path_snapshot = tuple(sys.path)
+
+            # Scan for watch directory paths
+            self._watch_dir_paths = self._find_watch_dir_paths()
+
+            # Return final watch paths
+            return self._get_final_watch_paths(self._watch_dir_paths)
+
+        # Whether watch directory paths are changed
+        is_changed = False
+
+        # If watch mode is `recursive` and `sys.path` is changed
+        if self._watch_mode == self.WATCH_MODE_V_RECURSIVE \
+                and tuple(sys.path) != self._sys_path_snapshot:
+            # Take `sys.path` snapshot
+            self._sys_path_snapshot = tuple(sys.path)
+
+            # For each directory path in `sys.path`
+            for dir_path in self._sys_path_snapshot:
+                # Get absolute path
+                dir_path = os.path.abspath(dir_path)
+
+                # If the directory path is new, and it should be watched
+                if dir_path not in self._watch_dir_paths \
+                        and self._path_filter.match(dir_path):
+                    # Add to watch directory paths
+                    self._watch_dir_paths.add(dir_path)
+
+                    # Set the flag
+                    is_changed = True
+
+        # Get recorded module names
+        module_names = self._import_hook_finder.pop_module_names()
+
+        # Get pending module names' retry counts
+        retry_counts = self._pending_module_names
+
+        # If have pending module names
+        if retry_counts:
+            # Add pending module names
+            module_names.extend(retry_counts)
+
+            # Clear pending module names
+            self._pending_module_names = {}
+
+        # For each module name
+        for module_name in module_names:
+            # Get module
+            module = sys.modules.get(module_name, None)
+
+            # If the module is not in `sys.modules`.
+            #
+            # The module is about to be imported, or failed to import.
+            #
+            if module is None:
+                # Get number of retries so far
+                retry_count = retry_counts.get(module_name, 0)
+
+                # If have retries left
+                if retry_count < self.PENDING_MODULE_RETRY_COUNT:
+                    # Retry in next call
+                    self._pending_module_names[module_name] = \
+                        retry_count + 1
+
+                # Skip
+                continue
+
+            # Get module file path
+            module_file_path = self._get_module_file_path(module)
+
+            # If not have module file path
+            if module_file_path is None:
+                # Skip
+                continue
+
+            # Get module directory path
+            module_dir_path = os.path.dirname(module_file_path)
+
+            # If the module directory should not be watched
+            if not self._path_filter.match(module_dir_path):
+                # Skip
+                continue
+
+            # If the module file path is new
+            if module_file_path not in self._module_file_paths:
+                # Add to watched module file paths
+                self._module_file_paths.add(module_file_path)
+
+                # Set the flag
+                self._module_file_paths_changed = True
+
+            # If the module directory path is new
+            if module_dir_path not in self._watch_dir_paths:
+                # Add to watch directory paths
+                self._watch_dir_paths.add(module_dir_path)
+
+                # Set the flag
+                is_changed = True
+
+        # If watch directory paths are not changed
+        if not is_changed:
+            # Return None
+            return None
+
+        # Return final watch paths
+        return self._get_final_watch_paths(self._watch_dir_paths)
+
+    @staticmethod
+    def get_default_cache_dir():
+        """
+        Get default watch state cache directory of current user.
+
+        :return:
+            Directory path.
+        """
+        # If is in Windows
+        if sys.platform == 'win32':
+            # Use local app data directory
+            base_dir = os.environ.get('LOCALAPPDATA', None) or \
+                os.path.expanduser('~')
+
+        # If is not in Windows
+        else:
+            # Use XDG cache directory
+            base_dir = os.environ.get('XDG_CACHE_HOME', None) or \
+                os.path.join(os.path.expanduser('~'), '.cache')
+
+        # Return directory path
+        return os.path.join(base_dir, 'aoiklivereload')
+
+    def _update_cache(self):
+        """
+        Load watch state cache on first call, and reconcile cached module \
+        file paths after `CACHE_RECONCILE_DELAY` seconds.
+
+        :return:
+            'loaded' if the cache is just loaded, 'reconciled' if cached \
+            module file paths are just reconciled, otherwise None.
+        """
+        # If the cache is not loaded
+        if self._cache_load_time is None:
+            # Store load time
+            self._cache_load_time = _monotonic()
+
+            # Load the cache
+            self._load_cache()
+
+            # Return state
+            return 'loaded'
+
+        # If cached module file paths are not reconciled, and reconcile
+        # delay has passed
+        if not self._is_cache_reconciled and \
+                _monotonic() - self._cache_load_time \
+                >= self.CACHE_RECONCILE_DELAY:
+            # Set the flag
+            self._is_cache_reconciled = True
+
+            # Stop watching cached module file paths not imported
+            self._cached_module_file_paths = set()
+
+            # Return state
+            return 'reconciled'
+
+        # Return no state change
+        return None
+
+    def _load_cache(self):
+        """
+        Load watch state cache.
+
+        Module file paths that no longer exist or are not allowed by the \
+        path filter are dropped. Fingerprints are dropped if the file's \
+        size or modification time has changed.
+
+        :return:
+            None.
+        """
+        try:
+            # Open the cache file
+            with open(self._cache_path, 'rb') as file_obj:
+                # Load cache data
+                cache_data = marshal.load(file_obj)
+
+        # If have error, e.g. the cache file does not exist or is corrupt
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            # Ignore
+            return
+
+        # If the cache data is not of current version
+        if not isinstance(cache_data, dict) \
+                or cache_data.get('version', None) != self.CACHE_VERSION:
+            # Ignore
+            return
+
+        # Get path filter's match function
+        match = self._path_filter.match
+
+        # For each cached module file path
+        for module_file_path in cache_data.get('module_file_paths', ()):
+            # If the module directory should be watched.
+            #
+            # Non-existing paths are not matched by the path filter.
+            #
+            if match(os.path.dirname(module_file_path)) \
+                    and os.path.isfile(module_file_path):
+                # Add to cached module file paths
+                self._cached_module_file_paths.add(module_file_path)
+
+        # If not need verify content
+        if not self._verify_content:
+            # Skip fingerprints
+            return
+
+        # For each cached fingerprint
+        for file_path, fingerprint in \
+                cache_data.get('fingerprints', {}).items():
+            try:
+                # Get file status
+                stat_obj = os.stat(file_path)
+
+            # If have error, e.g. the file is deleted
+            except OSError:
+                # Skip
+                continue
+
+            # If size and modification time are not changed
+            if stat_obj.st_size == fingerprint[0] \
+                    and _get_mtime_ns(stat_obj) == fingerprint[1]:
+                # Reuse the fingerprint without reading the file
+                self._fingerprints.setdefault(file_path, tuple(fingerprint))
+
+    def _save_cache(self):
+        """
+        Save watch state cache, atomically.
+
+        :return:
+            None.
+        """
+        # If not use watch state cache
+        if self._cache_path is None:
+            # Return
+            return
+
+        # Get module file paths
+        module_file_paths = sorted(self._module_file_paths)
+
+        # Create cache data
+        cache_data = {
+            'version': self.CACHE_VERSION,
+            'module_file_paths': module_file_paths,
+            'fingerprints': dict(
+                (x, self._fingerprints[x]) for x in module_file_paths
+                if x in self._fingerprints
+            ) if self._verify_content else {},
+        }
+
+        # Temporary file path
+        tmp_path = None
+
+        try:
+            # If the cache directory does not exist
+            if not os.path.isdir(self._cache_dir):
+                # Create the cache directory
+                os.makedirs(self._cache_dir)
+
+            # Create temporary file in the cache directory
+            tmp_fd, tmp_path = tempfile.mkstemp(
+                prefix='.watch_state_', dir=self._cache_dir
+            )
+
+            # Open the temporary file
+            with os.fdopen(tmp_fd, 'wb') as file_obj:
+                # Write cache data
+                marshal.dump(cache_data, file_obj)
+
+            # Replace the cache file, atomically.
+            #
+            # `os.replace` is available in Python 3.3+.
+            #
+            getattr(os, 'replace', os.rename)(tmp_path, self._cache_path)
+
+        # If have error
+        except (IOError, OSError) as exc:
+            # Log message
+            _LOGGER.warning(
+                'Failed to save watch state cache %s: %s',
+                self._cache_path,
+                exc,
+            )
+
+            # If have temporary file
+            if tmp_path is not None and os.path.exists(tmp_path):
+                try:
+                    # Remove the temporary file
+                    os.remove(tmp_path)
+
+                # If have error
+                except OSError:
+                    # Ignore
+                    pass
+
+    def _update_package_dir_listings(self):
+        """
+        List directories of imported packages that are not listed yet, so \
+        that new files in them can be told in `module` relevance mode.
+
+        :return:
+            None.
+        """
+        # Get package directory listings dict
+        listings = self._package_dir_listings
+
+        # For each watched module file path
+        for module_file_path in list(self._module_file_paths):
+            # Get module directory path and file name
+            module_dir_path, module_file_name = \
+                os.path.split(module_file_path)
+
+            # If the module is not a package, or the package directory has
+            # been listed
+            if module_file_name != '__init__.py' \
+                    or module_dir_path in listings:
+                # Skip
+                continue
+
+            try:
+                # List the package directory
+                file_names = os.listdir(module_dir_path)
+
+            # If have error, e.g. the directory has been removed
+            except OSError:
+                # Use empty listing
+                file_names = []
+
+            # Store the listing
+            listings[module_dir_path] = frozenset(file_names)
+
+    def _is_relevant_file(self, file_path):
+        """
+        Get whether given changed `.py` file is relevant to the current \
+        process, in `module` relevance mode.
+
+        :param file_path:
+            File path.
+
+        :return:
+            Whether the file is a loaded module file, or a new file in an \
+            imported package's directory.
+        """
+        # If the file is a loaded module file
+        if file_path in self._module_file_paths:
+            # Return relevant
+            return True
+
+        # Get file's directory path and file name
+        file_dir, file_name = os.path.split(file_path)
+
+        # Get the directory's listing if the directory is an imported
+        # package's directory
+        listing = self._package_dir_listings.get(file_dir, None)
+
+        # If the directory is not an imported package's directory
+        if listing is None:
+            # Return not relevant
+            return False
+
+        # Return whether the file is new
+        return file_name not in listing
+
+    def _update_fingerprints(self):
+        """
+        Take fingerprints of watched module files and extra files that have \
+        no fingerprints yet.
+
+        :return:
+            None.
+        """
+        # Clear the flag
+        self._module_file_paths_changed = False
+
+        # Get fingerprints dict
+        fingerprints = self._fingerprints
+
+        # For each watched file path
+        for file_path in list(self._module_file_paths) + \
+                list(self._extra_paths):
+            # If the file has no fingerprint yet
+            if file_path not in fingerprints:
+                # Get fingerprint
+                fingerprint = get_file_fingerprint(file_path)
+
+                # If have fingerprint
+                if fingerprint is not None:
+                    # Store fingerprint
+                    fingerprints[file_path] = fingerprint
+
+    def _is_content_changed(self, file_path):
+        """
+        Test whether given file's content has changed since its fingerprint \
+        was taken. The fingerprint is updated.
+
+        :param file_path:
+            File path.
+
+        :return:
+            Boolean. True if the file has no fingerprint.
+        """
+        # Get old fingerprint
+        old_fingerprint = self._fingerprints.get(file_path, None)
+
+        # If not have old fingerprint
+        if old_fingerprint is None:
+            # Treat as changed
+            return True
+
+        try:
+            # Get file status
+            stat_obj = os.stat(file_path)
+
+        # If have error, e.g. the file is deleted
+        except OSError:
+            # Remove old fingerprint
+            self._fingerprints.pop(file_path, None)
+
+            # Treat as changed
+            return True
+
+        # Get modification time in nanoseconds
+        mtime_ns = _get_mtime_ns(stat_obj)
+
+        # If size and modification time are not changed, and the
+        # modification time is old enough that a write in the same
+        # timestamp tick as the fingerprint is not possible.
+        #
+        # A write right after the fingerprint was taken may keep the same
+        # modification time, so a recent one does not prove the content is
+        # not changed.
+        #
+        if stat_obj.st_size == old_fingerprint[0] \
+                and mtime_ns == old_fingerprint[1] \
+                and time.time() * 1000000000 - mtime_ns \
+                > self.MTIME_RESOLUTION * 1000000000:
+            # Treat as not changed without reading the file
+            return False
+
+        # Get new fingerprint
+        new_fingerprint = get_file_fingerprint(file_path)
+
+        # If not have new fingerprint
+        if new_fingerprint is None:
+            # Remove old fingerprint
+            self._fingerprints.pop(file_path, None)
+
+            # Treat as changed
+            return True
+
+        # Store new fingerprint
+        self._fingerprints[file_path] = new_fingerprint
+
+        # Return whether size or content digest is changed
+        return new_fingerprint[0] != old_fingerprint[0] \
+            or new_fingerprint[2] != old_fingerprint[2]
+
+    def _install_import_hook(self):
+        """
+        Install the import hook finder to the front of `sys.meta_path`.
+
+        :return:
+            None.
+        """
+        # Create import hook finder
+        self._import_hook_finder = ImportHookFinder()
+
+        # Insert to the front so that it sees every import
+        sys.meta_path.insert(0, self._import_hook_finder)
+
+    def _uninstall_import_hook(self):
+        """
+        Uninstall the import hook finder from `sys.meta_path`.
+
+        :return:
+            None.
+        """
+        try:
+            # Remove the import hook finder
+            sys.meta_path.remove(self._import_hook_finder)
+
+        # If the import hook finder has been removed by others
+        except ValueError:
+            # Ignore
+            pass
+
+        # Clear the import hook finder
+        self._import_hook_finder = None
+
+    def _find_short_paths(self, paths):
+        """
+        Find short paths of given paths.
+
+        E.g. if both `/home` and `/home/aoik` exist, only keep `/home`.
+
+        :param paths:
+            Paths.
+
+        :return:
+            Set of short paths.
+        """
+        # Split each path to parts.
+        # E.g. '/home/aoik' to ['', 'home', 'aoik']
+        path_parts_s = [path.split(os.path.sep) for path in paths]
+
+        # Root node
+        root_node = {}
+
+        # Sort these path parts by length, with the longest being the first.
+        #
+        # Longer paths appear first so that their extra parts are discarded
+        # when a shorter path is found at 5TQ8L.
+        #
+        # Then for each path's parts.
+        for parts in sorted(path_parts_s, key=len, reverse=True):
+            # Start from the root node
+            node = root_node
+
+            # For each part of the path
+            for part in parts:
+                # Create node of the path
+                node = node.setdefault(part, {})
+
+            # 5TQ8L
+            # Clear the last path part's node's child nodes.
+            #
+            # This aims to keep only the shortest path that needs be watched.
+            #
+            node.clear()
+
+        # Short paths
+        short_path_s = set()
+
+        # Collect leaf paths
+        self._collect_leaf_paths(
+            node=root_node,
+            path_parts=(),
+            leaf_paths=short_path_s,
+        )
+
+        # Return short paths
+        return short_path_s
+
+    def _collect_leaf_paths(self, node, path_parts, leaf_paths):
+        """
+        Collect paths of leaf nodes.
+
+        :param node:
+            Starting node. Type is dict.
+
+            Key is child node's path part. Value is child node.
+
+        :param path_parts:
+            The starting node's path parts. Type is tuple.
+
+        :param leaf_paths:
+            Leaf path list.
+
+        :return:
+            None.
+        """
+        # If the node is leaf node
+        if not node:
+            # Get node path
+            node_path = '/'.join(path_parts)
+
+            # Add to list
+            leaf_paths.add(node_path)
+
+        # If the node is not leaf node
+        else:
+            # For each child node
+            for child_path_part, child_node in node.items():
+                # Get the child node's path parts
+                child_path_part_s = path_parts + (child_path_part,)
+
+                # Visit the child node
+                self._collect_leaf_paths(
+                    node=child_node,
+                    path_parts=child_path_part_s,
+                    leaf_paths=leaf_paths,
+                )
+
+    @staticmethod
+    def _build_path_index(paths, recursive):
+        """
+        Build prefix index of given paths.
+
+        The index is a path part trie. Key is path part, value is child \
+        node. Key `None` marks the node of a given path, value is whether \
+        the path's descendant paths match too.
+
+        :param paths:
+            Paths.
+
+        :param recursive:
+            Whether a path's descendant paths match too.
+
+        :return:
+            Root node of the index. Type is dict.
+        """
+        # Root node
+        root_node = {}
+
+        # For each path
+        for path in paths:
+            # Start from the root node
+            node = root_node
+
+            # For each part of the path.
+            #
+            # Trailing separator is stripped so that root path `/` is split
+            # to [''].
+            #
+            for part in path.rstrip(os.path.sep).split(os.path.sep):
+                # Create node of the path
+                node = node.setdefault(part, {})
+
+            # Mark the node
+            node[None] = recursive
+
+        # Return root node
+        return root_node
+
+    @staticmethod
+    def _match_path_index(index, path):
+        """
+        Test whether given path matches prefix index.
+
+        Matching is on path part boundaries, e.g. index of `/srv/app` \
+        matches `/srv/app/x` but not `/srv/app2`.
+
+        :param index:
+            Root node of the index, created by `_build_path_index`.
+
+        :param path:
+            Path to test.
+
+        :return:
+            Boolean.
+        """
+        # Start from the root node
+        node = index
+
+        # For each part of the path
+        for part in path.split(os.path.sep):
+            # If the node's path matches recursively
+            if node.get(None, False):
+                # Return matched
+                return True
+
+            # Get child node
+            node = node.get(part, None)
+
+            # If not have child node
+            if node is None:
+                # Return not matched
+                return False
+
+        # Return whether the node's path is a given path
+        return None in node
+
+    def dispatch(self, event):
+        """
+        Dispatch file system event.
+
+        Callback called when there is a file system event. Hooked at 2KGRW.
+
+        This function overrides `FileSystemEventHandler.dispatch`.
+
+        :param event:
+            File system event object.
+
+        :return:
+            None.
+        """
+        # If the event is caused by reading the file, e.g. by a process
+        # importing the module.
+        #
+        # Event objects created by other code may not have event type.
+        #
+        if getattr(event, 'event_type', None) in self.READ_EVENT_TYPES:
+            # Ignore
+            return
+
+        # Dispatch the file path
+        self.dispatch_path(event.src_path)
+
+        # Get destination path of a move event
+        dest_path = getattr(event, 'dest_path', None)
+
+        # If have destination path, e.g. an editor renames a temporary file
+        # to the module file
+        if dest_path:
+            # Dispatch the destination path
+            self.dispatch_path(dest_path)
+
+    def dispatch_path(self, file_path):
+        """
+        Dispatch file system event's file path.
+
+        Called by `dispatch`, and by observers that do not create event \
+        objects.
+
+        :param file_path:
+            File path.
+
+        :return:
+            None.
+        """
+        # If the file path is in extra paths
+        if file_path in self._extra_paths:
+            # If not need verify content, or the content is changed
+            if not self._verify_content \
+                    or self._is_content_changed(file_path):
+                # Request reload
+                self._request_reload(file_path)
+
+            # Return
+            return
+
+        # If the file path ends with `.pyc` or `.pyo`
+        if file_path.endswith(('.pyc', '.pyo')):
+            # If the file is in `__pycache__`.
+            #
+            # It is a bytecode cache written when importing or precompiling
+            # modules, not a code change. Its name is not the source file
+            # name plus `c` either.
+            #
+            if os.path.basename(os.path.dirname(file_path)) == '__pycache__':
+                # Ignore
+                return
+
+            # Get `.py` file path
+            file_path = file_path[:-1]
+
+        # If the file path ends with `.py`
+        if file_path.endswith('.py'):
+            # Get the file's directory path
+            file_dir = os.path.dirname(file_path)
+
+            # If the file's directory path matches the watch paths.
+            #
+            # In `precise` watch mode, the directory path must be one of the
+            # watch paths. Otherwise it can be a descendant path as well.
+            #
+            if self._match_path_index(self._watch_path_index, file_dir):
+                # If the file path is excluded by the path filter.
+                #
+                # E.g. a virtualenv or site packages directory under a
+                # recursively watched directory.
+                #
+                if not self._path_filter.match_patterns(file_path):
+                    # Ignore the event
+                    return
+
+                # If relevance mode is `module`, and the file is not
+                # relevant to the current process
+                if self._relevance_mode == self.RELEVANCE_MODE_V_MODULE \
+                        and not self._is_relevant_file(file_path):
+                    # Ignore the event
+                    return
+
+                # If need verify content, and the content is not changed
+                if self._verify_content \
+                        and not self._is_content_changed(file_path):
+                    # Ignore the event
+                    return
+
+                # Request reload
+                self._request_reload(file_path)
+
+    def get_reload_event_count(self):
+        """
+        Get number of file change events coalesced into the last reload.
+
+        :return:
+            Number of events.
+        """
+        # Return number of events
+        return self._reload_event_count
+
+    def _request_reload(self, file_path):
+        """
+        Request reload due to a file change.
+
+        File changes within the debounce quiet window are coalesced into \
+        one reload.
+
+        :param file_path:
+            Changed file path.
+
+        :return:
+            None.
+        """
+        # Whether reload now
+        is_reload_now = False
+
+        # With the lock
+        with self._debounce_lock:
+            # If a reload has been started
+            if self._is_reloading:
+                # Ignore the file change
+                return
+
+            # Get current time
+            now = _monotonic()
+
+            # If this is the first file change in current burst
+            if self._debounce_event_count == 0:
+                # Store the first file change time
+                self._debounce_first_time = now
+
+                # Store the first file change's wall clock time
+                self._debounce_first_wall_time = time.time()
+
+            # Store the last file change time
+            self._debounce_last_time = now
+
+            # Increment number of events
+            self._debounce_event_count += 1
+
+            # Add to changed file paths
+            self._debounce_file_paths.add(file_path)
+
+            # Increment number of file change events since the watcher
+            # started
+            self._change_event_count += 1
+
+            # If the watcher thread is sleeping longer than minimum interval
+            if self._current_interval > self._min_interval:
+                # Wake up the watcher to find newly imported modules soon
+                self._wake_watcher()
+
+            # If debounce is disabled
+            if not self._debounce_interval or self._debounce_interval <= 0:
+                # Reload now
+                is_reload_now = True
+
+            # If debounce timer is not started
+            elif self._debounce_timer is None:
+                # Start debounce timer
+                self._start_debounce_timer(self._debounce_interval)
+
+        # If reload now
+        if is_reload_now:
+            # If is watching on an event loop
+            if self._async_loop is not None:
+                # Start reload on the event loop
+                self._async_loop.call_soon_threadsafe(self._start_reload)
+
+            # If is not watching on an event loop
+            else:
+                # Start reload
+                self._start_reload()
+
+    def _start_debounce_timer(self, delay):
+        """
+        Start debounce timer. Must be called with the debounce lock held.
+
+        :param delay:
+            Delay in seconds.
+
+        :return:
+            None.
+        """
+        # Get event loop
+        loop = self._async_loop
+
+        # If is watching on an event loop
+        if loop is not None:
+            # Mark debounce timer is started
+            self._debounce_timer = True
+
+            # Schedule the timer function on the event loop.
+            #
+            # `call_soon_threadsafe` is used because this may be called from
+            # the watcher thread.
+            #
+            loop.call_soon_threadsafe(
+                loop.call_later, delay, self._on_debounce_timer
+            )
+
+            # Return
+            return
+
+        # Create debounce timer
+        timer = threading.Timer(delay, self._on_debounce_timer)
+
+        # Set whether the thread is daemon
+        timer.daemon = self._is_daemon_thread()
+
+        # Store debounce timer
+        self._debounce_timer = timer
+
+        # Start debounce timer
+        timer.start()
+
+    def _on_debounce_timer(self):
+        """
+        Debounce timer's function.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._debounce_lock:
+            # Get current time
+            now = _monotonic()
+
+            # Get remaining time of the quiet window
+            remaining = self._debounce_last_time + self._debounce_interval \
+                - now
+
+            # If have max wait
+            if self._debounce_max_wait is not None:
+                # Get remaining time of the max wait
+                max_wait_remaining = self._debounce_first_time + \
+                    self._debounce_max_wait - now
+
+                # Use the smaller remaining time
+                remaining = min(remaining, max_wait_remaining)
+
+            # If need wait more
+            if remaining > 0:
+                # Restart debounce timer
+                self._start_debounce_timer(remaining)
+
+                # Return
+                return
+
+            # Clear debounce timer
+            self._debounce_timer = None
+
+        # Start reload
+        self._start_reload()
+
+    def _start_reload(self):
+        """
+        Start reload for file changes coalesced in current burst.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._debounce_lock:
+            # If a reload has been started
+            if self._is_reloading:
+                # Return
+                return
+
+            # Set the flag
+            self._is_reloading = True
+
+            # Store number of events coalesced into this reload
+            self._reload_event_count = self._debounce_event_count
+
+            # Store changed file paths coalesced into this reload
+            self._reload_file_paths = self._debounce_file_paths
+
+            # Reset number of events in current burst
+            self._debounce_event_count = 0
+
+            # Reset changed file paths in current burst
+            self._debounce_file_paths = set()
+
+            # Store reload times
+            self._reload_times = {
+                # The first file change's time
+                'event': self._debounce_first_wall_time,
+                # Reload decision time
+                'decision': time.time(),
+            }
+
+        # Call `reload`
+        self.reload()
+
+    def mark_ready(self):
+        """
+        Mark the current process is ready, e.g. the server is listening.
+
+        If the current process was started by a reload, report reload stats \
+        to the reload stats callback and log them in one line. In \
+        `blue_green` mode, also notify the previous process to exit.
+
+        Reload stats dict's keys:
+            - 'reload_mode': Reload mode.
+            - 'event_count': Number of file change events coalesced.
+            - 'event_time': Wall clock time of the first file change.
+            - 'decision_time': Wall clock time reload was decided.
+            - 'restart_time': Wall clock time the new process was started.
+            - 'import_time': Wall clock time this module was imported in \
+              the new process.
+            - 'ready_time': Wall clock time of `mark_ready`.
+            - 'debounce': Seconds from `event_time` to `decision_time`.
+            - 'prepare': Seconds from `decision_time` to `restart_time`.
+            - 'startup': Seconds from `restart_time` to `import_time`.
+            - 'app_init': Seconds from `import_time` to `ready_time`.
+            - 'total': Seconds from `event_time` to `ready_time`.
+
+        Not reported in `fork_server` mode.
+
+        :return:
+            Reload stats dict, or None if the current process was not started \
+            by a reload.
+        """
+        # Get ready pipe file descriptor passed from the previous process in
+        # `blue_green` mode.
+        #
+        # Popped so that readiness is reported only once.
+        #
+        ready_fd_text = os.environ.pop(self.READY_FD_ENV_KEY, None)
+
+        # If have ready pipe file descriptor
+        if ready_fd_text:
+            # Get file descriptor
+            ready_fd = int(ready_fd_text)
+
+            try:
+                # Notify the previous process
+                os.write(ready_fd, b'1')
+
+            # If have error, e.g. the previous process has exited
+            except OSError:
+                # Ignore
+                pass
+
+            finally:
+                # Close the pipe
+                os.close(ready_fd)
+
+        # Get reload times passed from the previous process.
+        #
+        # Popped so that it is reported only once.
+        #
+        times_text = os.environ.pop(self.RELOAD_TIMES_ENV_KEY, None)
+
+        # If not have reload times
+        if not times_text:
+            # Return None
+            return None
+
+        # Parse reload times
+        times = json.loads(times_text)
+
+        # Store this module's import time
+        times['import'] = _IMPORT_TIME
+
+        # Store ready time
+        times['ready'] = time.time()
+
+        # Report reload stats
+        return self._report_reload_stats(times)
+
+    def _report_reload_stats(self, times):
+        """
+        Report reload stats to the reload stats callback and log them.
+
+        :param times:
+            Dict that maps reload stage name to wall clock time.
+
+        :return:
+            Reload stats dict.
+        """
+        # Get the first file change's time, or decision time if the reload
+        # was not caused by file changes
+        event_time = times.get('event', None) or times['decision']
+
+        # Create reload stats dict
+        stats = {
+            'reload_mode': times.get('reload_mode', self._reload_mode),
+            'event_count': times.get('event_count', 0),
+            'event_time': event_time,
+            'decision_time': times['decision'],
+            'restart_time': times['restart'],
+            'import_time': times['import'],
+            'ready_time': times['ready'],
+            'debounce': times['decision'] - event_time,
+            'prepare': times['restart'] - times['decision'],
+            'startup': times['import'] - times['restart'],
+            'app_init': times['ready'] - times['import'],
+            'total': times['ready'] - event_time,
+        }
+
+        # Log the stats in one line
+        _LOGGER.info(
+            'reload_stats reload_mode=%s event_count=%d total=%.3f'
+            ' debounce=%.3f prepare=%.3f startup=%.3f app_init=%.3f',
+            stats['reload_mode'],
+            stats['event_count'],
+            stats['total'],
+            stats['debounce'],
+            stats['prepare'],
+            stats['startup'],
+            stats['app_init'],
+        )
+
+        # If have reload stats callback
+        if self._reload_stats_callback is not None:
+            # Call the callback
+            self._reload_stats_callback(stats)
+
+        # Return the stats
+        return stats
+
+    def add_pre_reload_hook(self, hook):
+        """
+        Add a function called before the current process is replaced or \
+        ends on reload, e.g. to stop accepting connections, wait for \
+        in-flight requests to finish, and flush logs.
+
+        Hooks are called in the order added, in the thread that reloads, \
+        with the remaining time of `drain_timeout` in seconds as the \
+        argument. A hook should return within the time. Errors raised by a \
+        hook are printed and do not stop the reload.
+
+        Hooks are called in `exec`, `spawn_exit`, `spawn_wait`, \
+        `fork_server` and `blue_green` modes, and in `in_process` mode's \
+        fallback. In `blue_green` mode, they are called after the new \
+        process is ready. Not called in `watch`, where the program ends \
+        through the event loop.
+
+        Registered listening sockets are duplicated before hooks are \
+        called, so hooks may close them, e.g. by stopping servers.
+
+        `aoiklivereload.adapters` has hooks for common servers.
+
+        :param hook:
+            Function that takes the remaining time.
+
+        :return:
+            None.
+        """
+        # Store the hook
+        self._pre_reload_hooks.append(hook)
+
+    def _run_pre_reload_hooks(self):
+        """
+        Call pre-reload hooks within `drain_timeout`.
+
+        :return:
+            None.
+        """
+        # If not have hooks
+        if not self._pre_reload_hooks:
+            # Return
+            return
+
+        # Replace registered sockets with duplicates, so that hooks can
+        # close the sockets, e.g. by stopping servers, and the listening
+        # sockets are still passed to the new process
+        self._sockets = dict(
+            (name, sock.dup()) for name, sock in self._sockets.items()
+        )
+
+        # Get deadline
+        deadline = time.time() + self._drain_timeout
+
+        # For each hook
+        for hook in self._pre_reload_hooks:
+            try:
+                # Call the hook with the remaining time
+                hook(max(deadline - time.time(), 0))
+
+            # If have error
+            except Exception:  # pylint: disable=broad-except
+                # Print traceback
+                traceback.print_exc()
+
+    def add_socket(self, sock, name=None):
+        """
+        Register a listening socket to pass to the new process on reload.
+
+        The new process gets the socket using `get_inherited_socket`, so \
+        that connections in the socket's accept queue are not dropped.
+
+        Sockets are passed in `exec`, `spawn_exit`, `spawn_wait`, \
+        `fork_server` and `blue_green` modes. Not supported on Windows. In \
+        `fork_server` mode, requires Python 3.3+.
+
+        :param sock:
+            Listening socket object.
+
+        :param name:
+            Socket name. Default is `host:port` of the socket's address, or \
+            the socket's address if it is not a tuple.
+
+        :return:
+            None.
+        """
+        # If socket name is not given
+        if name is None:
+            # Get socket name
+            name = self._get_socket_name(sock.getsockname())
+
+        # Store the socket
+        self._sockets[name] = sock
+
+    def get_inherited_socket(self, name):
+        """
+        Get a listening socket passed from the previous process.
+
+        The socket got is registered using `add_socket` so that it is \
+        passed on in next reload.
+
+        :param name:
+            Socket name given to `add_socket` in the previous process.
+
+        :return:
+            Socket object, or None if not have the socket.
+        """
+        # Get socket infos passed from the previous process
+        sock_info_s = json.loads(os.environ.get(self.LISTEN_FDS_ENV_KEY, '{}'))
+
+        # Get the socket info
+        sock_info = sock_info_s.get(name, None)
+
+        # If not have the socket info
+        if sock_info is None:
+            # Return None
+            return None
+
+        # Get file descriptor, address family and socket type
+        fd, family, sock_type = sock_info
+
+        try:
+            # Create socket object from the file descriptor.
+            #
+            # Notice `fromfd` duplicates the file descriptor.
+            #
+            sock = socket.fromfd(fd, family, sock_type)
+
+        # If have error, e.g. the file descriptor was not inherited
+        except (OSError, socket.error):
+            # Return None
+            return None
+
+        # Close the original file descriptor
+        os.close(fd)
+
+        # Register the socket
+        self.add_socket(sock, name=name)
+
+        # Return the socket
+        return sock
+
+    def get_listening_socket(self, host, port, backlog=128):
+        """
+        Get a TCP listening socket passed from the previous process, or \
+        create one if not have.
+
+        The socket is registered using `add_socket` with name `host:port`.
+
+        :param host:
+            Host to bind.
+
+        :param port:
+            Port to bind.
+
+        :param backlog:
+            Accept queue size.
+
+        :return:
+            Socket object.
+        """
+        # Get socket name
+        name = self._get_socket_name((host, port))
+
+        # Get inherited socket
+        sock = self.get_inherited_socket(name)
+
+        # If have inherited socket
+        if sock is not None:
+            # Return the socket
+            return sock
+
+        # Create socket
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        # Allow binding the address in `TIME_WAIT` state
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        # Bind the address
+        sock.bind((host, port))
+
+        # Start listening
+        sock.listen(backlog)
+
+        # Register the socket
+        self.add_socket(sock, name=name)
+
+        # Return the socket
+        return sock
+
+    @staticmethod
+    def _get_socket_name(address):
+        """
+        Get socket name from socket address.
+
+        :param address:
+            Socket address.
+
+        :return:
+            Socket name.
+        """
+        # If the address is a tuple, e.g. (host, port)
+        if isinstance(address, tuple):
+            # Return `host:port`
+            return '{}:{}'.format(address[0], address[1])
+
+        # If the address is not a tuple, e.g. Unix socket path
+        else:
+            # Return the address
+            return str(address)
+
+    def _get_reload_env(self):
+        """
+        Get environment variables dict for the new process.
+
+        Registered listening sockets are made inheritable and their infos \
+        are put in the dict.
+
+        :return:
+            Environment variables dict.
+        """
+        # Get env dict copy
+        env_copy = os.environ.copy()
+
+        # Remove socket infos passed from the previous process
+        env_copy.pop(self.LISTEN_FDS_ENV_KEY, None)
+
+        # Get reload times
+        reload_times = dict(self._reload_times)
+
+        # If reload was not started by `_start_reload`, e.g. `reload` is
+        # called directly
+        if 'decision' not in reload_times:
+            # Use current time as decision time
+            reload_times['decision'] = time.time()
+
+        # Store new process's start time
+        reload_times['restart'] = time.time()
+
+        # Store reload mode
+        reload_times['reload_mode'] = self._reload_mode
+
+        # Store number of events coalesced
+        reload_times['event_count'] = self._reload_event_count
+
+        # Put reload times in env dict
+        env_copy[self.RELOAD_TIMES_ENV_KEY] = json.dumps(reload_times)
+
+        # If not have registered sockets, or is in Windows
+        if not self._sockets or sys.platform == 'win32':
+            # Return env dict
+            return env_copy
+
+        # Dict that maps socket name to socket info
+        sock_info_s = {}
+
+        # For each registered socket
+        for name, sock in self._sockets.items():
+            # Get file descriptor
+            fd = sock.fileno()
+
+            # If have `os.set_inheritable`, in Python 3.4+
+            if hasattr(os, 'set_inheritable'):
+                # Make the file descriptor inheritable
+                os.set_inheritable(fd, True)
+
+            # Store socket info
+            sock_info_s[name] = [fd, int(sock.family), int(sock.type)]
+
+        # Put socket infos in env dict
+        env_copy[self.LISTEN_FDS_ENV_KEY] = json.dumps(sock_info_s)
+
+        # Return env dict
+        return env_copy
+
+    def _get_popen_kwargs(self):
+        """
+        Get keyword arguments for `subprocess.Popen` that spawns the new \
+        process, so that registered listening sockets are inherited.
+
+        :return:
+            Keyword arguments dict.
+        """
+        # If not have registered sockets, or is in Windows
+        if not self._sockets or sys.platform == 'win32':
+            # Close all file descriptors
+            return {'close_fds': True}
+
+        # If is Python 2.
+        #
+        # `pass_fds` is not supported.
+        #
+        if sys.version_info[0] == 2:
+            # Not close file descriptors
+            return {'close_fds': False}
+
+        # Close all file descriptors except the sockets'
+        return {
+            'close_fds': True,
+            'pass_fds': [x.fileno() for x in self._sockets.values()],
+        }
+
+    def reload(self):
+        """
+        Reload the program.
+
+        :return:
+            None.
+        """
+        # If the pre-reload steps failed
+        if not self._prepare_reload():
+            # Return
+            return
+
+        # Reload using the reload mode
+        self._reload_using_mode(self._reload_mode)
+
+    def _prepare_reload(self):
+        """
+        Run the steps before the started reload: precompile, preflight \
+        checks, and saving watch state cache for the new process.
+
+        :return:
+            Whether the reload can go on. If not, the reload is aborted.
+        """
+        # If need precompile or compile check, and failed
+        if (self._precompile or self._preflight) \
+                and not self._precompile_files():
+            # Abort the reload
+            self._abort_reload()
+
+            # Return failure
+            return False
+
+        # If need trial import, and failed
+        if self._preflight_import and not self._preflight_import_modules():
+            # Abort the reload
+            self._abort_reload()
+
+            # Return failure
+            return False
+
+        # Save watch state cache for the new process
+        self._save_cache()
+
+        # Return success
+        return True
+
+    def _abort_reload(self):
+        """
+        Abort the started reload, so that next file change starts a new \
+        reload.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._debounce_lock:
+            # Allow next reload
+            self._is_reloading = False
+
+    def _find_precompile_file_paths(self):
+        """
+        Find source file paths to precompile for the started reload.
+
+        :return:
+            Sorted list of source file paths.
+        """
+        # Get changed source file paths that exist
+        file_path_s = set(
+            x for x in self._reload_file_paths
+            if x.endswith('.py') and os.path.isfile(x)
+        )
+
+        # If not need precompile dependent modules
+        if not self._precompile_dependents:
+            # Return changed source file paths
+            return sorted(file_path_s)
+
+        # Get main module's file path
+        main_file_path = self._get_module_file_path(
+            sys.modules.get('__main__', None)
+        )
+
+        # Get names of changed modules and their dependent modules.
+        #
+        # The main module is excluded because no modules depend on it, and
+        # it makes the function return None.
+        #
+        module_names = self._find_modules_to_reload(
+            file_path_s - set([main_file_path])
+        )
+
+        # For each module name
+        for module_name in module_names or ():
+            # Get module file path
+            module_file_path = self._get_module_file_path(
+                sys.modules.get(module_name, None)
+            )
+
+            # If have module file path
+            if module_file_path is not None:
+                # Add to file paths to precompile
+                file_path_s.add(module_file_path)
+
+        # Return source file paths
+        return sorted(file_path_s)
+
+    def _precompile_files(self):
+        """
+        Compile source files of the started reload to bytecode files.
+
+        :return:
+            Whether all files are compiled. Errors are printed.
+        """
+        # Find source file paths to precompile
+        file_paths = self._find_precompile_file_paths()
+
+        # If have many files
+        if len(file_paths) >= self.PRECOMPILE_POOL_MIN_FILES:
+            # Compile files in parallel in worker processes
+            error_msgs = self._precompile_files_in_workers(file_paths)
+
+        # If have few files
+        else:
+            # Compile files in current thread
+            error_msgs = [compile_file(x) for x in file_paths]
+
+        # Whether all files are compiled
+        is_success = True
+
+        # For each error message
+        for error_msg in error_msgs:
+            # If have error
+            if error_msg is not None:
+                # Set the flag
+                is_success = False
+
+                # Print the error message
+                sys.stderr.write('{}\n'.format(error_msg))
+
+        # If have error
+        if not is_success:
+            # Print message
+            sys.stderr.write(
+                'Reload aborted because of compile errors.'
+                ' Waiting for file changes.\n'
+            )
+
+            # Flush the stream
+            sys.stderr.flush()
+
+        # Return whether all files are compiled
+        return is_success
+
+    def _precompile_files_in_workers(self, file_paths):
+        """
+        Compile given source files in parallel in worker processes.
+
+        Worker processes run `PRECOMPILE_CODE` in new interpreters, instead \
+        of being forked, because forking a process that has other threads \
+        running, e.g. the observer's threads, may deadlock in the child \
+        process on locks held by those threads.
+
+        :param file_paths:
+            Source file paths.
+
+        :return:
+            List of error messages. None items mean no errors.
+        """
+        # Get number of worker processes
+        worker_count = min(len(file_paths), multiprocessing.cpu_count())
+
+        # Split file paths among the worker processes
+        chunks = [file_paths[x::worker_count] for x in range(worker_count)]
+
+        # Get command arguments, with the current optimization level so that
+        # the bytecode files are the ones the new process loads
+        args = [sys.executable] + ['-O'] * sys.flags.optimize + \
+            ['-c', self.PRECOMPILE_CODE]
+
+        # List of worker processes, None items for failed-to-start ones
+        processes = []
+
+        try:
+            # For each chunk
+            for chunk in chunks:
+                try:
+                    # Start worker process
+                    process = subprocess.Popen(
+                        args + chunk, stdout=subprocess.PIPE
+                    )
+
+                # If have error
+                except OSError:
+                    # Compile the chunk in current thread later
+                    process = None
+
+                # Add to worker processes
+                processes.append(process)
+
+            # Error messages
+            error_msgs = []
+
+            # For each chunk and its worker process
+            for chunk, process in zip(chunks, processes):
+                # If the worker process is started
+                if process is not None:
+                    # Wait for the worker process's output
+                    output = process.communicate()[0]
+
+                    try:
+                        # Get error messages
+                        error_msgs.extend(json.loads(output.decode('utf-8')))
+
+                        # Continue with next chunk
+                        continue
+
+                    # If the output is not valid, e.g. the worker process
+                    # crashed
+                    except ValueError:
+                        # Compile the chunk in current thread below
+                        pass
+
+                # Compile the chunk in current thread
+                error_msgs.extend(compile_file(x) for x in chunk)
+
+        finally:
+            # For each worker process
+            for process in processes:
+                # If the worker process is running, e.g. interrupted
+                if process is not None and process.poll() is None:
+                    # Kill the worker process
+                    process.kill()
+
+                    # Wait for the worker process to exit, and close its pipe
+                    process.communicate()
+
+        # Return error messages
+        return error_msgs
+
+    def _find_preflight_module_names(self):
+        """
+        Find names of modules to trial import for the started reload.
+
+        :return:
+            List of module names, with a module's dependency modules \
+            before it.
+        """
+        # Get main module's file path
+        main_file_path = self._get_module_file_path(
+            sys.modules.get('__main__', None)
+        )
+
+        # Get changed file paths, excluding the main module's file and
+        # extra paths, which make `_find_modules_to_reload` return None
+        file_path_s = set(
+            x for x in self._reload_file_paths
+            if x != main_file_path and x not in self._extra_paths
+        )
+
+        # Get names of changed modules and their dependent modules
+        module_names = self._find_modules_to_reload(file_path_s) or []
+
+        # Get main module
+        main_module = sys.modules.get('__main__', None)
+
+        # Return module names, excluding aliases of the main module, e.g.
+        # `__mp_main__` added by `multiprocessing`
+        return [
+            x for x in module_names
+            if sys.modules.get(x, None) is not main_module
+        ]
+
+    def _preflight_import_modules(self):
+        """
+        Import modules of the started reload in a subprocess, to check the \
+        new process can import them.
+
+        :return:
+            Whether the modules are imported. Errors are printed.
+        """
+        # Find names of modules to import
+        module_names = self._find_preflight_module_names()
+
+        # If not have modules to import
+        if not module_names:
+            # Return success
+            return True
+
+        # Get env dict copy
+        env_copy = os.environ.copy()
+
+        # Remove socket infos passed from the previous process
+        env_copy.pop(self.LISTEN_FDS_ENV_KEY, None)
+
+        # Remove reload times passed from the previous process
+        env_copy.pop(self.RELOAD_TIMES_ENV_KEY, None)
+
+        # Create temporary file to store the subprocess's output.
+        #
+        # File is used instead of pipe so that the subprocess does not block
+        # on a full pipe while being waited with timeout.
+        #
+        output_file = tempfile.TemporaryFile()
+
+        try:
+            # Start subprocess
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    '-c',
+                    self.PREFLIGHT_IMPORT_CODE,
+                    json.dumps(sys.path),
+                ] + module_names,
+                env=env_copy,
+                stdout=output_file,
+                stderr=subprocess.STDOUT,
+                close_fds=sys.platform != 'win32',
+            )
+
+            # Get deadline
+            deadline = time.time() + self._preflight_timeout
+
+            # While the subprocess has not exited and not timed out.
+            #
+            # `wait` with timeout is not used because it is not supported
+            # in Python 2.
+            #
+            while process.poll() is None and time.time() < deadline:
+                # Sleep before next check
+                time.sleep(0.05)
+
+            # If the subprocess has not exited
+            if process.poll() is None:
+                try:
+                    # Kill the subprocess
+                    process.kill()
+
+                # If have error, e.g. the subprocess has exited
+                except OSError:
+                    # Ignore
+                    pass
+
+                # Wait for the subprocess to exit
+                process.wait()
+
+                # Get error message
+                error_msg = 'Preflight import did not finish in {} seconds.' \
+                    .format(self._preflight_timeout)
+
+            # If the subprocess has failed
+            elif process.returncode != 0:
+                # Rewind the output file
+                output_file.seek(0)
+
+                # Get the subprocess's output as error message
+                error_msg = output_file.read().decode('utf-8', 'replace') \
+                    .rstrip()
+
+            # If the subprocess has succeeded
+            else:
+                # Return success
+                return True
+
+        # If have error, e.g. failed to start the subprocess
+        except (IOError, OSError) as exc:
+            # Get error message
+            error_msg = 'Failed to run preflight import: {}'.format(exc)
+
+        finally:
+            # Close the output file
+            output_file.close()
+
+        # Print the error message
+        sys.stderr.write('{}\n'.format(error_msg))
+
+        # Print message
+        sys.stderr.write(
+            'Reload aborted because of import errors.'
+            ' Waiting for file changes.\n'
+        )
+
+        # Flush the stream
+        sys.stderr.flush()
+
+        # Return failure
+        return False
+
+    def _reload_using_mode(self, reload_mode):
+        """
+        Reload the program using given reload mode.
+
+        :param reload_mode:
+            Reload mode.
+
+        :return:
+            None.
+        """
+        # Get the future `watch` waits on
+        reload_future = self._async_reload_future
+
+        # If is watching on an event loop, and reload mode needs the program
+        # to end
+        if reload_future is not None and reload_mode in (
+            self.RELOAD_MODE_V_SPAWN_EXIT,
+            self.RELOAD_MODE_V_SPAWN_WAIT,
+        ):
+            # If the future is not done
+            if not reload_future.done():
+                # Let `watch` spawn the new process and end the program
+                reload_future.set_result(reload_mode)
+
+            # Return
+            return
+
+        # If reload mode replaces or ends the current process right away.
+        #
+        # `blue_green` mode calls the hooks after the new process is ready.
+        #
+        if reload_mode not in (
+            self.RELOAD_MODE_V_IN_PROCESS,
+            self.RELOAD_MODE_V_BLUE_GREEN,
+        ):
+            # Call pre-reload hooks, e.g. to drain in-flight requests
+            self._run_pre_reload_hooks()
+
+        # If reload mode is `exec`
+        if reload_mode == self.RELOAD_MODE_V_EXEC:
+            # Call `reload_using_exec`
+            self.reload_using_exec()
+
+        # If reload mode is `spawn_exit`
+        elif reload_mode == self.RELOAD_MODE_V_SPAWN_EXIT:
+            # Call `reload_using_spawn_exit`
+            self.reload_using_spawn_exit()
+
+        # If reload mode is `spawn_wait`
+        elif reload_mode == self.RELOAD_MODE_V_SPAWN_WAIT:
+            # Call `reload_using_spawn_wait`
+            self.reload_using_spawn_wait()
+
+        # If reload mode is `fork_server`
+        elif reload_mode == self.RELOAD_MODE_V_FORK_SERVER:
+            # Call `reload_using_fork_server`
+            self.reload_using_fork_server()
+
+        # If reload mode is `in_process`
+        elif reload_mode == self.RELOAD_MODE_V_IN_PROCESS:
+            # Call `reload_using_in_process`
+            self.reload_using_in_process()
+
+        # If reload mode is `blue_green`
+        elif reload_mode == self.RELOAD_MODE_V_BLUE_GREEN:
+            # Call `reload_using_blue_green`
+            self.reload_using_blue_green()
+
+        # If reload mode is none of above
+        else:
+            # Get error message
+            error_msg = 'Invalid reload mode: {}.'.format(repr(reload_mode))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+    def reload_using_exec(self):
+        """
+        Reload the program process.
+
+        :return:
+            None.
+        """
+        # Create command parts
+        cmd_parts = [sys.executable] + sys.argv
+
+        # Get env dict for the new process.
+        #
+        # This also records the new process's start time in reload stats.
+        #
+        env_copy = self._get_reload_env()
+
+        # Reload the program process
+        os.execvpe(
+            # Program file path
+            sys.executable,
+            # Command parts
+            cmd_parts,
+            # Env dict
+            env_copy,
+        )
+
+    def reload_using_spawn_exit(self):
+        """
+        Spawn a subprocess and exit the current process.
+
+        :return:
+            None.
+        """
+        # Create command parts
+        cmd_parts = [sys.executable] + sys.argv
+
+        # Get env dict for the new process.
+        #
+        # This also records the new process's start time in reload stats.
+        #
+        env_copy = self._get_reload_env()
+
+        # Spawn subprocess
+        subprocess.Popen(cmd_parts, env=env_copy, **self._get_popen_kwargs())
+
+        # If need force exit
+        if self._force_exit:
+            # Force exit
+            os._exit(0)  # pylint: disable=protected-access
+
+        # If not need force exit
+        else:
+            # Send interrupt to main thread
+            interrupt_main()
+
+        # Set the flag
+        self._watcher_to_stop = True
+
+        # Exit the watcher thread
+        sys.exit(0)
+
+    def reload_using_spawn_wait(self):
+        """
+        Spawn a subprocess and wait until it finishes.
+
+        :return:
+            None.
+        """
+        # Create command parts
+        cmd_parts = [sys.executable] + sys.argv
+
+        # Get env dict for the new process.
+        #
+        # This also records the new process's start time in reload stats.
+        #
+        env_copy = self._get_reload_env()
+
+        # Send interrupt to main thread
+        interrupt_main()
+
+        # Spawn subprocess and wait until it finishes
+        subprocess.call(cmd_parts, env=env_copy, **self._get_popen_kwargs())
+
+        # Exit the watcher thread
+        sys.exit(0)
+
+    def reload_using_blue_green(self):
+        """
+        Spawn a subprocess, wait until it is ready, then exit the current \
+        process.
+
+        If the subprocess exits or is not ready in time, kill it and keep \
+        the current process running.
+
+        :return:
+            None.
+        """
+        # Create command parts
+        cmd_parts = [sys.executable] + sys.argv
+
+        # Get env dict for the new process.
+        #
+        # This also records the new process's start time in reload stats.
+        #
+        env_copy = self._get_reload_env()
+
+        # Create pipe the new process writes to when ready
+        read_fd, write_fd = os.pipe()
+
+        # Put pipe file descriptor in env dict
+        env_copy[self.READY_FD_ENV_KEY] = str(write_fd)
+
+        # Get `subprocess.Popen` keyword arguments
+        popen_kwargs = self._get_popen_kwargs()
+
+        # If is Python 2.
+        #
+        # `pass_fds` is not supported.
+        #
+        if sys.version_info[0] == 2:
+            # Not close file descriptors so that the pipe is inherited
+            popen_kwargs['close_fds'] = False
+
+        # If is not Python 2
+        else:
+            # Pass the pipe's write end too
+            popen_kwargs['pass_fds'] = \
+                list(popen_kwargs.get('pass_fds', ())) + [write_fd]
+
+        try:
+            try:
+                # Spawn subprocess
+                process = subprocess.Popen(
+                    cmd_parts, env=env_copy, **popen_kwargs
+                )
+
+            finally:
+                # Close the pipe's write end in this process, so that the
+                # read end gets EOF if the subprocess exits
+                os.close(write_fd)
+
+            # Wait until the subprocess is ready
+            error_msg = self._wait_process_ready(process, read_fd)
+
+        finally:
+            # Close the pipe's read end
+            os.close(read_fd)
+
+        # If the subprocess is not ready
+        if error_msg is not None:
+            # If the subprocess has not exited
+            if process.poll() is None:
+                try:
+                    # Kill the subprocess
+                    process.kill()
+
+                # If have error, e.g. the subprocess has exited
+                except OSError:
+                    # Ignore
+                    pass
+
+            # Wait for the subprocess to exit
+            process.wait()
+
+            # Print message
+            sys.stderr.write(
+                '{}\nReload aborted. Waiting for file changes.\n'.format(
+                    error_msg
+                )
+            )
+
+            # Flush the stream
+            sys.stderr.flush()
+
+            # Abort the reload
+            self._abort_reload()
+
+            # Return
+            return
+
+        # Call pre-reload hooks, e.g. to drain in-flight requests, while the
+        # new process serves new requests
+        self._run_pre_reload_hooks()
+
+        # If need force exit
+        if self._force_exit:
+            # Force exit
+            os._exit(0)  # pylint: disable=protected-access
+
+        # If not need force exit
+        else:
+            # Send interrupt to main thread
+            interrupt_main()
+
+        # Set the flag
+        self._watcher_to_stop = True
+
+        # Exit the watcher thread
+        sys.exit(0)
+
+    def _wait_process_ready(self, process, read_fd):
+        """
+        Wait until the new process writes to the ready pipe in \
+        `mark_ready`.
+
+        :param process:
+            New process's `subprocess.Popen` object.
+
+        :param read_fd:
+            Ready pipe's read end file descriptor.
+
+        :return:
+            None if the new process is ready, otherwise error message.
+        """
+        # Get deadline
+        deadline = time.time() + self._ready_timeout
+
+        # Run in a loop
+        while True:
+            # Get remaining time
+            remaining_time = deadline - time.time()
+
+            # If timed out
+            if remaining_time <= 0:
+                # Return error message
+                return 'New process was not ready in {} seconds.'.format(
+                    self._ready_timeout
+                )
+
+            try:
+                # Wait until the pipe is readable
+                read_fds, _, _ = select.select([read_fd], [], [],
+                                               remaining_time)
+
+            # If have error
+            except (OSError, select.error) as exc:
+                # If the call is interrupted by a signal in Python 2
+                if getattr(exc, 'errno', exc.args[0]) == errno.EINTR:
+                    # Retry
+                    continue
+
+                # Raise the error
+                raise
+
+            # If the pipe is readable
+            if read_fds:
+                # Read data
+                data = os.read(read_fd, 1)
 
-        # Store reload mode
-        self._reload_mode = reload_mode
+                # If have data
+                if data:
+                    # Return success
+                    return None
 
-        # Store whether force exit
-        self._force_exit = bool(force_exit)
+                # Get deadline to wait for the new process to exit, which
+                # has closed the pipe
+                exit_deadline = time.time() + 1
 
-        # Convert given extra paths to absolute
-        self._extra_paths = set(
-            os.path.abspath(x) for x in (extra_paths or ())
-        )
+                # While the new process has not exited and not timed out
+                while process.poll() is None and time.time() < exit_deadline:
+                    # Sleep before next check
+                    time.sleep(0.05)
 
-        # Store check interval
-        self._interval = interval
+                # Get the new process's exit code, or None if it closed the
+                # pipe without exiting
+                exit_code = process.poll()
 
-        # Set of watch paths
-        self._watch_paths = set()
+                # If the new process has not exited
+                if exit_code is None:
+                    # Return error message
+                    return 'New process closed the ready pipe before ready.'
 
-        # Whether the watcher thread should stop
-        self._watcher_to_stop = False
+                # Return error message
+                return 'New process exited with code {} before ready.' \
+                    .format(exit_code)
 
-    def start_watcher_thread(self):
+    def reload_using_fork_server(self):
         """
-        Start watcher thread.
+        Request reload over the control socket and exit the child process, \
+        so that the fork server forks a new one.
+
+        Registered listening sockets are passed to the fork server with the \
+        request, before the child process exits.
 
         :return:
-            Watcher thread object.
+            None.
         """
-        # Create watcher thread
-        watcher_thread = threading.Thread(target=self.run_watcher)
+        # Get socket names and objects
+        sock_items = list(self._sockets.items())
 
-        # If the reload mode is `spawn_wait`
-        if self._reload_mode == self.RELOAD_MODE_V_SPAWN_WAIT:
-            # Use non-daemon thread
-            daemon = False
+        # Get request data that maps socket name to list of file descriptor
+        # index, address family and socket type
+        data = json.dumps(dict(
+            (name, [index, int(sock.family), int(sock.type)])
+            for index, (name, sock) in enumerate(sock_items)
+        )).encode('utf-8')
 
-        # If the reload mode is not `spawn_wait`
-        else:
-            # Use daemon thread
-            daemon = True
+        # Create socket object from the control socket's file descriptor,
+        # which duplicates the file descriptor
+        control_sock = socket.fromfd(
+            int(os.environ[self.FORK_SERVER_CHILD_ENV_KEY]),
+            socket.AF_UNIX,
+            socket.SOCK_DGRAM,
+        )
 
-        # Set whether the thread is daemon
-        watcher_thread.setDaemon(daemon)
+        try:
+            # If can pass file descriptors, in Python 3.3+
+            if sock_items and hasattr(control_sock, 'sendmsg'):
+                # Send the request with the file descriptors
+                control_sock.sendmsg(
+                    [data],
+                    [(
+                        socket.SOL_SOCKET,
+                        socket.SCM_RIGHTS,
+                        struct.pack(
+                            '{}i'.format(len(sock_items)),
+                            *[sock.fileno() for _, sock in sock_items]
+                        ),
+                    )],
+                )
 
-        # Start watcher thread
-        watcher_thread.start()
+            # If can not pass file descriptors
+            else:
+                # Send the request
+                control_sock.send(data)
 
-        # Return watcher thread
-        return watcher_thread
+        finally:
+            # Close the control socket
+            control_sock.close()
 
-    def run_watcher(self):
+        # Exit the child process
+        self._exit_fork_server_child(0)
+
+    def reload_using_in_process(self):
         """
-        Watcher thread's function.
+        Reload changed modules and their dependent modules in process.
+
+        Fall back to `fallback_reload_mode` if failed.
 
         :return:
             None.
         """
-        # Create observer
-        observer = Observer()
+        # Get in process reload's start time
+        restart_time = time.time()
 
-        # Start observer
-        observer.start()
+        # Get changed file paths
+        file_path_s = self._reload_file_paths
 
-        # Dict that maps file path to `watch object`
-        watche_obj_map = {}
+        # Get names of modules to reload in order, or None if can not reload
+        # in process
+        module_names = self._find_modules_to_reload(file_path_s)
 
-        # Run change check in a loop
-        while not self._watcher_to_stop:
-            # Get current watch paths
-            old_watch_path_s = set(watche_obj_map)
+        # If can not reload in process
+        if module_names is None:
+            # Reload using fallback reload mode
+            self._reload_using_mode(self._fallback_reload_mode)
 
-            # Get new watch paths
-            new_watch_path_s = self._find_watch_paths()
+            # Return
+            return
 
-            # For each new watch path
-            for new_watch_path in new_watch_path_s:
-                # Remove from the old watch paths if exists
-                old_watch_path_s.discard(new_watch_path)
+        try:
+            # For each module name
+            for module_name in module_names:
+                # Get module
+                module = sys.modules.get(module_name, None)
 
-                # If the new watch path was not watched
-                if new_watch_path not in watche_obj_map:
-                    try:
-                        # Schedule a watch
-                        watch_obj = observer.schedule(
-                            # 2KGRW
-                            # `FileSystemEventHandler` instance
-                            self,
-                            # File path to watch
-                            new_watch_path,
-                            # Whether recursive
-                            recursive=True,
-                        )
+                # If the module still exists
+                if module is not None:
+                    # Reload the module
+                    reload_module(module)
 
-                        # Store the watch obj
-                        watche_obj_map[new_watch_path] = watch_obj
+        # If have error
+        except Exception:  # pylint: disable=broad-except
+            # Print traceback
+            traceback.print_exc()
 
-                    # If have error
-                    except OSError:
-                        # Set the watch object be None
-                        watche_obj_map[new_watch_path] = None
+            # Reload using fallback reload mode
+            self._reload_using_mode(self._fallback_reload_mode)
 
-            # For each old watch path that is not in the new watch paths
-            for old_watch_path in old_watch_path_s:
-                # Get watch object
-                watch_obj = watche_obj_map.pop(old_watch_path, None)
+            # Return
+            return
 
-                # If have watch object
-                if watch_obj is not None:
-                    # Unschedule the watch
-                    observer.unschedule(watch_obj)
+        # Get reload times
+        reload_times = dict(self._reload_times)
 
-            # Store new watch paths
-            self._watch_paths = new_watch_path_s
+        # If reload was not started by `_start_reload`
+        if 'decision' not in reload_times:
+            # Use start time as decision time
+            reload_times['decision'] = restart_time
 
-            # Sleep before next check
-            time.sleep(self._interval)
+        # Store start time as restart time and import time
+        reload_times['restart'] = reload_times['import'] = restart_time
 
-    def _find_watch_paths(self):
+        # Store ready time
+        reload_times['ready'] = time.time()
+
+        # Store number of events coalesced
+        reload_times['event_count'] = self._reload_event_count
+
+        # With the lock
+        with self._debounce_lock:
+            # Allow next reload
+            self._is_reloading = False
+
+        # Report reload stats
+        self._report_reload_stats(reload_times)
+
+    def _find_modules_to_reload(self, file_paths):
         """
-        Find paths to watch.
+        Find modules to reload in process for given changed file paths.
+
+        :param file_paths:
+            Changed file paths.
 
         :return:
-            Paths to watch.
+            List of module names, with a module's dependency modules \
+            before it. None if can not reload in process, e.g. the main \
+            module or an extra path is changed.
         """
-        # Add directory paths in `sys.path` to watch paths
-        watch_path_s = set(os.path.abspath(x) for x in sys.path)
+        # If not have changed file paths
+        if not file_paths:
+            # Can not reload in process
+            return None
 
-        # For each extra path
-        for extra_path in self._extra_paths or ():
-            # Get the extra path's directory path
-            extra_dir_path = os.path.dirname(os.path.abspath(extra_path))
+        # Dict that maps file path to module name
+        file_path_to_module_name = {}
 
-            # Add to watch paths
-            watch_path_s.add(extra_dir_path)
+        # Get watched module file paths
+        module_file_path_s = self._module_file_paths
 
-        # For each module in `sys.modules`
-        for module in list(sys.modules.values()):
+        # For each loaded module
+        for module_name, module in list(sys.modules.items()):
             # Get module file path
-            module_path = getattr(module, '__file__', None)
+            module_file_path = self._get_module_file_path(module)
 
-            # If have module file path
-            if module_path is not None:
-                # Get module directory path
-                module_dir_path = os.path.dirname(os.path.abspath(module_path))
+            # If the module is watched
+            if module_file_path in module_file_path_s:
+                # Store the mapping
+                file_path_to_module_name[module_file_path] = module_name
 
-                # Add to watch paths
-                watch_path_s.add(module_dir_path)
+        # Names of changed modules
+        changed_module_name_s = set()
 
-        # Find short paths of these watch paths.
-        # E.g. if both `/home` and `/home/aoik` exist, only keep `/home`.
-        watch_path_s = self._find_short_paths(watch_path_s)
+        # For each changed file path
+        for file_path in file_paths:
+            # If the file path is an extra path
+            if file_path in self._extra_paths:
+                # Can not reload in process
+                return None
 
-        # Return the watch paths
-        return watch_path_s
+            # Get module name
+            module_name = file_path_to_module_name.get(file_path, None)
 
-    def _find_short_paths(self, paths):
-        """
-        Find short paths of given paths.
+            # If the file is not loaded as a module.
+            #
+            # E.g. a new file. It does not affect the current process.
+            #
+            if module_name is None:
+                # Skip
+                continue
 
-        E.g. if both `/home` and `/home/aoik` exist, only keep `/home`.
+            # If the module is the main module
+            if module_name == '__main__':
+                # Can not reload in process
+                return None
 
-        :param paths:
-            Paths.
+            # Add to changed modules
+            changed_module_name_s.add(module_name)
 
-        :return:
-            Set of short paths.
-        """
-        # Split each path to parts.
-        # E.g. '/home/aoik' to ['', 'home', 'aoik']
-        path_parts_s = [path.split(os.path.sep) for path in paths]
+        # Build reverse dependency graph of watched modules
+        dependents_map = self._build_reverse_dependency_graph(
+            set(file_path_to_module_name.values())
+        )
 
-        # Root node
-        root_node = {}
+        # Names of modules to reload
+        reload_module_name_s = set()
 
-        # Sort these path parts by length, with the longest being the first.
-        #
-        # Longer paths appear first so that their extra parts are discarded
-        # when a shorter path is found at 5TQ8L.
-        #
-        # Then for each path's parts.
-        for parts in sorted(path_parts_s, key=len, reverse=True):
-            # Start from the root node
-            node = root_node
+        # Module names to visit
+        visit_module_names = list(changed_module_name_s)
 
-            # For each part of the path
-            for part in parts:
-                # Create node of the path
-                node = node.setdefault(part, {})
+        # While have module names to visit
+        while visit_module_names:
+            # Get a module name
+            module_name = visit_module_names.pop()
 
-            # 5TQ8L
-            # Clear the last path part's node's child nodes.
+            # If the module has been visited, or is the main module.
             #
-            # This aims to keep only the shortest path that needs be watched.
+            # Main module can not be reloaded. It keeps references to old
+            # objects.
             #
-            node.clear()
+            if module_name in reload_module_name_s \
+                    or module_name == '__main__':
+                # Skip
+                continue
 
-        # Short paths
-        short_path_s = set()
+            # Add to modules to reload
+            reload_module_name_s.add(module_name)
 
-        # Collect leaf paths
-        self._collect_leaf_paths(
-            node=root_node,
-            path_parts=(),
-            leaf_paths=short_path_s,
+            # Visit dependent modules
+            visit_module_names.extend(dependents_map.get(module_name, ()))
+
+        # Return modules in dependency order
+        return self._sort_modules_by_dependency(
+            reload_module_name_s, dependents_map
         )
 
-        # Return short paths
-        return short_path_s
+    def _build_reverse_dependency_graph(self, module_names):
+        """
+        Build reverse dependency graph of given modules.
 
-    def _collect_leaf_paths(self, node, path_parts, leaf_paths):
+        A module depends on another module if its source code imports the \
+        other module, e.g. `import pkg.a` or `from pkg.a import V`, or if \
+        one of its global attributes is the other module, or is a function \
+        or class defined in the other module.
+
+        :param module_names:
+            Module names.
+
+        :return:
+            Dict that maps module name to set of names of modules that \
+            depend on it. Only given modules are included.
         """
-        Collect paths of leaf nodes.
+        # Dict that maps module name to dependent module names
+        dependents_map = {}
 
-        :param node:
-            Starting node. Type is dict.
+        # For each module name
+        for module_name in module_names:
+            # Get module
+            module = sys.modules.get(module_name, None)
 
-            Key is child node's path part. Value is child node.
+            # If not have module
+            if module is None:
+                # Skip
+                continue
 
-        :param path_parts:
-            The starting node's path parts. Type is tuple.
+            # For each module name imported by the module's source code
+            for dep_module_name in self._get_imported_module_names(
+                module_name, module
+            ):
+                # If the dependency module is given and is not the module
+                # itself
+                if dep_module_name in module_names \
+                        and dep_module_name != module_name:
+                    # Add to the dependency module's dependents
+                    dependents_map.setdefault(dep_module_name, set()).add(
+                        module_name
+                    )
 
-        :param leaf_paths:
-            Leaf path list.
+            # For each global attribute of the module
+            for value in list(vars(module).values()):
+                # If the value is a module
+                if inspect.ismodule(value):
+                    # Get dependency module name
+                    dep_module_name = value.__name__
 
-        :return:
-            None.
-        """
-        # If the node is leaf node
-        if not node:
-            # Get node path
-            node_path = '/'.join(path_parts)
+                # If the value is a function or class
+                elif inspect.isfunction(value) or inspect.isclass(value):
+                    # Get dependency module name
+                    dep_module_name = getattr(value, '__module__', None)
 
-            # Add to list
-            leaf_paths.add(node_path)
+                # If the value is none of above
+                else:
+                    # Skip
+                    continue
 
-        # If the node is not leaf node
-        else:
-            # For each child node
-            for child_path_part, child_node in node.items():
-                # Get the child node's path parts
-                child_path_part_s = path_parts + (child_path_part,)
+                # If the dependency module is given and is not the module
+                # itself
+                if dep_module_name in module_names \
+                        and dep_module_name != module_name:
+                    # Add to the dependency module's dependents
+                    dependents_map.setdefault(dep_module_name, set()).add(
+                        module_name
+                    )
 
-                # Visit the child node
-                self._collect_leaf_paths(
-                    node=child_node,
-                    path_parts=child_path_part_s,
-                    leaf_paths=leaf_paths,
-                )
+        # Return the graph
+        return dependents_map
 
-    def dispatch(self, event):
+    def _get_imported_module_names(self, module_name, module):
         """
-        Dispatch file system event.
+        Get names of modules imported by given module's source code.
 
-        Callback called when there is a file system event. Hooked at 2KGRW.
+        Names imported by `from` statements are included as module names \
+        too, e.g. `from pkg import a` gives `pkg` and `pkg.a`, because they \
+        may be sub-modules.
 
-        This function overrides `FileSystemEventHandler.dispatch`.
+        Results are cached until the source file's size or mtime changes.
 
-        :param event:
-            File system event object.
+        :param module_name:
+            Module name.
+
+        :param module:
+            Module object.
 
         :return:
-            None.
+            Set of module names.
         """
-        # Get file path
-        file_path = event.src_path
+        # Get module file path
+        module_file_path = self._get_module_file_path(module)
 
-        # If the file path is in extra paths
-        if file_path in self._extra_paths:
-            # Call `reload`
-            self.reload()
+        # If the module is not a source file
+        if module_file_path is None or not module_file_path.endswith('.py'):
+            # Return empty set
+            return set()
 
-        # If the file path ends with `.pyc` or `.pyo`
-        if file_path.endswith(('.pyc', '.pyo')):
-            # Get `.py` file path
-            file_path = file_path[:-1]
+        try:
+            # Get file status
+            stat_obj = os.stat(module_file_path)
 
-        # If the file path ends with `.py`
-        if file_path.endswith('.py'):
-            # Get the file's directory path
-            file_dir = os.path.dirname(file_path)
+        # If have error, e.g. the file has been removed
+        except OSError:
+            # Return empty set
+            return set()
 
-            # If the file's directory path starts with any of the watch paths
-            if file_dir.startswith(tuple(self._watch_paths)):
-                # Call `reload`
-                self.reload()
+        # Get file size and mtime
+        stat_key = (stat_obj.st_size, _get_mtime_ns(stat_obj))
 
-    def reload(self):
-        """
-        Reload the program.
+        # Get cached item
+        cache_item = self._imported_names_cache.get(module_file_path, None)
 
-        :return:
-            None.
-        """
-        # Get reload mode
-        reload_mode = self._reload_mode
+        # If the cached item is up to date
+        if cache_item is not None and cache_item[:2] == stat_key:
+            # Return cached module names
+            return cache_item[2]
 
-        # If reload mode is `exec`
-        if self._reload_mode == self.RELOAD_MODE_V_EXEC:
-            # Call `reload_using_exec`
-            self.reload_using_exec()
+        try:
+            # Open the source file
+            with open(module_file_path, 'rb') as source_file:
+                # Parse the source code
+                tree = ast.parse(source_file.read(), module_file_path)
 
-        # If reload mode is `spawn_exit`
-        elif self._reload_mode == self.RELOAD_MODE_V_SPAWN_EXIT:
-            # Call `reload_using_spawn_exit`
-            self.reload_using_spawn_exit()
+        # If have error, e.g. syntax error
+        except Exception:  # pylint: disable=broad-except
+            # Return empty set
+            return set()
 
-        # If reload mode is `spawn_wait`
-        elif self._reload_mode == self.RELOAD_MODE_V_SPAWN_WAIT:
-            # Call `reload_using_spawn_wait`
-            self.reload_using_spawn_wait()
+        # Get the module's package name
+        package_name = getattr(module, '__package__', None)
 
-        # If reload mode is none of above
-        else:
-            # Get error message
-            error_msg = 'Invalid reload mode: {}.'.format(repr(reload_mode))
+        # If not have package name
+        if package_name is None:
+            # If the module is a package
+            if hasattr(module, '__path__'):
+                # Use the module name
+                package_name = module_name
 
-            # Raise error
-            raise ValueError(error_msg)
+            # If the module is not a package
+            else:
+                # Use the parent module name
+                package_name = module_name.rpartition('.')[0]
 
-    def reload_using_exec(self):
-        """
-        Reload the program process.
+        # Imported module names
+        imported_name_s = set()
 
-        :return:
-            None.
-        """
-        # Create command parts
-        cmd_parts = [sys.executable] + sys.argv
+        # For each syntax node, including imports in functions
+        for node in ast.walk(tree):
+            # If is `import` statement
+            if isinstance(node, ast.Import):
+                # For each imported name
+                for alias in node.names:
+                    # Add the module name
+                    imported_name_s.add(alias.name)
 
-        # Get env dict copy
-        env_copy = os.environ.copy()
+            # If is `from` statement
+            elif isinstance(node, ast.ImportFrom):
+                # If is relative import
+                if node.level:
+                    # Get package name parts
+                    name_parts = package_name.split('.') \
+                        if package_name else []
 
-        # Reload the program process
-        os.execvpe(
-            # Program file path
-            sys.executable,
-            # Command parts
-            cmd_parts,
-            # Env dict
-            env_copy,
-        )
+                    # If the level is beyond the top package
+                    if node.level - 1 >= len(name_parts):
+                        # Skip
+                        continue
 
-    def reload_using_spawn_exit(self):
+                    # Get base module name
+                    base_name = '.'.join(
+                        name_parts[:len(name_parts) - (node.level - 1)]
+                    )
+
+                    # If have module name after the dots
+                    if node.module:
+                        # Append the module name
+                        base_name = base_name + '.' + node.module
+
+                # If is absolute import
+                else:
+                    # Use the module name
+                    base_name = node.module
+
+                # Add the base module name
+                imported_name_s.add(base_name)
+
+                # For each imported name
+                for alias in node.names:
+                    # Add as a possible sub-module name
+                    imported_name_s.add(base_name + '.' + alias.name)
+
+        # Cache the result
+        self._imported_names_cache[module_file_path] = \
+            stat_key + (imported_name_s,)
+
+        # Return module names
+        return imported_name_s
+
+    def _sort_modules_by_dependency(self, module_names, dependents_map):
         """
-        Spawn a subprocess and exit the current process.
+        Sort given modules so that a module's dependency modules are before \
+        it.
+
+        Modules in a dependency cycle are kept in arbitrary order.
+
+        :param module_names:
+            Module names.
+
+        :param dependents_map:
+            Reverse dependency graph created by \
+            `_build_reverse_dependency_graph`.
 
         :return:
-            None.
+            List of module names.
         """
-        # Create command parts
-        cmd_parts = [sys.executable] + sys.argv
+        # Post-order list of the reverse dependency graph
+        post_order_names = []
 
-        # Get env dict copy
-        env_copy = os.environ.copy()
+        # Visited module names
+        visited_module_name_s = set()
 
-        # Spawn subprocess
-        subprocess.Popen(cmd_parts, env=env_copy, close_fds=True)
+        # For each module name, sorted to make the result stable
+        for start_module_name in sorted(module_names):
+            # If the module has been visited
+            if start_module_name in visited_module_name_s:
+                # Skip
+                continue
 
-        # If need force exit
-        if self._force_exit:
-            # Force exit
-            os._exit(0)  # pylint: disable=protected-access
+            # Mark as visited
+            visited_module_name_s.add(start_module_name)
 
-        # If not need force exit
-        else:
-            # Send interrupt to main thread
-            interrupt_main()
+            # Stack of (module name, iterator of dependent module names)
+            stack = [(
+                start_module_name,
+                iter(sorted(dependents_map.get(start_module_name, ()))),
+            )]
 
-        # Set the flag
-        self._watcher_to_stop = True
+            # While the stack is not empty
+            while stack:
+                # Get the top item
+                module_name, dependent_names = stack[-1]
 
-        # Exit the watcher thread
-        sys.exit(0)
+                # For each dependent module name
+                for dependent_name in dependent_names:
+                    # If the dependent module is to sort and not visited
+                    if dependent_name in module_names \
+                            and dependent_name not in visited_module_name_s:
+                        # Mark as visited
+                        visited_module_name_s.add(dependent_name)
 
-    def reload_using_spawn_wait(self):
-        """
-        Spawn a subprocess and wait until it finishes.
+                        # Push to the stack
+                        stack.append((
+                            dependent_name,
+                            iter(sorted(
+                                dependents_map.get(dependent_name, ())
+                            )),
+                        ))
 
-        :return:
-            None.
-        """
-        # Create command parts
-        cmd_parts = [sys.executable] + sys.argv
+                        # Visit the dependent module first
+                        break
 
-        # Get env dict copy
-        env_copy = os.environ.copy()
+                # If all dependent modules are visited
+                else:
+                    # Pop the top item
+                    stack.pop()
 
-        # Send interrupt to main thread
-        interrupt_main()
+                    # Add to post-order list
+                    post_order_names.append(module_name)
 
-        # Spawn subprocess and wait until it finishes
-        subprocess.call(cmd_parts, env=env_copy, close_fds=True)
+        # Dependents are after their dependencies in reversed post-order
+        post_order_names.reverse()
 
-        # Exit the watcher thread
-        sys.exit(0)
+        # Return module names
+        return post_order_names
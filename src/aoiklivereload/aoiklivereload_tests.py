@@ -0,0 +1,1049 @@
+# coding: utf-8
+"""
+Tests of `aoiklivereload` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+# Local imports
+from .aoiklivereload import LiveReloader
+from .aoiklivereload import get_file_fingerprint
+from .aoiklivereload import reload_module
+from .watch_testing import wait_until
+
+
+def _write_file(file_path, text):
+    """
+    Write text to file.
+
+    :param file_path:
+        File path.
+
+    :param text:
+        Text.
+
+    :return:
+        None.
+    """
+    # Open the file
+    with open(file_path, 'w') as file_obj:
+        # Write the text
+        file_obj.write(text)
+
+
+class InProcessReloadTest(unittest.TestCase):
+    """
+    Tests of finding modules to reload in `in_process` reload mode.
+    """
+
+    def setUp(self):
+        """
+        Create and import package `_livereload_pkg`, in which modules `b` \
+        and `c` import constant `V` from module `a` by name.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get package directory path
+        package_dir = os.path.join(self.temp_dir, '_livereload_pkg')
+
+        # Create package directory
+        os.mkdir(package_dir)
+
+        # Get module file paths
+        self.file_paths = dict(
+            (x, os.path.join(package_dir, x + '.py'))
+            for x in ('__init__', 'a', 'b', 'c')
+        )
+
+        # Write package file
+        _write_file(self.file_paths['__init__'], '')
+
+        # Write module `a`
+        _write_file(self.file_paths['a'], 'V = 1\n')
+
+        # Write module `b` that imports by absolute name
+        _write_file(
+            self.file_paths['b'],
+            'from _livereload_pkg.a import V\n\n\ndef get():\n    return V\n',
+        )
+
+        # Write module `c` that imports by relative name
+        _write_file(
+            self.file_paths['c'],
+            'from .a import V\n\n\ndef get():\n    return V\n',
+        )
+
+        # Store the flag
+        self._dont_write_bytecode = sys.dont_write_bytecode
+
+        # Not write bytecode files, so that edits are always seen
+        sys.dont_write_bytecode = True
+
+        # Add the temporary directory to module search paths
+        sys.path.insert(0, self.temp_dir)
+
+        # Import the modules
+        __import__('_livereload_pkg.b')
+
+        __import__('_livereload_pkg.c')
+
+        # Create reloader
+        self.reloader = LiveReloader(reload_mode='in_process')
+
+        # Set watched module file paths
+        self.reloader._module_file_paths = set(self.file_paths.values())
+
+    def tearDown(self):
+        """
+        Remove the package.
+
+        :return:
+            None.
+        """
+        # For each module name
+        for module_name in list(sys.modules):
+            # If is the package or its module
+            if module_name.split('.')[0] == '_livereload_pkg':
+                # Remove the module
+                del sys.modules[module_name]
+
+        # Remove the temporary directory from module search paths
+        sys.path.remove(self.temp_dir)
+
+        # Restore the flag
+        sys.dont_write_bytecode = self._dont_write_bytecode
+
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def test_constant_imported_by_name(self):
+        """
+        Test modules importing a constant by name are reloaded after the \
+        module defining the constant.
+        """
+        # Edit module `a`
+        _write_file(self.file_paths['a'], 'V = 2  # Changed\n')
+
+        # Find modules to reload
+        module_names = self.reloader._find_modules_to_reload(
+            [self.file_paths['a']]
+        )
+
+        # Module `a` is reloaded before modules importing from it
+        self.assertEqual(module_names[0], '_livereload_pkg.a')
+
+        self.assertIn('_livereload_pkg.b', module_names)
+
+        self.assertIn('_livereload_pkg.c', module_names)
+
+        # For each module name
+        for module_name in module_names:
+            # Reload the module
+            reload_module(sys.modules[module_name])
+
+        # The modules see the new constant
+        self.assertEqual(sys.modules['_livereload_pkg.b'].get(), 2)
+
+        self.assertEqual(sys.modules['_livereload_pkg.c'].get(), 2)
+
+
+class DispatchPathTest(unittest.TestCase):
+    """
+    Tests of `LiveReloader.dispatch_path`.
+    """
+
+    def setUp(self):
+        """
+        Create a reloader that recursively watches a temporary directory, \
+        and records reload requests.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Create reloader that excludes virtualenv directories
+        self.reloader = LiveReloader(exclude=['*/venv/*'])
+
+        # Watch the temporary directory recursively
+        self.reloader._watch_path_index = self.reloader._build_path_index(
+            paths=set([self.temp_dir]),
+            recursive=True,
+        )
+
+        # Requested file paths
+        self.requested_paths = []
+
+        # Record reload requests instead of reloading
+        self.reloader._request_reload = self.requested_paths.append
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def test_excluded_path(self):
+        """
+        Test events of excluded paths under a recursive watch path do not \
+        request reload.
+        """
+        # Get file paths
+        app_path = os.path.join(self.temp_dir, 'app.py')
+
+        venv_path = os.path.join(
+            self.temp_dir, 'venv', 'lib', 'site-packages', 'mod.py'
+        )
+
+        # Dispatch the file paths
+        self.reloader.dispatch_path(venv_path)
+
+        self.reloader.dispatch_path(app_path)
+
+        # Only the file not excluded requests reload
+        self.assertEqual(self.requested_paths, [app_path])
+
+
+class ImportHookDiscoveryTest(unittest.TestCase):
+    """
+    Tests of finding watch paths in `import_hook` discovery mode.
+    """
+
+    def setUp(self):
+        """
+        Create a reloader, and install its import hook.
+
+        :return:
+            None.
+        """
+        # Create reloader
+        self.reloader = LiveReloader(discovery_mode='import_hook')
+
+        # Install the import hook and scan loaded modules
+        self.reloader._find_watch_paths_incrementally()
+
+    def tearDown(self):
+        """
+        Uninstall the import hook.
+
+        :return:
+            None.
+        """
+        # Uninstall the import hook
+        self.reloader._uninstall_import_hook()
+
+    def test_failed_import_not_retried_forever(self):
+        """
+        Test a module that failed to import is dropped after the retries.
+        """
+        # Get module name that does not exist
+        module_name = '_livereload_missing_module'
+
+        # Try to import the module
+        with self.assertRaises(ImportError):
+            __import__(module_name)
+
+        # For the first look-up and each retry except the last one
+        for _ in range(LiveReloader.PENDING_MODULE_RETRY_COUNT):
+            # The module is pending
+            self.reloader._find_watch_paths_incrementally()
+
+            self.assertIn(module_name, self.reloader._pending_module_names)
+
+        # Run the last retry
+        self.reloader._find_watch_paths_incrementally()
+
+        # The module is dropped
+        self.assertNotIn(module_name, self.reloader._pending_module_names)
+
+
+class ContentVerifyTest(unittest.TestCase):
+    """
+    Tests of verifying content changes using fingerprints.
+    """
+
+    def setUp(self):
+        """
+        Create a file, and a reloader with its fingerprint.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get file path
+        self.file_path = os.path.join(self.temp_dir, 'mod.py')
+
+        # Write the file
+        _write_file(self.file_path, 'X = 1\n')
+
+        # Create reloader
+        self.reloader = LiveReloader(verify_content=True)
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _take_fingerprint(self, mtime):
+        """
+        Set the file's modification time, and take its fingerprint.
+
+        :param mtime:
+            Modification time in seconds.
+
+        :return:
+            None.
+        """
+        # Set the file's modification time
+        os.utime(self.file_path, (mtime, mtime))
+
+        # Take the fingerprint
+        self.reloader._fingerprints[self.file_path] = \
+            get_file_fingerprint(self.file_path)
+
+    def test_same_tick_edit(self):
+        """
+        Test an edit that keeps size and modification time is detected if \
+        the modification time is recent.
+        """
+        # Get current time, as a coarse timestamp tick
+        mtime = int(time.time())
+
+        # Take fingerprint
+        self._take_fingerprint(mtime)
+
+        # Edit the file, keeping the size
+        _write_file(self.file_path, 'X = 2\n')
+
+        # Keep the modification time, like a coarse timestamp does
+        os.utime(self.file_path, (mtime, mtime))
+
+        # The change is detected
+        self.assertTrue(self.reloader._is_content_changed(self.file_path))
+
+    def test_old_unchanged_file(self):
+        """
+        Test a file with old modification time and unchanged size is \
+        treated as not changed.
+        """
+        # Take fingerprint with old modification time
+        self._take_fingerprint(time.time() - 100)
+
+        # The file is not changed
+        self.assertFalse(self.reloader._is_content_changed(self.file_path))
+
+    def test_rewrite_identical_content(self):
+        """
+        Test rewriting identical content is treated as not changed.
+        """
+        # Take fingerprint with old modification time
+        self._take_fingerprint(time.time() - 100)
+
+        # Rewrite identical content, which updates modification time
+        _write_file(self.file_path, 'X = 1\n')
+
+        # The content is not changed
+        self.assertFalse(self.reloader._is_content_changed(self.file_path))
+
+
+class DebounceTest(unittest.TestCase):
+    """
+    Tests of coalescing file change events into one reload.
+    """
+
+    def setUp(self):
+        """
+        Create a reloader that records reloads instead of reloading.
+
+        :return:
+            None.
+        """
+        # Create reloader
+        self.reloader = LiveReloader(
+            debounce_interval=0.2,
+            debounce_max_wait=0.5,
+        )
+
+        # Reload times
+        self.reload_times = []
+
+        # Record reloads instead of reloading
+        self.reloader.reload = lambda: self.reload_times.append(time.time())
+
+    def test_burst_coalesced(self):
+        """
+        Test a burst of events within the quiet window gives one reload, \
+        and events during the reload are ignored.
+        """
+        # For each event in the burst
+        for index in range(10):
+            # Request reload
+            self.reloader._request_reload('/app/mod{}.py'.format(index))
+
+        # Wait until reloaded
+        self.assertTrue(wait_until(lambda: self.reload_times))
+
+        # Request reload during the reload
+        self.reloader._request_reload('/app/mod.py')
+
+        # Wait longer than the quiet window
+        time.sleep(0.4)
+
+        # The burst gives one reload
+        self.assertEqual(len(self.reload_times), 1)
+
+        # All events of the burst are coalesced
+        self.assertEqual(self.reloader.get_reload_event_count(), 10)
+
+    def test_max_wait(self):
+        """
+        Test events that never leave a quiet window reload after the max \
+        wait.
+        """
+        # Get start time
+        start_time = time.time()
+
+        # While not reloaded and not timed out
+        while not self.reload_times and time.time() - start_time < 5:
+            # Request reload
+            self.reloader._request_reload('/app/mod.py')
+
+            # Sleep shorter than the quiet window
+            time.sleep(0.05)
+
+        # Reloaded after the max wait, not after the events ended
+        self.assertEqual(len(self.reload_times), 1)
+
+        self.assertLess(self.reload_times[0] - start_time, 2)
+
+
+class CacheTest(unittest.TestCase):
+    """
+    Tests of saving and loading watch state cache.
+    """
+
+    def setUp(self):
+        """
+        Create module files, and a reloader that saves their watch state.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get cache directory path
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+
+        # Get module file paths
+        self.file_path_a = os.path.join(self.temp_dir, 'a.py')
+
+        self.file_path_b = os.path.join(self.temp_dir, 'b.py')
+
+        # Write module files
+        _write_file(self.file_path_a, 'X = 1\n')
+
+        _write_file(self.file_path_b, 'Y = 1\n')
+
+        # Create reloader of the old process
+        reloader = self._create_reloader()
+
+        # Set module file paths
+        reloader._module_file_paths = set(
+            [self.file_path_a, self.file_path_b]
+        )
+
+        # For each module file path
+        for file_path in reloader._module_file_paths:
+            # Take fingerprint
+            reloader._fingerprints[file_path] = get_file_fingerprint(
+                file_path
+            )
+
+        # Save the cache
+        reloader._save_cache()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _create_reloader(self):
+        """
+        Create reloader that uses the cache directory.
+
+        :return:
+            `LiveReloader` object.
+        """
+        # Create reloader
+        return LiveReloader(cache_dir=self.cache_dir, verify_content=True)
+
+    def test_load(self):
+        """
+        Test a new process loads module file paths and fingerprints.
+        """
+        # Create reloader of the new process
+        reloader = self._create_reloader()
+
+        # Load the cache
+        reloader._load_cache()
+
+        # The module file paths are loaded
+        self.assertEqual(
+            reloader._cached_module_file_paths,
+            set([self.file_path_a, self.file_path_b]),
+        )
+
+        # The fingerprints are loaded
+        self.assertEqual(
+            reloader._fingerprints[self.file_path_a],
+            get_file_fingerprint(self.file_path_a),
+        )
+
+    def test_invalidation(self):
+        """
+        Test removed files and fingerprints of changed files are dropped.
+        """
+        # Change module `a`'s size
+        _write_file(self.file_path_a, 'X = 2  # Changed\n')
+
+        # Remove module `b`
+        os.remove(self.file_path_b)
+
+        # Create reloader of the new process
+        reloader = self._create_reloader()
+
+        # Load the cache
+        reloader._load_cache()
+
+        # The removed module's file path is dropped
+        self.assertEqual(
+            reloader._cached_module_file_paths, set([self.file_path_a])
+        )
+
+        # The changed module's fingerprint is dropped
+        self.assertNotIn(self.file_path_a, reloader._fingerprints)
+
+    def test_corrupt_cache(self):
+        """
+        Test a corrupt cache file is ignored.
+        """
+        # Create reloader of the new process
+        reloader = self._create_reloader()
+
+        # Corrupt the cache file
+        _write_file(reloader._cache_path, 'corrupt')
+
+        # Load the cache
+        reloader._load_cache()
+
+        # Nothing is loaded
+        self.assertEqual(reloader._cached_module_file_paths, set())
+
+        self.assertEqual(reloader._fingerprints, {})
+
+
+class PreflightTest(unittest.TestCase):
+    """
+    Tests of keeping the current process when changed modules are broken.
+    """
+
+    def setUp(self):
+        """
+        Create and import package `_livereload_preflight_pkg` with module \
+        `a`, and a reloader with preflight that records reloads.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get package directory path
+        package_dir = os.path.join(self.temp_dir, '_livereload_preflight_pkg')
+
+        # Create package directory
+        os.mkdir(package_dir)
+
+        # Write package file
+        _write_file(os.path.join(package_dir, '__init__.py'), '')
+
+        # Get module `a`'s file path
+        self.file_path = os.path.join(package_dir, 'a.py')
+
+        # Write module `a`
+        _write_file(self.file_path, 'V = 1\n')
+
+        # Store the flag
+        self._dont_write_bytecode = sys.dont_write_bytecode
+
+        # Not write bytecode files, so that edits are always seen
+        sys.dont_write_bytecode = True
+
+        # Add the temporary directory to module search paths
+        sys.path.insert(0, self.temp_dir)
+
+        # Import the module
+        __import__('_livereload_preflight_pkg.a')
+
+        # Create reloader
+        self.reloader = LiveReloader(
+            reload_mode='spawn_exit', preflight_import=True
+        )
+
+        # Set watched module file paths
+        self.reloader._module_file_paths = set([self.file_path])
+
+        # Reload modes used
+        self.reload_modes = []
+
+        # Record reloads instead of reloading
+        self.reloader._reload_using_mode = self.reload_modes.append
+
+    def tearDown(self):
+        """
+        Remove the package.
+
+        :return:
+            None.
+        """
+        # For each module name
+        for module_name in list(sys.modules):
+            # If is the package or its module
+            if module_name.split('.')[0] == '_livereload_preflight_pkg':
+                # Remove the module
+                del sys.modules[module_name]
+
+        # Remove the temporary directory from module search paths
+        sys.path.remove(self.temp_dir)
+
+        # Restore the flag
+        sys.dont_write_bytecode = self._dont_write_bytecode
+
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _reload(self, text):
+        """
+        Edit module `a`, and reload.
+
+        :param text:
+            Module `a`'s new text.
+
+        :return:
+            None.
+        """
+        # Edit module `a`
+        _write_file(self.file_path, text)
+
+        # Set the flag like `_start_reload`
+        self.reloader._is_reloading = True
+
+        # Set changed file paths
+        self.reloader._reload_file_paths = set([self.file_path])
+
+        # Reload
+        self.reloader.reload()
+
+    def test_syntax_error(self):
+        """
+        Test a module that does not compile aborts the reload.
+        """
+        # Reload with syntax error
+        self._reload('V = (\n')
+
+        # The reload is aborted, and next reload is allowed
+        self.assertEqual(self.reload_modes, [])
+
+        self.assertFalse(self.reloader._is_reloading)
+
+    def test_import_error(self):
+        """
+        Test a module that compiles but fails to import aborts the reload.
+        """
+        # Reload with import error
+        self._reload('import _livereload_missing_module\n')
+
+        # The reload is aborted, and next reload is allowed
+        self.assertEqual(self.reload_modes, [])
+
+        self.assertFalse(self.reloader._is_reloading)
+
+    def test_fixed_module(self):
+        """
+        Test a module that imports goes on reloading.
+        """
+        # Reload with valid code
+        self._reload('V = 2\n')
+
+        # The program is reloaded
+        self.assertEqual(self.reload_modes, ['spawn_exit'])
+
+
+class PreReloadHookTest(unittest.TestCase):
+    """
+    Tests of calling pre-reload hooks within the drain timeout.
+    """
+
+    def test_remaining_time(self):
+        """
+        Test each hook gets the remaining drain time, a hook that overruns \
+        leaves no time to later hooks, and a hook's error does not stop \
+        later hooks.
+        """
+        # Create reloader
+        reloader = LiveReloader(drain_timeout=0.5)
+
+        # Remaining times given to hooks
+        timeouts = []
+
+        def slow_hook(timeout):
+            """
+            Hook that records the time, and overruns it.
+            """
+            # Record the time
+            timeouts.append(timeout)
+
+            # Sleep longer than the time
+            time.sleep(timeout + 0.1)
+
+        def failing_hook(timeout):
+            """
+            Hook that records the time, and raises error.
+            """
+            # Record the time
+            timeouts.append(timeout)
+
+            # Raise error
+            raise ValueError('Failed.')
+
+        # Add hooks
+        reloader.add_pre_reload_hook(slow_hook)
+
+        reloader.add_pre_reload_hook(failing_hook)
+
+        reloader.add_pre_reload_hook(timeouts.append)
+
+        # Call the hooks
+        reloader._run_pre_reload_hooks()
+
+        # All hooks are called
+        self.assertEqual(len(timeouts), 3)
+
+        # The first hook gets the whole drain time
+        self.assertGreater(timeouts[0], 0.4)
+
+        # Hooks after the overrun get no time
+        self.assertEqual(timeouts[1:], [0, 0])
+
+
+# Program that reloads in `blue_green` mode once, passing its listening
+# socket. The new process answers one connection with `new`.
+_BLUE_GREEN_PROGRAM = """
+import os
+import sys
+import time
+
+sys.path.insert(0, {src_dir!r})
+
+from aoiklivereload import LiveReloader
+
+reloader = LiveReloader(reload_mode='blue_green', force_exit=True)
+
+sock = reloader.get_listening_socket('127.0.0.1', {port!r})
+
+is_new = reloader.READY_FD_ENV_KEY in os.environ
+
+reloader.mark_ready()
+
+if is_new:
+    sock.settimeout(10)
+    conn, _ = sock.accept()
+    conn.sendall(b'new')
+    conn.close()
+else:
+    reloader._reload_times = {{'event': time.time()}}
+    reloader.reload_using_blue_green()
+    sys.exit(3)
+"""
+
+
+@unittest.skipIf(sys.platform == 'win32', 'Requires Unix.')
+class BlueGreenTest(unittest.TestCase):
+    """
+    Tests of `blue_green` reload mode.
+    """
+
+    def setUp(self):
+        """
+        Store `sys.argv`, which is the new process's command.
+
+        :return:
+            None.
+        """
+        # Store `sys.argv`
+        self._argv = sys.argv
+
+    def tearDown(self):
+        """
+        Restore `sys.argv`.
+
+        :return:
+            None.
+        """
+        # Restore `sys.argv`
+        sys.argv = self._argv
+
+    def test_handover(self):
+        """
+        Test the old process exits after the new process is ready, and the \
+        new process accepts on the passed listening socket.
+        """
+        # Create temporary directory
+        temp_dir = tempfile.mkdtemp()
+
+        try:
+            # Get a free port
+            probe_sock = socket.socket()
+
+            probe_sock.bind(('127.0.0.1', 0))
+
+            port = probe_sock.getsockname()[1]
+
+            probe_sock.close()
+
+            # Get program file path
+            program_path = os.path.join(temp_dir, 'app.py')
+
+            # Write the program
+            _write_file(program_path, _BLUE_GREEN_PROGRAM.format(
+                src_dir=os.path.dirname(os.path.dirname(
+                    os.path.abspath(__file__)
+                )),
+                port=port,
+            ))
+
+            # Run the old process until it hands over
+            exit_code = subprocess.call(
+                [sys.executable, program_path], cwd=temp_dir
+            )
+
+            # The old process exits after the new process is ready
+            self.assertEqual(exit_code, 0)
+
+            # Connect to the listening socket
+            client_sock = socket.create_connection(('127.0.0.1', port), 10)
+
+            try:
+                # Set read timeout
+                client_sock.settimeout(10)
+
+                # The new process answers
+                self.assertEqual(client_sock.recv(3), b'new')
+
+            finally:
+                # Close the socket
+                client_sock.close()
+
+        finally:
+            # Remove temporary directory
+            shutil.rmtree(temp_dir)
+
+    def _check_aborted(self, code, ready_timeout):
+        """
+        Test the reload is aborted and the current process keeps running \
+        if the new process runs given code.
+
+        :param code:
+            New process's Python code.
+
+        :param ready_timeout:
+            Time to wait for the new process to be ready.
+
+        :return:
+            None.
+        """
+        # Create reloader
+        reloader = LiveReloader(
+            reload_mode='blue_green', ready_timeout=ready_timeout
+        )
+
+        # Set the flag like `_start_reload`
+        reloader._is_reloading = True
+
+        # Set the new process's command
+        sys.argv = ['-c', code]
+
+        # Reload, which returns instead of exiting
+        reloader.reload_using_blue_green()
+
+        # Next reload is allowed
+        self.assertFalse(reloader._is_reloading)
+
+    def test_new_process_exited(self):
+        """
+        Test the reload is aborted if the new process exits before ready.
+        """
+        # Test the new process exits
+        self._check_aborted('import sys; sys.exit(3)', 10)
+
+    def test_new_process_not_ready(self):
+        """
+        Test the reload is aborted if the new process is not ready in time.
+        """
+        # Test the new process hangs
+        self._check_aborted('import time; time.sleep(10)', 0.5)
+
+
+class RelevanceTest(unittest.TestCase):
+    """
+    Tests of `module` relevance mode.
+    """
+
+    def setUp(self):
+        """
+        Create packages `svc1` and `svc2`, and a reloader of a process that \
+        loaded `svc1`'s modules `__init__` and `a`.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # For each package name
+        for package_name in ('svc1', 'svc2'):
+            # Create package directory
+            os.mkdir(os.path.join(self.temp_dir, package_name))
+
+            # For each module name
+            for module_name in ('__init__', 'a', 'b'):
+                # Write module file
+                _write_file(self._get_path(package_name, module_name), '')
+
+        # Get extra file path
+        self.extra_path = os.path.join(self.temp_dir, 'settings.json')
+
+        # Create reloader
+        self.reloader = LiveReloader(
+            relevance_mode='module', extra_paths=[self.extra_path]
+        )
+
+        # Watch the temporary directory recursively
+        self.reloader._watch_path_index = self.reloader._build_path_index(
+            paths=set([self.temp_dir]),
+            recursive=True,
+        )
+
+        # Set loaded module file paths
+        self.reloader._module_file_paths = set([
+            self._get_path('svc1', '__init__'),
+            self._get_path('svc1', 'a'),
+        ])
+
+        # List loaded packages' directories
+        self.reloader._update_package_dir_listings()
+
+        # Requested file paths
+        self.requested_paths = []
+
+        # Record reload requests instead of reloading
+        self.reloader._request_reload = self.requested_paths.append
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _get_path(self, package_name, module_name):
+        """
+        Get module file path.
+
+        :param package_name:
+            Package name.
+
+        :param module_name:
+            Module name.
+
+        :return:
+            Module file path.
+        """
+        # Return module file path
+        return os.path.join(self.temp_dir, package_name, module_name + '.py')
+
+    def test_relevant_files(self):
+        """
+        Test loaded module files, new files in loaded packages, and extra \
+        files request reload.
+        """
+        # Get new file path in loaded package
+        new_path = self._get_path('svc1', 'new')
+
+        # Create the new file
+        _write_file(new_path, '')
+
+        # For each relevant file path
+        for file_path in [self._get_path('svc1', 'a'), new_path,
+                          self.extra_path]:
+            # Dispatch the file path
+            self.reloader.dispatch_path(file_path)
+
+        # All request reload
+        self.assertEqual(
+            self.requested_paths,
+            [self._get_path('svc1', 'a'), new_path, self.extra_path],
+        )
+
+    def test_irrelevant_files(self):
+        """
+        Test files not loaded by the process do not request reload.
+        """
+        # For each irrelevant file path
+        for file_path in [
+            # Existing module not loaded, in loaded package
+            self._get_path('svc1', 'b'),
+            # Module of package not loaded
+            self._get_path('svc2', 'a'),
+            # New file in package not loaded
+            self._get_path('svc2', 'new'),
+        ]:
+            # Dispatch the file path
+            self.reloader.dispatch_path(file_path)
+
+        # None requests reload
+        self.assertEqual(self.requested_paths, [])
@@ -0,0 +1,316 @@
+# coding: utf-8
+"""
+Watcher that runs on an asyncio event loop. Requires Python 3.5+.
+
+Used by `LiveReloader.watch`.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import asyncio
+import atexit
+import os
+import subprocess
+import sys
+
+# Local imports
+from . import inotify
+
+
+async def watch(reloader):
+    """
+    Watch for module file changes on the running event loop.
+
+    On Linux, a non-blocking inotify file descriptor is read by an event \
+    loop reader callback, so no thread is used. In `polling` backend, \
+    polls run on the event loop too. Elsewhere, and in `daemon` backend, \
+    the watcher thread is used but reloads are still scheduled on the \
+    event loop.
+
+    :param reloader:
+        `LiveReloader` object.
+
+    :return:
+        None, after the watcher is stopped. Raise `SystemExit` to end the \
+        program after a new process is spawned in `spawn_exit` and \
+        `spawn_wait` modes.
+    """
+    # If reload mode is `fork_server`, or is `blue_green`, which would block
+    # the event loop while waiting for the new process
+    if reloader._reload_mode in (
+        reloader.RELOAD_MODE_V_FORK_SERVER,
+        reloader.RELOAD_MODE_V_BLUE_GREEN,
+    ):
+        # Get error message
+        error_msg = 'Reload mode {} is not supported by `watch`.'.format(
+            repr(reloader._reload_mode)
+        )
+
+        # Raise error
+        raise ValueError(error_msg)
+
+    # Get the running event loop
+    loop = asyncio.get_event_loop()
+
+    # Create future that is set to the reload mode when reload is needed
+    reload_future = loop.create_future()
+
+    # Make the reloader schedule debounce timers and reloads on the loop
+    reloader._async_loop = loop
+
+    # Make the reloader set the future instead of interrupting the main
+    # thread
+    reloader._async_reload_future = reload_future
+
+    # Create event that wakes up the sleep between checks
+    wake_event = asyncio.Event()
+
+    # Make the reloader set the event instead of the watcher thread's event
+    reloader._async_wake_event = wake_event
+
+    try:
+        # If backend is `polling`
+        if reloader._backend == reloader.BACKEND_V_POLLING:
+            # Watch using polling
+            await _watch_using_polling(reloader, reload_future, wake_event)
+
+        # If backend is not `daemon`, and inotify is available
+        elif reloader._backend != reloader.BACKEND_V_DAEMON \
+                and inotify.is_available():
+            # Watch using inotify
+            await _watch_using_inotify(
+                reloader, loop, reload_future, wake_event
+            )
+
+        # If inotify is not available
+        else:
+            # Watch using the watcher thread
+            await _watch_using_thread(reloader, reload_future)
+
+    finally:
+        # Clear the event loop
+        reloader._async_loop = None
+
+        # Clear the future
+        reloader._async_reload_future = None
+
+        # Clear the wake event
+        reloader._async_wake_event = None
+
+    # If reload is needed
+    if reload_future.done() and not reload_future.cancelled():
+        # Spawn the new process and end the program
+        _spawn_and_exit(reloader, reload_future.result())
+
+
+async def _sleep(reload_future, wake_event, interval):
+    """
+    Sleep until timed out, reload is needed, or the wake event is set.
+
+    :param reload_future:
+        Future that is set when reload is needed.
+
+    :param wake_event:
+        `asyncio.Event` that wakes up the sleep.
+
+    :param interval:
+        Timeout in seconds.
+
+    :return:
+        None.
+    """
+    # Create task that waits for the wake event
+    wake_task = asyncio.ensure_future(wake_event.wait())
+
+    try:
+        # Wait until timed out, or any of them is done
+        await asyncio.wait(
+            [reload_future, wake_task],
+            timeout=interval,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+    finally:
+        # Cancel the task if not done
+        wake_task.cancel()
+
+    # Clear the event for next sleep
+    wake_event.clear()
+
+
+async def _watch_using_inotify(reloader, loop, reload_future, wake_event):
+    """
+    Watch using inotify, with events read by an event loop reader callback.
+
+    :param reloader:
+        `LiveReloader` object.
+
+    :param loop:
+        Event loop.
+
+    :param reload_future:
+        Future that is set when reload is needed.
+
+    :param wake_event:
+        `asyncio.Event` that wakes up the sleep between checks.
+
+    :return:
+        None.
+    """
+    # Create inotify observer
+    observer = inotify.InotifyObserver()
+
+    # Get inotify file descriptor
+    inotify_fd = observer.fileno()
+
+    # Dict that maps file path to `watch object`
+    watche_obj_map = {}
+
+    # Read events when the file descriptor is readable
+    loop.add_reader(inotify_fd, observer.read_events)
+
+    try:
+        # Run change check in a loop
+        while not reloader._watcher_to_stop and not reload_future.done():
+            # Run change check
+            is_changed = reloader._run_watcher_tick(observer, watche_obj_map)
+
+            # Get next check interval
+            interval = reloader._get_next_interval(is_changed)
+
+            # Sleep before next check, or until reload is needed or woken up
+            await _sleep(reload_future, wake_event, interval)
+
+    finally:
+        # Stop reading events
+        loop.remove_reader(inotify_fd)
+
+        # Close inotify file descriptor
+        observer.close()
+
+        # If have import hook finder
+        if reloader._import_hook_finder is not None:
+            # Uninstall the import hook finder
+            reloader._uninstall_import_hook()
+
+
+async def _watch_using_polling(reloader, reload_future, wake_event):
+    """
+    Watch using polling, with polls run on the event loop.
+
+    :param reloader:
+        `LiveReloader` object.
+
+    :param reload_future:
+        Future that is set when reload is needed.
+
+    :param wake_event:
+        `asyncio.Event` that wakes up the sleep between checks.
+
+    :return:
+        None.
+    """
+    # Create polling observer
+    observer = reloader._create_observer()
+
+    # Dict that maps file path to `watch object`
+    watche_obj_map = {}
+
+    try:
+        # Run change check in a loop
+        while not reloader._watcher_to_stop and not reload_future.done():
+            # Run change check
+            is_changed = reloader._run_watcher_tick(observer, watche_obj_map)
+
+            # Poll watched directories
+            reloader._poll_observer(observer)
+
+            # Get next check interval
+            interval = reloader._get_next_interval(is_changed)
+
+            # Sleep before next check, or until reload is needed or woken up
+            await _sleep(reload_future, wake_event, interval)
+
+    finally:
+        # Stop observer
+        observer.stop()
+
+        # If have import hook finder
+        if reloader._import_hook_finder is not None:
+            # Uninstall the import hook finder
+            reloader._uninstall_import_hook()
+
+
+async def _watch_using_thread(reloader, reload_future):
+    """
+    Watch using the watcher thread, with reloads scheduled on the event \
+    loop.
+
+    :param reloader:
+        `LiveReloader` object.
+
+    :param reload_future:
+        Future that is set when reload is needed.
+
+    :return:
+        None.
+    """
+    # Start watcher thread
+    reloader.start_watcher_thread()
+
+    try:
+        # Wait until reload is needed
+        await reload_future
+
+    finally:
+        # Stop the watcher thread
+        reloader.stop_watcher()
+
+
+def _spawn_and_exit(reloader, reload_mode):
+    """
+    Spawn the new process, then raise `SystemExit` to end the program.
+
+    :param reloader:
+        `LiveReloader` object.
+
+    :param reload_mode:
+        Reload mode, `spawn_exit` or `spawn_wait`.
+
+    :return:
+        Not return.
+    """
+    # Create command parts
+    cmd_parts = [sys.executable] + sys.argv
+
+    # Get env dict for the new process.
+    #
+    # This also records the new process's start time in reload stats.
+    #
+    env_copy = reloader._get_reload_env()
+
+    # Spawn subprocess.
+    #
+    # It is spawned before the program ends so that listening sockets are
+    # still open when passed to it.
+    #
+    process = subprocess.Popen(
+        cmd_parts, env=env_copy, **reloader._get_popen_kwargs()
+    )
+
+    # If reload mode is `spawn_wait`
+    if reload_mode == reloader.RELOAD_MODE_V_SPAWN_WAIT:
+        # Wait for the subprocess when the program ends
+        atexit.register(process.wait)
+
+    # If reload mode is `spawn_exit` and need force exit
+    elif reloader._force_exit:
+        # Force exit
+        os._exit(0)  # pylint: disable=protected-access
+
+    # End the program.
+    #
+    # Raised in the event loop, this ends the loop and the program normally,
+    # instead of interrupting the main thread.
+    #
+    raise SystemExit(0)
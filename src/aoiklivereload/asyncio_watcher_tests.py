@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+Tests of `asyncio_watcher` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import sys
+import time
+import unittest
+
+# Local imports
+from .aoiklivereload import LiveReloader
+
+
+@unittest.skipUnless(sys.version_info >= (3, 5), 'Requires Python 3.5+.')
+class WatchTest(unittest.TestCase):
+    """
+    Tests of `LiveReloader.watch`.
+    """
+
+    def _check_wake_up(self, backend):
+        """
+        Test `stop_watcher` wakes up `watch`'s sleep between checks.
+
+        :param backend:
+            Backend.
+
+        :return:
+            None.
+        """
+        # Import `asyncio`, available in Python 3.4+
+        import asyncio
+
+        # Create reloader that sleeps long between checks
+        reloader = LiveReloader(backend=backend, interval=60)
+
+        # Create event loop
+        loop = asyncio.new_event_loop()
+
+        try:
+            # Stop the watcher soon after it starts sleeping
+            loop.call_later(0.2, reloader.stop_watcher)
+
+            # Get start time
+            start_time = time.time()
+
+            # Run the watcher until it is stopped
+            loop.run_until_complete(asyncio.wait_for(reloader.watch(), 10))
+
+            # The watcher stops without sleeping the whole interval
+            self.assertLess(time.time() - start_time, 5)
+
+        finally:
+            # Close the event loop
+            loop.close()
+
+    def test_wake_up_inotify(self):
+        """
+        Test `stop_watcher` wakes up `watch` in `inotify` backend.
+        """
+        # Test waking up
+        self._check_wake_up('inotify')
+
+    def test_wake_up_polling(self):
+        """
+        Test `stop_watcher` wakes up `watch` in `polling` backend.
+        """
+        # Test waking up
+        self._check_wake_up('polling')
@@ -0,0 +1,5 @@
+# coding: utf-8
+"""
+Package.
+"""
+from __future__ import absolute_import
@@ -0,0 +1,646 @@
+# coding: utf-8
+"""
+Benchmark for watch path discovery and event dispatch.
+
+Generates synthetic module trees, fakes `sys.modules` and `sys.path`, and \
+reports per-tick discovery time, short path trie build time, prefix index \
+build time, discovery memory, and per-event dispatch throughput.
+
+Run:
+```
+python -m aoiklivereload.benchmark.discovery_benchmark --sizes 1000,10000
+```
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+
+try:
+    # Python 3.4+
+    import tracemalloc
+except ImportError:
+    # Python 2
+    tracemalloc = None
+
+
+# Layout constants.
+#
+# `wide`: Few levels, many packages in each level.
+#
+# `deep`: Many levels, few packages in each level.
+#
+LAYOUT_V_WIDE = 'wide'
+
+LAYOUT_V_DEEP = 'deep'
+
+LAYOUT_VALUES = (
+    LAYOUT_V_WIDE,
+    LAYOUT_V_DEEP,
+)
+
+
+# Number of modules in each synthetic package directory
+_MODULES_PER_PACKAGE = 10
+
+
+# Prefix of fake module names in `sys.modules`
+_FAKE_MODULE_PREFIX = '_aoiklivereload_benchmark_'
+
+
+class _FakeEvent(object):
+    """
+    Fake file system event that has only `src_path`.
+    """
+
+    def __init__(self, src_path):
+        """
+        Constructor.
+
+        :param src_path:
+            File path.
+
+        :return:
+            None.
+        """
+        # Store file path
+        self.src_path = src_path
+
+
+def _create_package_dirs(root_dir, package_count, layout):
+    """
+    Create synthetic package directories.
+
+    :param root_dir:
+        Root directory path.
+
+    :param package_count:
+        Number of package directories to create.
+
+    :param layout:
+        Layout, 'wide' or 'deep'.
+
+    :return:
+        List of package directory paths.
+    """
+    # Package directory paths
+    package_dirs = []
+
+    # If layout is `wide`
+    if layout == LAYOUT_V_WIDE:
+        # Number of packages in each top package
+        fanout = 100
+
+        # For each package index
+        for index in range(package_count):
+            # Get package directory path
+            package_dir = os.path.join(
+                root_dir,
+                'top{}'.format(index // fanout),
+                'pkg{}'.format(index % fanout),
+            )
+
+            # Add to package directory paths
+            package_dirs.append(package_dir)
+
+    # If layout is `deep`
+    else:
+        # Number of levels of each package chain
+        depth = 20
+
+        # For each package index
+        for index in range(package_count):
+            # Get chain index
+            chain_index = index // depth
+
+            # Get level in the chain
+            level = index % depth
+
+            # Get package directory path
+            package_dir = os.path.join(
+                root_dir,
+                'chain{}'.format(chain_index),
+                *['lv{}'.format(x) for x in range(level + 1)]
+            )
+
+            # Add to package directory paths
+            package_dirs.append(package_dir)
+
+    # For each package directory path
+    for package_dir in package_dirs:
+        # If the directory not exists
+        if not os.path.isdir(package_dir):
+            # Create the directory.
+            #
+            # Only directories are created because the reloader looks at
+            # module directories only.
+            #
+            os.makedirs(package_dir)
+
+    # Return package directory paths
+    return package_dirs
+
+
+def _install_fake_modules(package_dirs, module_count):
+    """
+    Put fake modules in `sys.modules`.
+
+    :param package_dirs:
+        Package directory paths.
+
+    :param module_count:
+        Number of fake modules.
+
+    :return:
+        List of fake module file paths.
+    """
+    # Fake module file paths
+    module_paths = []
+
+    # For each module index
+    for index in range(module_count):
+        # Get package directory path
+        package_dir = package_dirs[index // _MODULES_PER_PACKAGE]
+
+        # Get module file path
+        module_path = os.path.join(package_dir, 'mod{}.py'.format(index))
+
+        # Create fake module
+        module = types.ModuleType('{}{}'.format(_FAKE_MODULE_PREFIX, index))
+
+        # Set module file path
+        module.__file__ = module_path
+
+        # Put in `sys.modules`
+        sys.modules[module.__name__] = module
+
+        # Add to module file paths
+        module_paths.append(module_path)
+
+    # Return module file paths
+    return module_paths
+
+
+def _uninstall_fake_modules():
+    """
+    Remove fake modules from `sys.modules`.
+
+    :return:
+        None.
+    """
+    # For each module name
+    for module_name in list(sys.modules):
+        # If the module is fake
+        if module_name.startswith(_FAKE_MODULE_PREFIX):
+            # Remove the module
+            del sys.modules[module_name]
+
+
+def _time_calls(func, repeat):
+    """
+    Call given function repeatedly and get the best time.
+
+    :param func:
+        Function to call.
+
+    :param repeat:
+        Number of calls.
+
+    :return:
+        Best time in seconds.
+    """
+    # Best time
+    best_time = None
+
+    # For each call
+    for _ in range(repeat):
+        # Get start time
+        start_time = time.time()
+
+        # Call the function
+        func()
+
+        # Get used time
+        used_time = time.time() - start_time
+
+        # If the used time is the best
+        if best_time is None or used_time < best_time:
+            # Store the best time
+            best_time = used_time
+
+    # Return the best time
+    return best_time
+
+
+def _measure_peak_memory(func):
+    """
+    Call given function and get peak memory allocated during the call.
+
+    :param func:
+        Function to call.
+
+    :return:
+        Peak memory in bytes, or None if `tracemalloc` is not available.
+    """
+    # If `tracemalloc` is not available
+    if tracemalloc is None:
+        # Call the function
+        func()
+
+        # Return None
+        return None
+
+    # Start tracing
+    tracemalloc.start()
+
+    try:
+        # Call the function
+        func()
+
+        # Get peak memory
+        _, peak_memory = tracemalloc.get_traced_memory()
+
+    finally:
+        # Stop tracing
+        tracemalloc.stop()
+
+    # Return peak memory
+    return peak_memory
+
+
+def run_benchmark(module_count, layout, watch_mode, repeat, event_count):
+    """
+    Run benchmark on one synthetic module tree.
+
+    :param module_count:
+        Number of fake modules.
+
+    :param layout:
+        Layout, 'wide' or 'deep'.
+
+    :param watch_mode:
+        Reloader's watch mode.
+
+    :param repeat:
+        Number of repeats of each timed operation.
+
+    :param event_count:
+        Number of events to dispatch.
+
+    :return:
+        Result dict.
+    """
+    # Import reloader class
+    from aoiklivereload import LiveReloader
+
+    # Create reloader class that counts reload requests instead of reloading
+    class _BenchmarkReloader(LiveReloader):
+        """
+        Reloader that counts reload requests instead of reloading.
+        """
+
+        # Number of reload requests
+        request_count = 0
+
+        def _request_reload(self, file_path):
+            """
+            Count reload request.
+
+            :param file_path:
+                Changed file path.
+
+            :return:
+                None.
+            """
+            # Increment number of reload requests
+            self.request_count += 1
+
+    # Create root directory
+    root_dir = tempfile.mkdtemp(prefix='aoiklivereload_benchmark_')
+
+    # Get `sys.path` copy
+    old_sys_path = list(sys.path)
+
+    try:
+        # Get number of package directories
+        package_count = \
+            (module_count + _MODULES_PER_PACKAGE - 1) // _MODULES_PER_PACKAGE
+
+        # Create package directories
+        package_dirs = _create_package_dirs(
+            root_dir=root_dir,
+            package_count=package_count,
+            layout=layout,
+        )
+
+        # Put fake modules in `sys.modules`
+        module_paths = _install_fake_modules(
+            package_dirs=package_dirs,
+            module_count=module_count,
+        )
+
+        # Fake `sys.path`
+        sys.path[:] = [root_dir] + old_sys_path
+
+        # Create reloader
+        reloader = _BenchmarkReloader(
+            watch_mode=watch_mode,
+            discovery_mode=LiveReloader.DISCOVERY_MODE_V_SCAN,
+        )
+
+        # Time the first discovery tick, with empty path filter cache
+        first_tick_time = _time_calls(reloader._find_watch_paths, 1)
+
+        # Time later discovery ticks in `scan` discovery mode
+        scan_tick_time = _time_calls(reloader._find_watch_paths, repeat)
+
+        # Measure discovery tick's peak memory
+        peak_memory = _measure_peak_memory(reloader._find_watch_paths)
+
+        # Get watch directory paths
+        watch_dir_paths = reloader._find_watch_dir_paths()
+
+        # Time short path trie build
+        trie_time = _time_calls(
+            lambda: reloader._find_short_paths(watch_dir_paths), repeat
+        )
+
+        # Get final watch paths
+        watch_paths = reloader._get_final_watch_paths(watch_dir_paths)
+
+        # Time prefix index build
+        index_time = _time_calls(
+            lambda: reloader._build_path_index(
+                watch_paths,
+                recursive=(watch_mode == LiveReloader.WATCH_MODE_V_RECURSIVE),
+            ),
+            repeat,
+        )
+
+        # Create hook mode reloader
+        hook_reloader = _BenchmarkReloader(
+            watch_mode=watch_mode,
+            discovery_mode=LiveReloader.DISCOVERY_MODE_V_IMPORT_HOOK,
+        )
+
+        # Run the first discovery tick, which scans `sys.modules`
+        hook_reloader._find_watch_paths_incrementally()
+
+        try:
+            # Time steady state discovery ticks in `import_hook` mode
+            hook_tick_time = _time_calls(
+                hook_reloader._find_watch_paths_incrementally, repeat
+            )
+
+        finally:
+            # Uninstall the import hook
+            hook_reloader._uninstall_import_hook()
+
+        # Install the watch paths' prefix index
+        reloader._watch_path_index = reloader._build_path_index(
+            watch_paths,
+            recursive=(watch_mode == LiveReloader.WATCH_MODE_V_RECURSIVE),
+        )
+
+        # Create events, alternating `.py` and `.pyc` changes
+        events = [
+            _FakeEvent(
+                module_paths[x % len(module_paths)] + ('c' if x % 2 else '')
+            )
+            for x in range(event_count)
+        ]
+
+        # Get dispatch function
+        dispatch = reloader.dispatch
+
+        # Create function that dispatches all events
+        def dispatch_events():
+            """
+            Dispatch all events.
+
+            :return:
+                None.
+            """
+            # For each event
+            for event in events:
+                # Dispatch the event
+                dispatch(event)
+
+        # Time dispatching
+        dispatch_time = _time_calls(dispatch_events, repeat)
+
+        # Return result dict
+        return {
+            'modules': module_count,
+            'layout': layout,
+            'watch_mode': watch_mode,
+            'watch_paths': len(watch_paths),
+            'first_tick_ms': first_tick_time * 1000,
+            'scan_tick_ms': scan_tick_time * 1000,
+            'hook_tick_ms': hook_tick_time * 1000,
+            'trie_ms': trie_time * 1000,
+            'index_ms': index_time * 1000,
+            'peak_kb': (
+                None if peak_memory is None else peak_memory / 1024.0
+            ),
+            'events_per_s': (
+                event_count / dispatch_time if dispatch_time else None
+            ),
+        }
+
+    finally:
+        # Restore `sys.path`
+        sys.path[:] = old_sys_path
+
+        # Remove fake modules
+        _uninstall_fake_modules()
+
+        # Remove root directory
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+def _format_value(value):
+    """
+    Format table cell value.
+
+    :param value:
+        Value.
+
+    :return:
+        Text.
+    """
+    # If the value is None
+    if value is None:
+        # Return `n/a`
+        return 'n/a'
+
+    # If the value is float
+    if isinstance(value, float):
+        # Return with 3 decimal places
+        return '{:.3f}'.format(value)
+
+    # Return as text
+    return str(value)
+
+
+def print_results(results):
+    """
+    Print results in a table.
+
+    :param results:
+        List of result dicts.
+
+    :return:
+        None.
+    """
+    # Column keys
+    keys = (
+        'modules',
+        'layout',
+        'watch_mode',
+        'watch_paths',
+        'first_tick_ms',
+        'scan_tick_ms',
+        'hook_tick_ms',
+        'trie_ms',
+        'index_ms',
+        'peak_kb',
+        'events_per_s',
+    )
+
+    # Rows of cell texts, with the header row being the first
+    rows = [list(keys)] + [
+        [_format_value(result[key]) for key in keys] for result in results
+    ]
+
+    # Get column widths
+    widths = [max(len(row[x]) for row in rows) for x in range(len(keys))]
+
+    # For each row
+    for row in rows:
+        # Print the row
+        print('  '.join(
+            cell.rjust(width) for cell, width in zip(row, widths)
+        ))
+
+
+def main(args=None):
+    """
+    Main function.
+
+    :param args:
+        Command line arguments list. Default is `sys.argv[1:]`.
+
+    :return:
+        Exit code.
+    """
+    # Create arguments parser
+    parser = argparse.ArgumentParser(
+        description='Benchmark watch path discovery and event dispatch.'
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--sizes',
+        default='1000,10000,100000',
+        help='Comma-separated numbers of modules. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--layouts',
+        default=','.join(LAYOUT_VALUES),
+        help='Comma-separated layouts. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--watch-modes',
+        default='recursive,precise',
+        help='Comma-separated watch modes. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='Number of repeats of each timed operation. '
+        'Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--events',
+        type=int,
+        default=100000,
+        help='Number of events to dispatch. Default is %(default)s.',
+    )
+
+    # Parse arguments
+    parsed_args = parser.parse_args(args)
+
+    # Get `src` directory's absolute path
+    src_path = os.path.dirname(
+        # `aoiklivereload` directory's absolute path
+        os.path.dirname(
+            # `benchmark` directory's absolute path
+            os.path.dirname(
+                # This file's absolute path
+                os.path.abspath(__file__)
+            )
+        )
+    )
+
+    # If the `src` directory path is not in `sys.path`
+    if src_path not in sys.path:
+        # Add to `sys.path`
+        sys.path.append(src_path)
+
+    # Results list
+    results = []
+
+    # For each number of modules
+    for module_count in parsed_args.sizes.split(','):
+        # For each layout
+        for layout in parsed_args.layouts.split(','):
+            # If the layout is not valid
+            if layout not in LAYOUT_VALUES:
+                # Print error
+                sys.stderr.write('Invalid layout: {}.\n'.format(repr(layout)))
+
+                # Return error code
+                return 1
+
+            # For each watch mode
+            for watch_mode in parsed_args.watch_modes.split(','):
+                # Run benchmark
+                result = run_benchmark(
+                    module_count=int(module_count),
+                    layout=layout,
+                    watch_mode=watch_mode,
+                    repeat=parsed_args.repeat,
+                    event_count=parsed_args.events,
+                )
+
+                # Add to results
+                results.append(result)
+
+    # Print results
+    print_results(results)
+
+    # Return success code
+    return 0
+
+
+# If is run as main module
+if __name__ == '__main__':
+    # Call main function
+    exit(main())
@@ -0,0 +1,493 @@
+# coding: utf-8
+"""
+End-to-end restart benchmark built on the bundled framework demos.
+
+Launches each demo under each reload mode, edits the demo's response text \
+in a copy of the demo file, and measures time from the edit to the first \
+response with the new text, and the number of failed requests during the \
+restart window.
+
+Run:
+```
+python -m aoiklivereload.benchmark.restart_benchmark --frameworks tornado
+```
+
+Notice the demos listen on port 8000.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+try:
+    # Python 3
+    from urllib.request import urlopen
+except ImportError:
+    # Python 2
+    from urllib2 import urlopen
+
+
+# Framework names, also demo module names' prefixes
+FRAMEWORK_VALUES = (
+    'bottle',
+    'flask',
+    'sanic',
+    'tornado',
+)
+
+
+# Reload modes to benchmark by default
+DEFAULT_RELOAD_MODES = (
+    'exec',
+    'spawn_exit',
+    'spawn_wait',
+    'fork_server',
+    'in_process',
+    'blue_green',
+)
+
+
+# Demo server URL
+_SERVER_URL = 'http://127.0.0.1:8000/'
+
+
+# Response text before the edit
+_OLD_TEXT = 'hello'
+
+
+# Response text after the edit
+_NEW_TEXT = 'hello_reloaded'
+
+
+def _request():
+    """
+    Send a request to the demo server.
+
+    :return:
+        Response text, or None if failed.
+    """
+    try:
+        # Send request
+        response = urlopen(_SERVER_URL, timeout=1)
+
+        try:
+            # Return response text
+            return response.read().decode('utf-8')
+
+        finally:
+            # Close response
+            response.close()
+
+    # If have error
+    except Exception:  # pylint: disable=broad-except
+        # Return None
+        return None
+
+
+def _wait_for_text(text, timeout):
+    """
+    Wait until the demo server responds with given text.
+
+    :param text:
+        Expected response text.
+
+    :param timeout:
+        Timeout in seconds.
+
+    :return:
+        Whether got the text.
+    """
+    # Get deadline
+    deadline = time.time() + timeout
+
+    # While not timed out
+    while time.time() < deadline:
+        # If got the text
+        if _request() == text:
+            # Return success
+            return True
+
+        # Sleep before next try
+        time.sleep(0.05)
+
+    # Return failure
+    return False
+
+
+def _is_framework_available(framework):
+    """
+    Test whether given framework can be imported by the benchmarked Python.
+
+    :param framework:
+        Framework name.
+
+    :return:
+        Boolean.
+    """
+    # Return whether importing succeeds
+    return subprocess.call(
+        [sys.executable, '-c', 'import {}'.format(framework)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ) == 0
+
+
+def _kill_process_group(process):
+    """
+    Kill given process and the processes it spawned.
+
+    :param process:
+        `subprocess.Popen` object.
+
+    :return:
+        None.
+    """
+    # If is in Windows
+    if sys.platform == 'win32':
+        # Kill the process tree
+        subprocess.call(
+            ['taskkill', '/F', '/T', '/PID', str(process.pid)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    # If is not in Windows
+    else:
+        try:
+            # Kill the process group, which contains processes spawned by
+            # reloads
+            os.killpg(process.pid, signal.SIGKILL)
+
+        # If the process group has exited
+        except OSError:
+            # Ignore
+            pass
+
+    # Wait for the process to exit
+    process.wait()
+
+
+def run_benchmark(framework, reload_mode, timeout, src_path):
+    """
+    Run benchmark on one demo under one reload mode.
+
+    :param framework:
+        Framework name.
+
+    :param reload_mode:
+        Reload mode.
+
+    :param timeout:
+        Timeout in seconds for the server to start or restart.
+
+    :param src_path:
+        `src` directory path that contains `aoiklivereload` package.
+
+    :return:
+        Result dict.
+    """
+    # Get demo file path
+    demo_path = os.path.join(
+        src_path, 'aoiklivereload', 'demo', '{}_demo.py'.format(framework)
+    )
+
+    # Create temporary directory
+    tmp_dir = tempfile.mkdtemp(prefix='aoiklivereload_benchmark_')
+
+    # Get demo copy's file path.
+    #
+    # The demo is copied so that editing it does not change the original.
+    #
+    demo_copy_path = os.path.join(tmp_dir, os.path.basename(demo_path))
+
+    # Copy the demo file
+    shutil.copyfile(demo_path, demo_copy_path)
+
+    # Get env dict copy
+    env = os.environ.copy()
+
+    # Set reload mode
+    env['AOIKLIVERELOAD_DEMO_RELOAD_MODE'] = reload_mode
+
+    # Make `aoiklivereload` importable from the demo copy
+    env['PYTHONPATH'] = os.pathsep.join(
+        [src_path] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    )
+
+    # Create result dict
+    result = {
+        'framework': framework,
+        'reload_mode': reload_mode,
+        'start_s': None,
+        'restart_s': None,
+        'ok': 0,
+        'failed': 0,
+    }
+
+    # Get start time
+    start_time = time.time()
+
+    # Start the demo.
+    #
+    # A new session is used so that processes spawned by reloads can be
+    # killed together.
+    #
+    process = subprocess.Popen(
+        [sys.executable, demo_copy_path],
+        cwd=tmp_dir,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        **({} if sys.platform == 'win32' else {'preexec_fn': os.setsid})
+    )
+
+    # Drain the demo's output in a thread so that the demo never blocks on
+    # writing
+    output_thread = threading.Thread(target=process.stdout.read)
+
+    # Use daemon thread
+    output_thread.daemon = True
+
+    # Start the thread
+    output_thread.start()
+
+    try:
+        # If the demo does not start in time
+        if not _wait_for_text(_OLD_TEXT, timeout):
+            # Return the result
+            return result
+
+        # Store start time
+        result['start_s'] = time.time() - start_time
+
+        # Wait for the watcher to discover the demo's modules
+        time.sleep(2)
+
+        # Read the demo copy's code
+        with open(demo_copy_path) as file_obj:
+            code = file_obj.read()
+
+        # Change the response text
+        code = code.replace(
+            "'{}'".format(_OLD_TEXT), "'{}'".format(_NEW_TEXT)
+        )
+
+        # Get edit time
+        edit_time = time.time()
+
+        # Write the demo copy's code
+        with open(demo_copy_path, 'w') as file_obj:
+            file_obj.write(code)
+
+        # Get deadline
+        deadline = edit_time + timeout
+
+        # While not timed out
+        while time.time() < deadline:
+            # Send request
+            text = _request()
+
+            # If the request failed
+            if text is None:
+                # Increment failed count
+                result['failed'] += 1
+
+                # Sleep before next request
+                time.sleep(0.01)
+
+                # Continue
+                continue
+
+            # Increment OK count
+            result['ok'] += 1
+
+            # If the response is from the new code
+            if text == _NEW_TEXT:
+                # Store restart time
+                result['restart_s'] = time.time() - edit_time
+
+                # Stop
+                break
+
+        # Return the result
+        return result
+
+    finally:
+        # Kill the demo
+        _kill_process_group(process)
+
+        # Remove temporary directory
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _format_value(value):
+    """
+    Format table cell value.
+
+    :param value:
+        Value.
+
+    :return:
+        Text.
+    """
+    # If the value is None
+    if value is None:
+        # Return `n/a`
+        return 'n/a'
+
+    # If the value is float
+    if isinstance(value, float):
+        # Return with 3 decimal places
+        return '{:.3f}'.format(value)
+
+    # Return as text
+    return str(value)
+
+
+def print_results(results):
+    """
+    Print results in a table.
+
+    :param results:
+        List of result dicts.
+
+    :return:
+        None.
+    """
+    # Column keys
+    keys = (
+        'framework',
+        'reload_mode',
+        'start_s',
+        'restart_s',
+        'ok',
+        'failed',
+    )
+
+    # Rows of cell texts, with the header row being the first
+    rows = [list(keys)] + [
+        [_format_value(result[key]) for key in keys] for result in results
+    ]
+
+    # Get column widths
+    widths = [max(len(row[x]) for row in rows) for x in range(len(keys))]
+
+    # For each row
+    for row in rows:
+        # Print the row
+        print('  '.join(
+            cell.rjust(width) for cell, width in zip(row, widths)
+        ))
+
+
+def main(args=None):
+    """
+    Main function.
+
+    :param args:
+        Command line arguments list. Default is `sys.argv[1:]`.
+
+    :return:
+        Exit code.
+    """
+    # Create arguments parser
+    parser = argparse.ArgumentParser(
+        description='Benchmark restarts of the framework demos.'
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--frameworks',
+        default=','.join(FRAMEWORK_VALUES),
+        help='Comma-separated frameworks. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--modes',
+        default=','.join(DEFAULT_RELOAD_MODES),
+        help='Comma-separated reload modes. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=30,
+        help='Timeout in seconds for a demo to start or restart. '
+        'Default is %(default)s.',
+    )
+
+    # Parse arguments
+    parsed_args = parser.parse_args(args)
+
+    # Get `src` directory's absolute path
+    src_path = os.path.dirname(
+        # `aoiklivereload` directory's absolute path
+        os.path.dirname(
+            # `benchmark` directory's absolute path
+            os.path.dirname(
+                # This file's absolute path
+                os.path.abspath(__file__)
+            )
+        )
+    )
+
+    # Results list
+    results = []
+
+    # For each framework
+    for framework in parsed_args.frameworks.split(','):
+        # If the framework is not valid
+        if framework not in FRAMEWORK_VALUES:
+            # Print error
+            sys.stderr.write(
+                'Invalid framework: {}.\n'.format(repr(framework))
+            )
+
+            # Return error code
+            return 1
+
+        # If the framework is not installed
+        if not _is_framework_available(framework):
+            # Print message
+            sys.stderr.write(
+                'Skip framework not installed: {}.\n'.format(framework)
+            )
+
+            # Skip
+            continue
+
+        # For each reload mode
+        for reload_mode in parsed_args.modes.split(','):
+            # Run benchmark
+            result = run_benchmark(
+                framework=framework,
+                reload_mode=reload_mode,
+                timeout=parsed_args.timeout,
+                src_path=src_path,
+            )
+
+            # Add to results
+            results.append(result)
+
+    # Print results
+    print_results(results)
+
+    # Return success code
+    return 0
+
+
+# If is run as main module
+if __name__ == '__main__':
+    # Call main function
+    exit(main())
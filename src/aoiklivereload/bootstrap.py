@@ -0,0 +1,303 @@
+# coding: utf-8
+"""
+Bootstrap that runs the target program in the supervisor's child process, \
+and reports imported module file paths to the supervisor.
+
+Run by the supervisor as a script file, not as a module of the package, so \
+that the package is not imported in the child process:
+```
+python /path/to/bootstrap.py script.py args
+python /path/to/bootstrap.py -m module args
+```
+
+Module file paths are written to the pipe file descriptor given in \
+environment variable `AOIKLIVERELOAD_MODULE_PATHS_FD`, one path per line.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import runpy
+import sys
+import threading
+
+# Local imports.
+#
+# This file's directory is `sys.path[0]`, so the package's `import_hook`
+# module is imported as a top-level module, without importing the package,
+# which would import the package's dependencies in the child process.
+#
+import import_hook
+from import_hook import ImportHookFinder
+from import_hook import PENDING_MODULE_RETRY_COUNT
+from import_hook import get_module_file_path
+
+# Remove the top-level module so that the target program's module of the
+# same name, if any, is imported.
+del sys.modules[import_hook.__name__]
+
+
+# Environment variable name that passes the pipe file descriptor module file
+# paths are written to.
+#
+# Same as `Supervisor.MODULE_PATHS_FD_ENV_KEY`.
+#
+MODULE_PATHS_FD_ENV_KEY = 'AOIKLIVERELOAD_MODULE_PATHS_FD'
+
+
+# Interval in seconds to retry looking up modules that are being imported
+_RETRY_INTERVAL = 0.5
+
+
+def _write_paths(fd, paths):
+    """
+    Write paths to the pipe, one path per line.
+
+    :param fd:
+        Pipe file descriptor.
+
+    :param paths:
+        List of paths.
+
+    :return:
+        None. Raise `OSError` if failed.
+    """
+    # Encode paths
+    data = ''.join(x + '\n' for x in paths).encode(
+        sys.getfilesystemencoding() or 'utf-8'
+    )
+
+    # While have data to write
+    while data:
+        # Write data
+        written_size = os.write(fd, data)
+
+        # Remove written data
+        data = data[written_size:]
+
+
+def _run_writer(fd, recorder):
+    """
+    Writer thread's function that reports imported module file paths.
+
+    :param fd:
+        Pipe file descriptor.
+
+    :param recorder:
+        `ImportHookFinder` object.
+
+    :return:
+        None.
+    """
+    # Dict that maps name of recorded module that is not in `sys.modules`
+    # yet to number of retries so far
+    pending_module_names = {}
+
+    # Run in a loop
+    while True:
+        # Wait until a module is being imported, or retry pending modules
+        recorder.event.wait(
+            _RETRY_INTERVAL if pending_module_names else None
+        )
+
+        # Clear the event
+        recorder.event.clear()
+
+        # Get recorded module names
+        module_names = recorder.pop_module_names()
+
+        # Get pending module names' retry counts
+        retry_counts = pending_module_names
+
+        # Add pending module names
+        module_names.extend(retry_counts)
+
+        # Clear pending module names
+        pending_module_names = {}
+
+        # Module file paths to write
+        paths = []
+
+        # For each module name
+        for module_name in module_names:
+            # If is the main module, which is this file or the target
+            # program's main file reported by `main`
+            if module_name == '__main__':
+                # Skip
+                continue
+
+            # Get module
+            module = sys.modules.get(module_name, None)
+
+            # If the module is about to be imported, or failed to import
+            if module is None:
+                # Get number of retries so far
+                retry_count = retry_counts.get(module_name, 0)
+
+                # If have retries left.
+                #
+                # A module still not found after the retries has failed to
+                # import, and is dropped.
+                #
+                if retry_count < PENDING_MODULE_RETRY_COUNT:
+                    # Retry later
+                    pending_module_names[module_name] = retry_count + 1
+
+                # Skip
+                continue
+
+            # Get module file path
+            module_file_path = get_module_file_path(module)
+
+            # If have module file path
+            if module_file_path is not None:
+                # Add to paths to write
+                paths.append(module_file_path)
+
+        try:
+            # Write the paths
+            _write_paths(fd, paths)
+
+        # If have error, e.g. the supervisor has exited
+        except OSError:
+            # Stop reporting
+            return
+
+
+def _find_module_file_path(module_name):
+    """
+    Find given module's file path without running it.
+
+    :param module_name:
+        Module name.
+
+    :return:
+        Module file path, or None if not found.
+    """
+    try:
+        # Python 3.4+
+        from importlib.util import find_spec
+
+    # If is Python 2
+    except ImportError:
+        # Import `pkgutil`
+        import pkgutil
+
+        try:
+            # Get module loader
+            loader = pkgutil.get_loader(module_name)
+
+            # Return module file path
+            return os.path.abspath(loader.get_filename()) if loader else None
+
+        # If have error
+        except Exception:  # pylint: disable=broad-except
+            # Return None
+            return None
+
+    try:
+        # Find module spec
+        spec = find_spec(module_name)
+
+    # If have error, e.g. parent package not found
+    except Exception:  # pylint: disable=broad-except
+        # Return None
+        return None
+
+    # If the module has no file
+    if spec is None or not spec.has_location:
+        # Return None
+        return None
+
+    # Return module file path
+    return os.path.abspath(spec.origin)
+
+
+def main():
+    """
+    Main function.
+
+    :return:
+        None.
+    """
+    # Get pipe file descriptor, and remove it from environment so that
+    # the target program's subprocesses do not see it
+    fd = int(os.environ.pop(MODULE_PATHS_FD_ENV_KEY))
+
+    # Get target program's arguments
+    args = sys.argv[1:]
+
+    # If is to run a module
+    if args[0] == '-m':
+        # Get module name
+        module_name = args[1]
+
+        # Set `sys.argv` like `python -m`, which is updated by `runpy`
+        sys.argv = [args[1]] + args[2:]
+
+        # Replace this file's directory in `sys.path` with current
+        # directory like `python -m`
+        sys.path[0] = os.getcwd()
+
+        # Script path
+        script_path = None
+
+        # Get the module's file path, which is not imported by finders
+        main_file_path = _find_module_file_path(module_name)
+
+    # If is to run a script
+    else:
+        # Get script path
+        script_path = os.path.abspath(args[0])
+
+        # Set `sys.argv` like `python script.py`
+        sys.argv = args
+
+        # Replace this file's directory in `sys.path` with the script's
+        # directory like `python script.py`
+        sys.path[0] = os.path.dirname(script_path)
+
+        # Module name
+        module_name = None
+
+        # The script's file path, which is not imported by finders
+        main_file_path = script_path
+
+    # Create import recorder
+    recorder = ImportHookFinder()
+
+    # Insert the import recorder before other finders
+    sys.meta_path.insert(0, recorder)
+
+    # Report modules imported so far, e.g. by the interpreter startup
+    recorder.add_module_names(list(sys.modules))
+
+    # If have main file path
+    if main_file_path is not None:
+        # Report the main file path
+        _write_paths(fd, [main_file_path])
+
+    # Create writer thread
+    thread = threading.Thread(target=_run_writer, args=(fd, recorder))
+
+    # Use daemon thread so that the program can exit
+    thread.daemon = True
+
+    # Start writer thread
+    thread.start()
+
+    # If have script path
+    if script_path is not None:
+        # Run the script as main module
+        runpy.run_path(script_path, run_name='__main__')
+
+    # If not have script path
+    else:
+        # Run the module as main module
+        runpy.run_module(module_name, run_name='__main__', alter_sys=True)
+
+
+# If is run as main module
+if __name__ == '__main__':
+    # Call main function
+    main()
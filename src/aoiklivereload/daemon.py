@@ -0,0 +1,1446 @@
+# coding: utf-8
+"""
+Watcher daemon that holds one set of OS watches shared by many processes.
+
+Run:
+```
+python -m aoiklivereload.daemon
+```
+
+Processes use the daemon by creating `LiveReloader` with \
+`backend='daemon'`. Each process subscribes to its watch paths over a Unix \
+domain socket, and receives only changes under its watch paths. A \
+directory subscribed to by several processes uses one OS watch, and each \
+change is sent to every subscription whose watch path covers the changed \
+file, so overlapping watch paths, e.g. `/a` recursively and `/a/b`, both get \
+changes in `/a/b`.
+
+Protocol is JSON objects separated by newlines.
+
+Client to daemon:
+    - `{"op": "watch", "path": PATH, "recursive": BOOL}`: Subscribe to \
+      changes under the path.
+    - `{"op": "unwatch", "path": PATH, "recursive": BOOL}`: Unsubscribe.
+    - `{"op": "track", "paths": [PATH, ...]}`: Check the files for \
+      in-place changes, in `polling` backend.
+
+Daemon to client:
+    - `{"op": "change", "path": PATH, "file": FILE_PATH, "recursive": \
+      BOOL}`: A file under a subscribed watch path is changed.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import argparse
+import errno
+import json
+import logging
+import os
+import select
+import socket
+import sys
+import tempfile
+import threading
+
+# Local imports
+from . import inotify
+from . import polling
+
+
+# Backend constants
+BACKEND_V_INOTIFY = 'inotify'
+
+BACKEND_V_POLLING = 'polling'
+
+BACKEND_VALUES = (
+    BACKEND_V_INOTIFY,
+    BACKEND_V_POLLING,
+)
+
+
+# Maximum size in bytes of messages waiting to be sent to a client.
+#
+# Messages are sent without blocking, so that a slow client does not block
+# other clients. A client that does not read messages in time is
+# disconnected when its unsent messages exceed the size.
+#
+_MAX_SEND_BUFFER_SIZE = 1024 * 1024
+
+
+# Error numbers of sending or receiving on a non-blocking socket that is not
+# ready
+_WOULD_BLOCK_ERRNOS = (errno.EAGAIN, errno.EWOULDBLOCK)
+
+
+# String types of decoded JSON, `unicode` in Python 2
+_STR_TYPES = (str, type(u''))
+
+
+# Logger
+_LOGGER = logging.getLogger(__name__)
+
+
+def get_default_socket_path():
+    """
+    Get default socket path of current user.
+
+    The socket is in `$XDG_RUNTIME_DIR` if set, which only the user can \
+    access, otherwise in the temporary directory.
+
+    :return:
+        Socket path.
+    """
+    # Get the user's runtime directory
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR', None)
+
+    # If have the runtime directory
+    if runtime_dir and os.path.isdir(runtime_dir):
+        # Return socket path in the runtime directory
+        return os.path.join(runtime_dir, 'aoiklivereload.sock')
+
+    # Get user ID, or None on Windows
+    uid = os.getuid() if hasattr(os, 'getuid') else None
+
+    # Return socket path in the temporary directory
+    return os.path.join(
+        tempfile.gettempdir(),
+        'aoiklivereload-{}.sock'.format(uid if uid is not None else 'user'),
+    )
+
+
+def _encode_message(message):
+    """
+    Encode message to a line of bytes.
+
+    :param message:
+        Message dict.
+
+    :return:
+        Bytes.
+    """
+    # Return JSON line bytes
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+def _decode_messages(buf):
+    """
+    Decode complete message lines in given buffer.
+
+    :param buf:
+        Bytes buffer.
+
+    :return:
+        Tuple of (list of message dicts, remaining bytes).
+    """
+    # Split lines, the last part is incomplete
+    lines = buf.split(b'\n')
+
+    # Messages list
+    messages = []
+
+    # For each complete line
+    for line in lines[:-1]:
+        # If the line is empty
+        if not line.strip():
+            # Skip
+            continue
+
+        try:
+            # Decode message
+            message = json.loads(line.decode('utf-8'))
+
+        # If the line is not valid JSON
+        except ValueError:
+            # Skip
+            continue
+
+        # If the message is not a dict
+        if not isinstance(message, dict):
+            # Skip
+            continue
+
+        # Add to messages list
+        messages.append(message)
+
+    # Return messages and incomplete line
+    return messages, lines[-1]
+
+
+class _WatchHandler(object):
+    """
+    Event handler of OS watches, which forwards changes to subscribed \
+    clients.
+
+    One handler is shared by all OS watches, so that the inotify observer \
+    dispatches an event once even if overlapping OS watches get it.
+    """
+
+    def __init__(self, daemon):
+        """
+        Constructor.
+
+        :param daemon:
+            `WatcherDaemon` object.
+
+        :return:
+            None.
+        """
+        # Store daemon
+        self._daemon = daemon
+
+    def dispatch_path(self, file_path):
+        """
+        Forward changed file path to subscribed clients.
+
+        :param file_path:
+            Changed file path.
+
+        :return:
+            None.
+        """
+        # Forward to subscribed clients
+        self._daemon._forward_change(file_path)
+
+
+class WatcherDaemon(object):
+    """
+    Watcher daemon that serves watch subscriptions over a Unix domain \
+    socket, in one thread.
+    """
+
+    def __init__(self, socket_path=None, backend=None, interval=1):
+        """
+        Constructor.
+
+        :param socket_path:
+            Unix domain socket path. Default is `get_default_socket_path()`.
+
+        :param backend:
+            'inotify' or 'polling'. Default is 'inotify' if available, \
+            otherwise 'polling'.
+
+        :param interval:
+            Poll interval in seconds, in `polling` backend.
+
+        :return:
+            None.
+        """
+        # If backend is not given
+        if backend is None:
+            # Use `inotify` if available, otherwise `polling`
+            backend = BACKEND_V_INOTIFY if inotify.is_available() \
+                else BACKEND_V_POLLING
+
+        # If backend is not valid
+        if backend not in BACKEND_VALUES:
+            # Get error message
+            error_msg = 'Invalid backend: {}.'.format(repr(backend))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Store socket path
+        self._socket_path = socket_path or get_default_socket_path()
+
+        # Store backend
+        self._backend = backend
+
+        # Store poll interval
+        self._interval = interval
+
+        # Observer
+        self._observer = None
+
+        # Server socket
+        self._server_sock = None
+
+        # Inode number of the socket file created by this daemon
+        self._socket_ino = None
+
+        # Dict that maps client socket to its read buffer
+        self._client_buffers = {}
+
+        # Dict that maps client socket to its buffer of unsent messages
+        self._client_send_buffers = {}
+
+        # Event handler shared by all OS watches
+        self._handler = _WatchHandler(self)
+
+        # Dict that maps directory path to tuple of (`watch object`,
+        # whether recursive), or None if failed to watch
+        self._watch_objs = {}
+
+        # Dict that maps directory path to number of subscriptions, i.e.
+        # (client socket, watch key) pairs, of the directory
+        self._dir_refcounts = {}
+
+        # Dict that maps watch key to set of subscribed client sockets
+        self._watch_clients = {}
+
+        # Whether the daemon should stop
+        self._to_stop = False
+
+    def get_watch_count(self):
+        """
+        Get number of OS watches in use.
+
+        :return:
+            Number of OS watches.
+        """
+        # Return number of scheduled watches
+        return sum(1 for x in self._watch_objs.values() if x is not None)
+
+    def serve(self):
+        """
+        Serve clients until `stop` is called.
+
+        :return:
+            None. Raise `OSError` if another daemon is running at the \
+            socket path.
+        """
+        # If another daemon is running at the socket path
+        if self._is_socket_path_in_use():
+            # Get error message
+            error_msg = 'Watcher daemon is already running at {}.'.format(
+                self._socket_path
+            )
+
+            # Raise error
+            raise OSError(errno.EADDRINUSE, error_msg)
+
+        # Create server socket
+        self._server_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # Create private directory next to the socket path.
+        #
+        # The socket is created in the directory, which only current user can
+        # access, and moved to the socket path after being restricted, so
+        # that other users can not connect in between.
+        #
+        temp_dir_path = tempfile.mkdtemp(
+            dir=os.path.dirname(os.path.abspath(self._socket_path))
+        )
+
+        # Get socket path in the private directory
+        temp_socket_path = os.path.join(temp_dir_path, 'daemon.sock')
+
+        try:
+            # Bind the socket path in the private directory
+            self._server_sock.bind(temp_socket_path)
+
+            # Allow only current user to connect
+            os.chmod(temp_socket_path, 0o600)
+
+            # Listen
+            self._server_sock.listen(128)
+
+            # Move the socket to the socket path, replacing the socket file
+            # left by a killed daemon if any
+            os.rename(temp_socket_path, self._socket_path)
+
+        # If have error
+        except Exception:
+            # Close server socket
+            self._server_sock.close()
+
+            # Clear server socket
+            self._server_sock = None
+
+            # If the socket file is not moved
+            if os.path.exists(temp_socket_path):
+                # Remove the socket file
+                os.remove(temp_socket_path)
+
+            # Raise the error
+            raise
+
+        finally:
+            # Remove the private directory
+            os.rmdir(temp_dir_path)
+
+        # Store the socket file's inode number
+        self._socket_ino = os.stat(self._socket_path).st_ino
+
+        # If backend is `inotify`
+        if self._backend == BACKEND_V_INOTIFY:
+            # Create inotify observer
+            self._observer = inotify.InotifyObserver()
+
+        # If backend is `polling`
+        else:
+            # Create polling observer
+            self._observer = polling.PollingObserver()
+
+        # Log message
+        _LOGGER.info(
+            'Watcher daemon listening on %s, backend %s.',
+            self._socket_path,
+            self._backend,
+        )
+
+        try:
+            # Run in a loop until stopped
+            while not self._to_stop:
+                # Run one loop iteration
+                self._serve_once()
+
+        finally:
+            # Close resources
+            self._close()
+
+    def _is_socket_path_in_use(self):
+        """
+        Get whether a daemon is accepting connections at the socket path.
+
+        :return:
+            Boolean.
+        """
+        # If the socket file does not exist
+        if not os.path.exists(self._socket_path):
+            # Return not in use
+            return False
+
+        # Create socket
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            # Connect to the socket path
+            sock.connect(self._socket_path)
+
+        # If have error, e.g. the socket file is left by a killed daemon
+        except socket.error:
+            # Return not in use
+            return False
+
+        finally:
+            # Close the socket
+            sock.close()
+
+        # Return in use
+        return True
+
+    def stop(self):
+        """
+        Stop serving after current loop iteration.
+
+        :return:
+            None.
+        """
+        # Set stop flag
+        self._to_stop = True
+
+    def _serve_once(self):
+        """
+        Wait for socket or file system events, and handle them.
+
+        :return:
+            None.
+        """
+        # File descriptors to wait for
+        read_objs = [self._server_sock] + list(self._client_buffers)
+
+        # Client sockets that have unsent messages
+        write_objs = [x for x, y in self._client_send_buffers.items() if y]
+
+        # If backend is `inotify`
+        if self._backend == BACKEND_V_INOTIFY:
+            # Wait for inotify events too
+            read_objs.append(self._observer.fileno())
+
+            # Wake up periodically to check stop flag
+            timeout = 1
+
+        # If backend is `polling`
+        else:
+            # Wake up to poll
+            timeout = self._interval
+
+        try:
+            # Wait for events
+            ready_objs, writable_objs, _ = select.select(
+                read_objs, write_objs, [], timeout
+            )
+
+        # If have error
+        except (OSError, select.error) as exc:
+            # If interrupted
+            if exc.args and exc.args[0] == errno.EINTR:
+                # Return
+                return
+
+            # Raise other errors
+            raise
+
+        # For each writable client socket
+        for client_sock in writable_objs:
+            # If the client is not removed
+            if client_sock in self._client_send_buffers:
+                # Send unsent messages
+                self._flush_client(client_sock)
+
+        # For each ready object
+        for ready_obj in ready_objs:
+            # If is the server socket
+            if ready_obj is self._server_sock:
+                # Accept new client
+                self._accept_client()
+
+            # If is the inotify file descriptor
+            elif not isinstance(ready_obj, socket.socket):
+                # Read and forward events
+                self._observer.read_events()
+
+            # If is a client socket not removed
+            elif ready_obj in self._client_buffers:
+                # Read client messages
+                self._read_client(ready_obj)
+
+        # If backend is `polling`
+        if self._backend == BACKEND_V_POLLING:
+            # Poll watched directories
+            self._observer.check()
+
+    def _accept_client(self):
+        """
+        Accept new client connection.
+
+        :return:
+            None.
+        """
+        try:
+            # Accept new client
+            client_sock, _ = self._server_sock.accept()
+
+        # If have error
+        except socket.error:
+            # Ignore
+            return
+
+        # Send and receive without blocking
+        client_sock.setblocking(False)
+
+        # Store empty read buffer
+        self._client_buffers[client_sock] = b''
+
+        # Store empty send buffer
+        self._client_send_buffers[client_sock] = bytearray()
+
+    def _read_client(self, client_sock):
+        """
+        Read and handle client messages.
+
+        :param client_sock:
+            Client socket.
+
+        :return:
+            None.
+        """
+        try:
+            # Read data
+            data = client_sock.recv(65536)
+
+        # If have error
+        except socket.error as exc:
+            # If no data is available yet
+            if exc.errno in _WOULD_BLOCK_ERRNOS:
+                # Return
+                return
+
+            # Treat as closed
+            data = b''
+
+        # If the client is closed
+        if not data:
+            # Remove the client
+            self._remove_client(client_sock)
+
+            # Return
+            return
+
+        # Decode complete messages
+        messages, remaining = _decode_messages(
+            self._client_buffers[client_sock] + data
+        )
+
+        # Store incomplete line
+        self._client_buffers[client_sock] = remaining
+
+        # For each message
+        for message in messages:
+            try:
+                # Handle the message
+                self._handle_message(client_sock, message)
+
+            # If the message is not valid
+            except ValueError as exc:
+                # Log message
+                _LOGGER.warning(
+                    'Disconnected client that sent invalid message: %s', exc
+                )
+
+                # Remove the client, so that other clients are not affected
+                self._remove_client(client_sock)
+
+                # Stop handling the client's messages
+                return
+
+    def _handle_message(self, client_sock, message):
+        """
+        Handle client message.
+
+        :param client_sock:
+            Client socket.
+
+        :param message:
+            Message dict.
+
+        :return:
+            None. Raise `ValueError` if the message is not valid.
+        """
+        # Get operation
+        op = message.get('op', None)
+
+        # If is `watch`
+        if op == 'watch':
+            # Get watch key
+            key = self._get_watch_key(message)
+
+            # Get subscribed clients
+            clients = self._watch_clients.setdefault(key, set())
+
+            # If the client has subscribed to the watch key
+            if client_sock in clients:
+                # Ignore
+                return
+
+            # Add the client
+            clients.add(client_sock)
+
+            # Increment the directory's reference count
+            self._dir_refcounts[key[0]] = \
+                self._dir_refcounts.get(key[0], 0) + 1
+
+            # Schedule or update the directory's OS watch
+            self._update_dir_watch(key[0])
+
+        # If is `unwatch`
+        elif op == 'unwatch':
+            # Get watch key
+            key = self._get_watch_key(message)
+
+            # Unsubscribe the client
+            self._unsubscribe(client_sock, key)
+
+        # If is `track`
+        elif op == 'track':
+            # Get file paths
+            paths = message.get('paths', None)
+
+            # If the file paths are not a list of absolute paths
+            if not isinstance(paths, list) or not all(
+                isinstance(x, _STR_TYPES) and os.path.isabs(x) for x in paths
+            ):
+                # Raise error
+                raise ValueError('Invalid `paths`: {!r}'.format(message))
+
+            # If backend is `polling`
+            if self._backend == BACKEND_V_POLLING:
+                # Check the files for in-place changes
+                self._observer.track_files(paths)
+
+        # If is unknown operation
+        else:
+            # Raise error
+            raise ValueError('Invalid `op`: {!r}'.format(message))
+
+    @staticmethod
+    def _get_watch_key(message):
+        """
+        Get watch key of `watch` or `unwatch` message.
+
+        :param message:
+            Message dict.
+
+        :return:
+            Watch key, tuple of (watch path, whether recursive). Raise \
+            `ValueError` if the message is not valid.
+        """
+        # Get watch path
+        path = message.get('path', None)
+
+        # If the watch path is not an absolute path
+        if not isinstance(path, _STR_TYPES) or not os.path.isabs(path):
+            # Raise error
+            raise ValueError('Invalid `path`: {!r}'.format(message))
+
+        # Return watch key
+        return (path, bool(message.get('recursive', True)))
+
+    def _unsubscribe(self, client_sock, key):
+        """
+        Unsubscribe client from watch key, and unschedule the directory's \
+        OS watch if no subscriptions of the directory are left.
+
+        :param client_sock:
+            Client socket.
+
+        :param key:
+            Watch key.
+
+        :return:
+            None.
+        """
+        # Get subscribed clients
+        clients = self._watch_clients.get(key, None)
+
+        # If the client has not subscribed to the watch key
+        if clients is None or client_sock not in clients:
+            # Return
+            return
+
+        # Remove the client
+        clients.discard(client_sock)
+
+        # If not have other clients
+        if not clients:
+            # Remove the watch key
+            del self._watch_clients[key]
+
+        # Decrement the directory's reference count
+        refcount = self._dir_refcounts[key[0]] - 1
+
+        # If have other subscriptions of the directory
+        if refcount > 0:
+            # Store the reference count
+            self._dir_refcounts[key[0]] = refcount
+
+        # If not have other subscriptions of the directory
+        else:
+            # Remove the reference count
+            del self._dir_refcounts[key[0]]
+
+        # Unschedule or update the directory's OS watch
+        self._update_dir_watch(key[0])
+
+    def _update_dir_watch(self, dir_path):
+        """
+        Schedule, reschedule or unschedule the OS watch of given directory \
+        according to its subscriptions.
+
+        The OS watch is recursive if any subscription of the directory is \
+        recursive.
+
+        :param dir_path:
+            Directory path.
+
+        :return:
+            None.
+        """
+        # If the directory has subscriptions
+        if dir_path in self._dir_refcounts:
+            # Whether need watch recursively
+            is_recursive = (dir_path, True) in self._watch_clients
+
+        # If the directory has no subscriptions
+        else:
+            # Not need watch
+            is_recursive = None
+
+        # Get old watch info, or None
+        old_watch_info = self._watch_objs.get(dir_path, None)
+
+        # If the directory is watched as needed
+        if old_watch_info is not None and old_watch_info[1] == is_recursive:
+            # Return
+            return
+
+        # If need watch
+        if is_recursive is not None:
+            try:
+                # Schedule new OS watch before unscheduling the old one, so
+                # that no events are missed in between
+                self._watch_objs[dir_path] = (
+                    self._observer.schedule(
+                        self._handler,
+                        dir_path,
+                        recursive=is_recursive,
+                    ),
+                    is_recursive,
+                )
+
+            # If have error
+            except OSError:
+                # Set the watch info be None
+                self._watch_objs[dir_path] = None
+
+        # If not need watch
+        else:
+            # Remove the watch info
+            self._watch_objs.pop(dir_path, None)
+
+        # If have old watch object
+        if old_watch_info is not None:
+            # Unschedule the old OS watch
+            self._observer.unschedule(old_watch_info[0])
+
+    def _remove_client(self, client_sock):
+        """
+        Remove client, and unsubscribe it from all watch keys.
+
+        :param client_sock:
+            Client socket.
+
+        :return:
+            None.
+        """
+        # Remove the client's read buffer
+        self._client_buffers.pop(client_sock, None)
+
+        # Remove the client's send buffer
+        self._client_send_buffers.pop(client_sock, None)
+
+        # For each watch key the client subscribes to
+        for key in [
+            x for x, y in self._watch_clients.items() if client_sock in y
+        ]:
+            # Unsubscribe the client
+            self._unsubscribe(client_sock, key)
+
+        # Close the client socket
+        client_sock.close()
+
+    def _forward_change(self, file_path):
+        """
+        Send change message to clients subscribed to watch keys that cover \
+        given file path.
+
+        A recursive watch key covers files under its watch path. A \
+        non-recursive watch key covers files directly in its watch path.
+
+        :param file_path:
+            Changed file path.
+
+        :return:
+            None.
+        """
+        # Get the file's directory path
+        file_dir_path = os.path.dirname(file_path)
+
+        # For each watch key
+        for key in list(self._watch_clients):
+            # Get watch path and whether recursive
+            watch_path, is_recursive = key
+
+            # If the watch key is recursive
+            if is_recursive:
+                # Get watch path prefix
+                prefix = watch_path if watch_path.endswith(os.sep) \
+                    else watch_path + os.sep
+
+                # Whether the file is under the watch path
+                is_covered = file_path.startswith(prefix)
+
+            # If the watch key is not recursive
+            else:
+                # Whether the file is directly in the watch path
+                is_covered = (file_dir_path == watch_path)
+
+            # If the file is not covered
+            if not is_covered:
+                # Skip
+                continue
+
+            # Encode message
+            data = _encode_message({
+                'op': 'change',
+                'path': watch_path,
+                'recursive': is_recursive,
+                'file': file_path,
+            })
+
+            # For each subscribed client
+            for client_sock in list(self._watch_clients.get(key, ())):
+                # Get the client's send buffer
+                send_buffer = self._client_send_buffers[client_sock]
+
+                # If the client has too many unsent messages
+                if len(send_buffer) + len(data) > _MAX_SEND_BUFFER_SIZE:
+                    # Log message
+                    _LOGGER.warning(
+                        'Disconnected client that does not read messages.'
+                    )
+
+                    # Remove the client
+                    self._remove_client(client_sock)
+
+                    # Skip
+                    continue
+
+                # Add the message to the send buffer
+                send_buffer.extend(data)
+
+                # Send without blocking
+                self._flush_client(client_sock)
+
+    def _flush_client(self, client_sock):
+        """
+        Send the client's unsent messages, as many as the client socket \
+        accepts without blocking.
+
+        :param client_sock:
+            Client socket.
+
+        :return:
+            None.
+        """
+        # Get the client's send buffer
+        send_buffer = self._client_send_buffers[client_sock]
+
+        try:
+            # Send without blocking
+            sent_size = client_sock.send(send_buffer)
+
+        # If have error
+        except socket.error as exc:
+            # If the client socket is full
+            if exc.errno in _WOULD_BLOCK_ERRNOS:
+                # Send when the client socket is writable
+                return
+
+            # Remove the client, e.g. closed
+            self._remove_client(client_sock)
+
+            # Return
+            return
+
+        # Remove sent data from the send buffer
+        del send_buffer[:sent_size]
+
+    def _close(self):
+        """
+        Close client sockets, server socket and observer.
+
+        :return:
+            None.
+        """
+        # For each client socket
+        for client_sock in list(self._client_buffers):
+            # Remove the client
+            self._remove_client(client_sock)
+
+        # If have server socket
+        if self._server_sock is not None:
+            # Close server socket
+            self._server_sock.close()
+
+            # Clear server socket
+            self._server_sock = None
+
+            try:
+                # If the socket file is still the one created by this daemon
+                if os.stat(self._socket_path).st_ino == self._socket_ino:
+                    # Remove the socket file
+                    os.remove(self._socket_path)
+
+            # If have error
+            except OSError:
+                # Ignore
+                pass
+
+        # If have observer
+        if self._observer is not None:
+            # Stop observer
+            self._observer.stop()
+
+            # Clear observer
+            self._observer = None
+
+
+class DaemonWatch(object):
+    """
+    Watch object returned by `DaemonObserver.schedule`.
+    """
+
+    def __init__(self, handler, path, recursive):
+        """
+        Constructor.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Watched directory path.
+
+        :param recursive:
+            Whether watch sub-directories too.
+
+        :return:
+            None.
+        """
+        # Store event handler
+        self.handler = handler
+
+        # Store watched directory path
+        self.path = path
+
+        # Store whether recursive
+        self.recursive = recursive
+
+
+class DaemonObserver(object):
+    """
+    Observer that has watchdog observer's `start`, `stop`, `schedule` and \
+    `unschedule` methods, subscribing to a watcher daemon.
+
+    If disconnected from the daemon, e.g. the daemon is restarted, `check` \
+    reconnects and subscribes to the watches again. Changes made while \
+    disconnected are not detected.
+    """
+
+    def __init__(self, socket_path=None):
+        """
+        Constructor.
+
+        :param socket_path:
+            Watcher daemon's socket path. Default is \
+            `get_default_socket_path()`.
+
+        :return:
+            None.
+        """
+        # Store socket path
+        self._socket_path = socket_path or get_default_socket_path()
+
+        # Socket connected to the daemon, or None if disconnected
+        self._sock = None
+
+        # Lock for sending and changing the socket
+        self._send_lock = threading.Lock()
+
+        # Dict that maps watch key to `DaemonWatch` object
+        self._watches = {}
+
+        # Set of file paths sent in `track` messages
+        self._tracked_file_paths = set()
+
+        # Whether started and not stopped
+        self._is_running = False
+
+    def start(self):
+        """
+        Connect to the daemon, and start reader thread that dispatches \
+        change messages.
+
+        :return:
+            None. Raise `OSError` if the daemon is not running.
+        """
+        # Connect to the daemon
+        self._connect()
+
+        # Set running flag
+        self._is_running = True
+
+    def stop(self):
+        """
+        Disconnect from the daemon, which unsubscribes all watches.
+
+        :return:
+            None.
+        """
+        # Clear running flag so that `check` does not reconnect
+        self._is_running = False
+
+        # With the lock
+        with self._send_lock:
+            # Get socket
+            sock = self._sock
+
+            # Clear the socket first so that the reader thread knows the
+            # disconnection is by `stop`
+            self._sock = None
+
+        # If have socket
+        if sock is not None:
+            try:
+                # Shut down the socket to wake up the reader thread
+                sock.shutdown(socket.SHUT_RDWR)
+
+            # If have error, e.g. the daemon has closed the connection
+            except socket.error:
+                # Ignore
+                pass
+
+            # Close the socket
+            sock.close()
+
+    def schedule(self, handler, path, recursive=False):
+        """
+        Subscribe to changes under given directory.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Directory path.
+
+        :param recursive:
+            Whether watch sub-directories too.
+
+        :return:
+            `DaemonWatch` object.
+        """
+        # Create watch object
+        watch = DaemonWatch(handler=handler, path=path, recursive=recursive)
+
+        # Store the watch object
+        self._watches[(path, bool(recursive))] = watch
+
+        # Send `watch` message
+        self._send({'op': 'watch', 'path': path, 'recursive': recursive})
+
+        # Return watch object
+        return watch
+
+    def unschedule(self, watch):
+        """
+        Unsubscribe.
+
+        :param watch:
+            `DaemonWatch` object returned by `schedule`.
+
+        :return:
+            None.
+        """
+        # Remove the watch object
+        self._watches.pop((watch.path, bool(watch.recursive)), None)
+
+        # Send `unwatch` message
+        self._send({
+            'op': 'unwatch', 'path': watch.path, 'recursive': watch.recursive
+        })
+
+    def check(self):
+        """
+        Poll. The daemon polls, so only reconnect to the daemon if \
+        disconnected.
+
+        :return:
+            0.
+        """
+        # If is running but disconnected
+        if self._is_running and self._sock is None:
+            try:
+                # Reconnect to the daemon
+                self._connect()
+
+            # If have error, e.g. the daemon is not running yet
+            except OSError:
+                # Retry in next check
+                return 0
+
+            # For each watch
+            for path, recursive in list(self._watches):
+                # Subscribe again
+                self._send(
+                    {'op': 'watch', 'path': path, 'recursive': recursive}
+                )
+
+            # If have tracked file paths
+            if self._tracked_file_paths:
+                # Send `track` message again
+                self._send({
+                    'op': 'track', 'paths': list(self._tracked_file_paths)
+                })
+
+            # Log message
+            _LOGGER.info(
+                'Reconnected to watcher daemon at %s.', self._socket_path
+            )
+
+        # Return number of changed paths
+        return 0
+
+    def track_files(self, file_paths):
+        """
+        Ask the daemon to check given files for in-place changes, if the \
+        daemon uses `polling` backend.
+
+        :param file_paths:
+            Iterable of file paths.
+
+        :return:
+            None.
+        """
+        # Get file paths not sent yet
+        new_file_paths = [
+            x for x in file_paths if x not in self._tracked_file_paths
+        ]
+
+        # If have no new file paths
+        if not new_file_paths:
+            # Return
+            return
+
+        # Add to sent file paths
+        self._tracked_file_paths.update(new_file_paths)
+
+        # Send `track` message
+        self._send({'op': 'track', 'paths': new_file_paths})
+
+    def _connect(self):
+        """
+        Connect to the daemon, and start reader thread of the connection.
+
+        :return:
+            None. Raise `OSError` if the daemon is not running.
+        """
+        # Create socket
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            # Connect to the daemon
+            sock.connect(self._socket_path)
+
+        # If have error
+        except socket.error as exc:
+            # Close the socket
+            sock.close()
+
+            # Get error message
+            error_msg = 'Watcher daemon is not running at {}: {}'.format(
+                self._socket_path, exc
+            )
+
+            # Raise error
+            raise OSError(errno.ECONNREFUSED, error_msg)
+
+        # With the lock
+        with self._send_lock:
+            # Store the socket
+            self._sock = sock
+
+        # Create reader thread
+        thread = threading.Thread(target=self._run_reader, args=(sock,))
+
+        # Use daemon thread like watchdog observer's threads
+        thread.daemon = True
+
+        # Start reader thread
+        thread.start()
+
+    def _disconnect(self, sock):
+        """
+        Close given connection after it is broken, unless already stopped \
+        or reconnected.
+
+        :param sock:
+            Socket of the broken connection.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._send_lock:
+            # If the socket is not the current socket, e.g. closed by `stop`
+            if sock is not self._sock:
+                # Return
+                return
+
+            # Clear the socket so that `check` reconnects
+            self._sock = None
+
+        # Close the socket
+        sock.close()
+
+        # Log message
+        _LOGGER.warning(
+            'Disconnected from watcher daemon at %s. Changes are not'
+            ' detected until reconnected.',
+            self._socket_path,
+        )
+
+    def _send(self, message):
+        """
+        Send message to the daemon.
+
+        If disconnected, the message is not sent. Watches and tracked file \
+        paths are sent again on reconnect.
+
+        :param message:
+            Message dict.
+
+        :return:
+            None.
+        """
+        # With the lock
+        with self._send_lock:
+            # Get socket
+            sock = self._sock
+
+            # If not connected
+            if sock is None:
+                # Return
+                return
+
+            try:
+                # Send the message
+                sock.sendall(_encode_message(message))
+
+                # Return
+                return
+
+            # If have error, e.g. the daemon has exited
+            except socket.error:
+                # Disconnect below, outside of the lock
+                pass
+
+        # Disconnect
+        self._disconnect(sock)
+
+    def _run_reader(self, sock):
+        """
+        Reader thread's function.
+
+        :param sock:
+            Socket connected to the daemon.
+
+        :return:
+            None.
+        """
+        # Read buffer
+        buf = b''
+
+        # Run in a loop until disconnected
+        while True:
+            try:
+                # Read data
+                data = sock.recv(65536)
+
+            # If have error
+            except socket.error:
+                # Treat as disconnected
+                data = b''
+
+            # If disconnected
+            if not data:
+                # Close the connection if not closed by `stop`
+                self._disconnect(sock)
+
+                # Stop reading
+                break
+
+            # Decode complete messages
+            messages, buf = _decode_messages(buf + data)
+
+            # For each message
+            for message in messages:
+                # If is not `change`
+                if message.get('op', None) != 'change':
+                    # Skip
+                    continue
+
+                # Get watch object
+                watch = self._watches.get(
+                    (message.get('path'), bool(message.get('recursive'))),
+                    None,
+                )
+
+                # If the watch is unscheduled
+                if watch is None:
+                    # Skip
+                    continue
+
+                # Dispatch the file path
+                watch.handler.dispatch_path(message['file'])
+
+
+def main(args=None):
+    """
+    Main function.
+
+    :param args:
+        Command line arguments list. Default is `sys.argv[1:]`.
+
+    :return:
+        Exit code.
+    """
+    # Create arguments parser
+    parser = argparse.ArgumentParser(
+        description='Watcher daemon shared by live reloaders.'
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--socket',
+        default=get_default_socket_path(),
+        help='Unix domain socket path. Default is %(default)s.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--backend',
+        choices=BACKEND_VALUES,
+        default=None,
+        help='File system event backend. '
+        'Default is inotify if available, otherwise polling.',
+    )
+
+    # Add argument
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=1,
+        help='Poll interval in seconds in polling backend. '
+        'Default is %(default)s.',
+    )
+
+    # Parse arguments
+    parsed_args = parser.parse_args(args)
+
+    # If Unix domain socket is not available
+    if not hasattr(socket, 'AF_UNIX'):
+        # Print error
+        sys.stderr.write(
+            'Unix domain socket is not supported on {}.\n'.format(
+                sys.platform
+            )
+        )
+
+        # Return error code
+        return 1
+
+    # Configure logging
+    logging.basicConfig(level=logging.INFO)
+
+    # Create daemon
+    daemon = WatcherDaemon(
+        socket_path=parsed_args.socket,
+        backend=parsed_args.backend,
+        interval=parsed_args.interval,
+    )
+
+    try:
+        # Serve clients
+        daemon.serve()
+
+    # If interrupted
+    except KeyboardInterrupt:
+        # Ignore
+        pass
+
+    # If have error, e.g. another daemon is running
+    except OSError as exc:
+        # Print error
+        sys.stderr.write('{}\n'.format(exc))
+
+        # Return error code
+        return 1
+
+    # Return success code
+    return 0
+
+
+# If is run as main module
+if __name__ == '__main__':
+    # Call main function
+    sys.exit(main())
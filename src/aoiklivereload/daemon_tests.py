@@ -0,0 +1,407 @@
+# coding: utf-8
+"""
+Tests of `daemon` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import socket
+import threading
+import unittest
+
+# Local imports
+from . import daemon
+from .watch_testing import RecordingHandler
+from .watch_testing import WatchDirTestCase
+from .watch_testing import wait_until
+from .watch_testing import write_file
+
+
+@unittest.skipUnless(
+    hasattr(socket, 'AF_UNIX'), 'Unix domain socket is not available.'
+)
+class WatcherDaemonTest(WatchDirTestCase):
+    """
+    Tests of `WatcherDaemon` with two clients watching overlapping paths.
+    """
+
+    def setUp(self):
+        """
+        Create directories `a` and `a/b`, and start the daemon.
+
+        :return:
+            None.
+        """
+        # Create directories
+        super(WatcherDaemonTest, self).setUp()
+
+        # Get socket path
+        self.socket_path = os.path.join(self.temp_dir, 'daemon.sock')
+
+        # Start daemon
+        self._start_daemon()
+
+        # Create clients
+        self.client_a = daemon.DaemonObserver(socket_path=self.socket_path)
+
+        self.client_b = daemon.DaemonObserver(socket_path=self.socket_path)
+
+        # Start clients
+        self.client_a.start()
+
+        self.client_b.start()
+
+    def tearDown(self):
+        """
+        Stop the clients and the daemon, and remove the directories.
+
+        :return:
+            None.
+        """
+        # Stop clients
+        self.client_a.stop()
+
+        self.client_b.stop()
+
+        # Stop the daemon
+        self.daemon.stop()
+
+        # Wait for the daemon thread
+        self.thread.join()
+
+        # Remove directories
+        super(WatcherDaemonTest, self).tearDown()
+
+    def _start_daemon(self):
+        """
+        Start the daemon in a thread.
+
+        :return:
+            None.
+        """
+        # Create daemon
+        self.daemon = daemon.WatcherDaemon(socket_path=self.socket_path)
+
+        # Create daemon thread
+        self.thread = threading.Thread(target=self.daemon.serve)
+
+        # Start daemon thread
+        self.thread.start()
+
+        # Wait until the daemon is listening
+        wait_until(lambda: os.path.exists(self.socket_path))
+
+    def test_overlapping_clients(self):
+        """
+        Test a client watching `a` recursively and a client watching `a/b` \
+        both get changes in `a/b`, and one unsubscribing keeps the other's \
+        changes.
+        """
+        # Create handlers
+        handler_a = RecordingHandler()
+
+        handler_b = RecordingHandler()
+
+        # Watch `a` recursively
+        self.client_a.schedule(handler_a, self.dir_a, recursive=True)
+
+        # Watch `a/b`
+        watch_b = self.client_b.schedule(
+            handler_b, self.dir_b, recursive=False
+        )
+
+        # Wait until the daemon has watched both directories
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 2)
+        )
+
+        # Write the file
+        self._touch()
+
+        # Both clients get the change
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler_a.paths)
+        )
+
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler_b.paths)
+        )
+
+        # Stop watching `a/b`
+        self.client_b.unschedule(watch_b)
+
+        # Wait until the daemon has unwatched `a/b`
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 1)
+        )
+
+        # Clear recorded paths
+        del handler_a.paths[:]
+
+        # Write the file again
+        self._touch()
+
+        # The client watching `a` still gets the change
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler_a.paths)
+        )
+
+    def test_same_directory_clients(self):
+        """
+        Test two clients watching the same directory share one OS watch, \
+        and one disconnecting keeps the other's changes.
+        """
+        # Get sub-directory path, watched only by the recursive watch
+        dir_c = os.path.join(self.dir_b, 'c')
+
+        # Create the sub-directory
+        os.mkdir(dir_c)
+
+        # Get file path in `a/b/c`
+        file_path_c = os.path.join(dir_c, 'z.py')
+
+        # Create handlers
+        handler_a = RecordingHandler()
+
+        handler_b = RecordingHandler()
+
+        # Watch `a/b` non-recursively
+        self.client_a.schedule(handler_a, self.dir_b, recursive=False)
+
+        # Wait until the daemon has watched `a/b`
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 1)
+        )
+
+        # Watch `a/b` recursively
+        self.client_b.schedule(handler_b, self.dir_b, recursive=True)
+
+        # Wait until the recursive watch gets changes in `a/b/c`
+        self.assertTrue(
+            wait_until(
+                lambda: write_file(file_path_c)
+                or file_path_c in handler_b.paths
+            )
+        )
+
+        # The non-recursive watch gets no changes in `a/b/c`
+        self.assertNotIn(file_path_c, handler_a.paths)
+
+        # The directory uses one OS watch
+        self.assertEqual(self.daemon.get_watch_count(), 1)
+
+        # Disconnect the client watching recursively
+        self.client_b.stop()
+
+        # Write the file
+        self._touch()
+
+        # The other client still gets the change
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler_a.paths)
+        )
+
+        # The directory still uses one OS watch
+        self.assertEqual(self.daemon.get_watch_count(), 1)
+
+        # The client that disconnected gets no changes
+        self.assertNotIn(self.file_path, handler_b.paths)
+
+    def test_invalid_message(self):
+        """
+        Test a client sending an invalid message is disconnected, and other \
+        clients keep getting changes.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a/b`
+        self.client_a.schedule(handler, self.dir_b, recursive=False)
+
+        # Wait until the daemon has watched the directory
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 1)
+        )
+
+        # Connect a client that sends `watch` message without path
+        bad_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            # Connect to the daemon
+            bad_sock.connect(self.socket_path)
+
+            # Send the invalid message
+            bad_sock.sendall(b'{"op": "watch"}\n')
+
+            # Set read timeout
+            bad_sock.settimeout(5)
+
+            # The daemon closes the connection
+            self.assertEqual(bad_sock.recv(1), b'')
+
+        finally:
+            # Close the socket
+            bad_sock.close()
+
+        # Write the file
+        self._touch()
+
+        # The other client still gets the change
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler.paths)
+        )
+
+    def test_socket_path_in_use(self):
+        """
+        Test a second daemon refuses to take the socket path of a running \
+        daemon.
+        """
+        # Create the second daemon
+        other_daemon = daemon.WatcherDaemon(socket_path=self.socket_path)
+
+        # The second daemon refuses to start
+        with self.assertRaises(OSError):
+            other_daemon.serve()
+
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a/b` at the running daemon
+        self.client_a.schedule(handler, self.dir_b, recursive=False)
+
+        # Wait until the daemon has watched the directory
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 1)
+        )
+
+        # Write the file
+        self._touch()
+
+        # The running daemon still serves
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler.paths)
+        )
+
+    def test_socket_file_mode(self):
+        """
+        Test only current user can access the socket file.
+        """
+        # Get the socket file's permission bits
+        mode = os.stat(self.socket_path).st_mode & 0o777
+
+        # Only current user can access the socket file
+        self.assertEqual(mode, 0o600)
+
+    def test_daemon_restart(self):
+        """
+        Test a client whose daemon exits does not raise, and subscribes \
+        again after the daemon is restarted.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a/b`
+        self.client_a.schedule(handler, self.dir_b, recursive=False)
+
+        # Wait until the daemon has watched the directory
+        self.assertTrue(
+            wait_until(lambda: self.daemon.get_watch_count() == 1)
+        )
+
+        # Stop the daemon
+        self.daemon.stop()
+
+        # Wait for the daemon thread
+        self.thread.join()
+
+        # Sending to the stopped daemon does not raise
+        self.client_a.track_files([self.file_path])
+
+        # Reconnecting to the stopped daemon does not raise
+        self.client_a.check()
+
+        # Start a new daemon
+        self._start_daemon()
+
+        # Wait until the client has reconnected and subscribed again
+        self.assertTrue(
+            wait_until(
+                lambda: self.client_a.check() == 0
+                and self.daemon.get_watch_count() == 1
+            )
+        )
+
+        # Write the file
+        self._touch()
+
+        # The client gets the change from the new daemon
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler.paths)
+        )
+
+    def test_slow_client(self):
+        """
+        Test a client that does not read messages is disconnected, and \
+        other clients keep getting changes.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a/b`
+        self.client_a.schedule(handler, self.dir_b, recursive=False)
+
+        # Connect a client that does not read messages
+        slow_sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        # Store the send buffer size limit
+        max_send_buffer_size = daemon._MAX_SEND_BUFFER_SIZE
+
+        # Use small limit so that the limit is reached soon
+        daemon._MAX_SEND_BUFFER_SIZE = 1024
+
+        try:
+            # Connect to the daemon
+            slow_sock.connect(self.socket_path)
+
+            # Watch `a` recursively
+            slow_sock.sendall(
+                '{{"op": "watch", "path": "{}", "recursive": true}}\n'
+                .format(self.dir_a).encode('utf-8')
+            )
+
+            # Wait until both subscriptions arrive
+            self.assertTrue(
+                wait_until(lambda: self.daemon.get_watch_count() == 2)
+            )
+
+            # Write the file many times, more than the client socket holds
+            for _ in range(2000):
+                # Write the file
+                self._touch()
+
+            # Set read timeout
+            slow_sock.settimeout(5)
+
+            # Read until the daemon closes the connection
+            while slow_sock.recv(65536):
+                # Keep reading
+                pass
+
+        finally:
+            # Restore the send buffer size limit
+            daemon._MAX_SEND_BUFFER_SIZE = max_send_buffer_size
+
+            # Close the socket
+            slow_sock.close()
+
+        # Clear recorded paths
+        del handler.paths[:]
+
+        # Write the file again
+        self._touch()
+
+        # The other client still gets the change
+        self.assertTrue(
+            wait_until(lambda: self.file_path in handler.paths)
+        )
@@ -7,6 +7,8 @@ from __future__ import absolute_import
 # Standard imports
 import os
 import sys
+from wsgiref.simple_server import WSGIRequestHandler
+from wsgiref.simple_server import WSGIServer
 
 # External imports
 import bottle
@@ -43,8 +45,19 @@ def main():
         # Import reloader class
         from aoiklivereload import LiveReloader
 
+        # Import pre-reload hooks
+        from aoiklivereload.adapters import WSGIDrainMiddleware
+        from aoiklivereload.adapters import flush_logs
+
         # Create reloader
-        reloader = LiveReloader()
+        reloader = LiveReloader(
+            # Reload mode.
+            #
+            # Can be given via environment variable, e.g. by the restart
+            # benchmark. Default is the platform's default reload mode.
+            #
+            reload_mode=os.environ.get('AOIKLIVERELOAD_DEMO_RELOAD_MODE'),
+        )
 
         # Start watcher thread
         reloader.start_watcher_thread()
@@ -75,8 +88,61 @@ def main():
             # Return response body
             return 'hello'
 
+        # Wrap the app to count in-flight requests
+        wsgi_app = WSGIDrainMiddleware(bottle.default_app())
+
+        # Let in-flight requests finish before reloading
+        reloader.add_pre_reload_hook(wsgi_app.drain)
+
+        # Flush logs before reloading
+        reloader.add_pre_reload_hook(flush_logs)
+
+        # Get listening socket passed from the previous process, or create
+        # one if not have.
+        #
+        # Required in `blue_green` reload mode, in which the new process
+        # starts serving before the previous process exits, so it can not
+        # bind the port itself.
+        #
+        listen_sock = reloader.get_listening_socket(server_host, server_port)
+
+        # Create server without binding the port.
+        #
+        # `bottle.run` is not used because it always binds the port. Its
+        # default server is `wsgiref` too.
+        #
+        http_server = WSGIServer(
+            (server_host, server_port),
+            WSGIRequestHandler,
+            bind_and_activate=False,
+        )
+
+        # Close the server's own socket
+        http_server.socket.close()
+
+        # Use the listening socket
+        http_server.socket = listen_sock
+
+        # Set server address like `server_bind`
+        http_server.server_address = listen_sock.getsockname()
+
+        http_server.server_name = server_host
+
+        http_server.server_port = http_server.server_address[1]
+
+        # Set up WSGI environ like `server_bind`
+        http_server.setup_environ()
+
+        # Set WSGI app
+        http_server.set_app(wsgi_app)
+
+        # Mark ready, which reports reload stats if this process was started
+        # by a reload, and lets the previous process exit in `blue_green`
+        # reload mode
+        reloader.mark_ready()
+
         # Run server
-        bottle.run(host=server_host, port=server_port)
+        http_server.serve_forever()
 
     # If have `KeyboardInterrupt`
     except KeyboardInterrupt:
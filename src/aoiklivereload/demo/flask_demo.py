@@ -10,6 +10,7 @@ import sys
 
 # External imports
 import flask
+from werkzeug.serving import make_server
 
 
 def main():
@@ -43,8 +44,19 @@ def main():
         # Import reloader class
         from aoiklivereload import LiveReloader
 
+        # Import pre-reload hooks
+        from aoiklivereload.adapters import WSGIDrainMiddleware
+        from aoiklivereload.adapters import flush_logs
+
         # Create reloader
-        reloader = LiveReloader()
+        reloader = LiveReloader(
+            # Reload mode.
+            #
+            # Can be given via environment variable, e.g. by the restart
+            # benchmark. Default is the platform's default reload mode.
+            #
+            reload_mode=os.environ.get('AOIKLIVERELOAD_DEMO_RELOAD_MODE'),
+        )
 
         # Start watcher thread
         reloader.start_watcher_thread()
@@ -78,14 +90,44 @@ def main():
             # Return response body
             return 'hello'
 
-        # Run server
-        flask_app.run(
-            host=server_host,
-            port=server_port,
-            # Disable Flask's reloader
-            debug=False,
+        # Wrap the WSGI app to count in-flight requests
+        flask_app.wsgi_app = WSGIDrainMiddleware(flask_app.wsgi_app)
+
+        # Let in-flight requests finish before reloading
+        reloader.add_pre_reload_hook(flask_app.wsgi_app.drain)
+
+        # Flush logs before reloading
+        reloader.add_pre_reload_hook(flush_logs)
+
+        # Get listening socket passed from the previous process, or create
+        # one if not have.
+        #
+        # Required in `blue_green` reload mode, in which the new process
+        # starts serving before the previous process exits, so it can not
+        # bind the port itself.
+        #
+        listen_sock = reloader.get_listening_socket(server_host, server_port)
+
+        # Create server that serves on the listening socket.
+        #
+        # `flask_app.run` is not used because it always binds the port.
+        #
+        http_server = make_server(
+            server_host,
+            server_port,
+            flask_app,
+            threaded=True,
+            fd=listen_sock.fileno(),
         )
 
+        # Mark ready, which reports reload stats if this process was started
+        # by a reload, and lets the previous process exit in `blue_green`
+        # reload mode
+        reloader.mark_ready()
+
+        # Run server
+        http_server.serve_forever()
+
     # If have `KeyboardInterrupt`
     except KeyboardInterrupt:
         # Not treat as error
@@ -44,8 +44,19 @@ def main():
         # Import reloader class
         from aoiklivereload import LiveReloader
 
+        # Import pre-reload hooks
+        from aoiklivereload.adapters import SanicDrainHook
+        from aoiklivereload.adapters import flush_logs
+
         # Create reloader
-        reloader = LiveReloader()
+        reloader = LiveReloader(
+            # Reload mode.
+            #
+            # Can be given via environment variable, e.g. by the restart
+            # benchmark. Default is the platform's default reload mode.
+            #
+            reload_mode=os.environ.get('AOIKLIVERELOAD_DEMO_RELOAD_MODE'),
+        )
 
         # Start watcher thread
         reloader.start_watcher_thread()
@@ -79,13 +90,30 @@ def main():
             # Return response body
             return text('hello')
 
+        # Get listening socket passed from the previous process, or create
+        # one if not have.
+        #
+        # Passing the listening socket to the new process on reload keeps
+        # connections in the accept queue from being dropped.
+        #
+        listen_sock = reloader.get_listening_socket(server_host, server_port)
+
+        # Let in-flight requests finish before reloading
+        reloader.add_pre_reload_hook(SanicDrainHook(sanic_app))
+
+        # Flush logs before reloading
+        reloader.add_pre_reload_hook(flush_logs)
+
+        # Mark ready, which reports reload stats if this process was started
+        # by a reload
+        reloader.mark_ready()
+
         # Run server.
         #
         # Notice `KeyboardInterrupt` will be caught inside `sanic_app.run`.
         #
         sanic_app.run(
-            host=server_host,
-            port=server_port,
+            sock=listen_sock,
         )
 
     # If have `KeyboardInterrupt`
@@ -9,6 +9,7 @@ import os
 import sys
 
 # External imports
+import tornado.httpserver
 import tornado.ioloop
 import tornado.web
 
@@ -44,6 +45,10 @@ def main():
         # Import reloader class
         from aoiklivereload import LiveReloader
 
+        # Import pre-reload hooks
+        from aoiklivereload.adapters import TornadoDrainHook
+        from aoiklivereload.adapters import flush_logs
+
         # Create reloader
         reloader = LiveReloader(
             # Reload mode.
@@ -59,7 +64,13 @@ def main():
             # Notice in `spawn_exit` reload mode, the user will not be able
             # to kill the new process using Ctrl-c.
             #
-            reload_mode=('spawn_exit' if sys.platform == 'win32' else 'exec'),
+            # Can be given via environment variable, e.g. by the restart
+            # benchmark.
+            #
+            reload_mode=(
+                os.environ.get('AOIKLIVERELOAD_DEMO_RELOAD_MODE') or
+                ('spawn_exit' if sys.platform == 'win32' else 'exec')
+            ),
             force_exit=True,
         )
 
@@ -108,12 +119,36 @@ def main():
             debug=False,
         )
 
+        # Get listening socket passed from the previous process, or create
+        # one if not have.
+        #
+        # Passing the listening socket to the new process on reload keeps
+        # connections in the accept queue from being dropped.
+        #
+        listen_sock = reloader.get_listening_socket(server_host, server_port)
+
+        # Tornado requires non-blocking socket
+        listen_sock.setblocking(False)
+
+        # Create HTTP server
+        http_server = tornado.httpserver.HTTPServer(tornado_app)
+
         # Start listening
-        tornado_app.listen(server_port, address=server_host)
+        http_server.add_sockets([listen_sock])
 
         # Get event loop
         io_loop = tornado.ioloop.IOLoop.current()
 
+        # Let in-flight requests finish before reloading
+        reloader.add_pre_reload_hook(TornadoDrainHook(http_server, io_loop))
+
+        # Flush logs before reloading
+        reloader.add_pre_reload_hook(flush_logs)
+
+        # Mark ready, which reports reload stats if this process was started
+        # by a reload
+        reloader.mark_ready()
+
         # Run event loop
         io_loop.start()
 
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+Import hook that records names of modules being imported, and module file \
+path look-up.
+
+Shared by `LiveReloader` and the supervisor's bootstrap script. The \
+bootstrap script imports this file as a top-level module without importing \
+the package, so this module must only import standard modules.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+from collections import deque
+import os
+import threading
+
+
+# Number of look-ups to retry for a recorded module that is not in
+# `sys.modules`.
+#
+# A module is put in `sys.modules` before its code runs, so a module still
+# not found after the retries has failed to import, e.g. an optional
+# dependency tried in `try/except ImportError`, and is dropped.
+#
+PENDING_MODULE_RETRY_COUNT = 3
+
+
+class ImportHookFinder(object):
+    """
+    Meta path finder that records names of modules being imported.
+
+    It never finds modules itself, it only records the module names so that \
+    the watcher can look up the newly imported modules incrementally instead \
+    of rescanning `sys.modules`.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+            None.
+        """
+        # Queue of recorded module names.
+        #
+        # `deque.append` and `deque.popleft` are thread-safe.
+        #
+        self._module_names = deque()
+
+        # Event set when a module name is recorded
+        self.event = threading.Event()
+
+    def find_spec(self, fullname, path=None, target=None):
+        """
+        Record the module name. Called by Python 3's import system.
+
+        :param fullname:
+            Module's full name.
+
+        :param path:
+            Parent package's `__path__`.
+
+        :param target:
+            Target module.
+
+        :return:
+            None, so that the next finder is tried.
+        """
+        # Record the module name
+        self.add_module_names([fullname])
+
+        # Return None
+        return None
+
+    def find_module(self, fullname, path=None):
+        """
+        Record the module name. Called by Python 2's import system.
+
+        :param fullname:
+            Module's full name.
+
+        :param path:
+            Parent package's `__path__`.
+
+        :return:
+            None, so that the next finder is tried.
+        """
+        # Record the module name
+        self.add_module_names([fullname])
+
+        # Return None
+        return None
+
+    def add_module_names(self, module_names):
+        """
+        Record given module names.
+
+        :param module_names:
+            List of module names.
+
+        :return:
+            None.
+        """
+        # Record the module names
+        self._module_names.extend(module_names)
+
+        # Wake up the thread waiting on the event
+        self.event.set()
+
+    def pop_module_names(self):
+        """
+        Pop recorded module names.
+
+        :return:
+            List of module names recorded since last call.
+        """
+        # Module names list
+        module_names = []
+
+        # Get the queue
+        module_name_queue = self._module_names
+
+        # While the queue is not empty
+        while module_name_queue:
+            # Pop a module name
+            module_names.append(module_name_queue.popleft())
+
+        # Return the module names
+        return module_names
+
+
+def get_module_file_path(module):
+    """
+    Get given module's source file path.
+
+    :param module:
+        Module object.
+
+    :return:
+        Module file's absolute path, or None if the module has no file path.
+    """
+    # Get module file path
+    module_path = getattr(module, '__file__', None)
+
+    # If not have module file path
+    if module_path is None:
+        # Return None
+        return None
+
+    # Get absolute path
+    module_path = os.path.abspath(module_path)
+
+    # If the file path ends with `.pyc` or `.pyo`
+    if module_path.endswith(('.pyc', '.pyo')):
+        # Get `.py` file path
+        module_path = module_path[:-1]
+
+    # Return module file path
+    return module_path
@@ -0,0 +1,831 @@
+# coding: utf-8
+"""
+Linux inotify observer that needs no third-party package.
+
+Uses one inotify file descriptor for all watches. Events are read in large \
+batches and decoded in place with `struct`, without creating event objects.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+
+
+# Event mask constants, see `man 7 inotify`
+IN_MODIFY = 0x00000002
+
+IN_CLOSE_WRITE = 0x00000008
+
+IN_MOVED_FROM = 0x00000040
+
+IN_MOVED_TO = 0x00000080
+
+IN_CREATE = 0x00000100
+
+IN_DELETE = 0x00000200
+
+IN_DELETE_SELF = 0x00000400
+
+IN_MOVE_SELF = 0x00000800
+
+IN_Q_OVERFLOW = 0x00004000
+
+IN_IGNORED = 0x00008000
+
+IN_ONLYDIR = 0x01000000
+
+IN_ISDIR = 0x40000000
+
+
+# `inotify_init1` flag constants
+IN_NONBLOCK = 0o4000
+
+IN_CLOEXEC = 0o2000000
+
+
+# Events to watch.
+#
+# `IN_MODIFY` is not used because `IN_CLOSE_WRITE` follows it, and a large
+# write generates many `IN_MODIFY` events.
+#
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+
+# Event header struct: wd, mask, cookie, len
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+# Event header size
+_EVENT_HEADER_SIZE = _EVENT_HEADER.size
+
+
+# Read buffer size. Large enough to hold many events per read.
+READ_BUFFER_SIZE = 256 * 1024
+
+
+# Whether have `os.readv`, in Python 3.3+
+_HAS_READV = hasattr(os, 'readv')
+
+
+# Directory names not to watch in recursive watches.
+#
+# `__pycache__` only contains bytecode files written on import.
+#
+_SKIP_DIR_NAMES = frozenset(['__pycache__'])
+
+
+def _load_libc():
+    """
+    Load libc with inotify functions.
+
+    :return:
+        libc object, or None if not available.
+    """
+    # If not in Linux
+    if not sys.platform.startswith('linux'):
+        # Return None
+        return None
+
+    try:
+        # Load libc
+        libc = ctypes.CDLL(
+            ctypes.util.find_library('c') or 'libc.so.6', use_errno=True
+        )
+
+        # Get functions, raise `AttributeError` if not available
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+
+    # If have error
+    except (OSError, AttributeError):
+        # Return None
+        return None
+
+    # Set argument types
+    libc.inotify_add_watch.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32
+    ]
+
+    # Set argument types
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+    # Return libc
+    return libc
+
+
+# libc with inotify functions, or None if not available
+_LIBC = _load_libc()
+
+
+def is_available():
+    """
+    Test whether inotify is available.
+
+    :return:
+        Boolean.
+    """
+    # Return whether have libc with inotify functions
+    return _LIBC is not None
+
+
+def _encode_path(path):
+    """
+    Encode path to bytes for libc.
+
+    :param path:
+        Path.
+
+    :return:
+        Path bytes.
+    """
+    # If the path is bytes
+    if isinstance(path, bytes):
+        # Return as is
+        return path
+
+    # Return encoded path
+    return path.encode(sys.getfilesystemencoding() or 'utf-8')
+
+
+def _decode_name(name):
+    """
+    Decode file name bytes.
+
+    :param name:
+        File name bytes.
+
+    :return:
+        File name text.
+    """
+    # If have `os.fsdecode`, in Python 3
+    if hasattr(os, 'fsdecode'):
+        # Decode using file system encoding
+        return os.fsdecode(name)
+
+    # If is Python 2
+    else:
+        # Return bytes as is, which is `str`
+        return name
+
+
+class InotifyWatch(object):
+    """
+    Watch object returned by `InotifyObserver.schedule`.
+    """
+
+    def __init__(self, handler, path, recursive):
+        """
+        Constructor.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Watched directory path.
+
+        :param recursive:
+            Whether watch sub-directories too.
+
+        :return:
+            None.
+        """
+        # Store event handler
+        self.handler = handler
+
+        # Store watched directory path
+        self.path = path
+
+        # Store whether recursive
+        self.recursive = recursive
+
+        # Set of inotify watch descriptors of this watch
+        self.wds = set()
+
+
+class InotifyObserver(object):
+    """
+    Observer that has watchdog observer's `start`, `stop`, `schedule` and \
+    `unschedule` methods, using one non-blocking inotify file descriptor.
+
+    Either call `start` to read events in one reader thread, or call \
+    `read_events` when the file descriptor is readable, e.g. from an event \
+    loop's reader callback.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+            None.
+        """
+        # If inotify is not available
+        if _LIBC is None:
+            # Raise error
+            raise OSError(errno.ENOSYS, 'inotify is not available.')
+
+        # Create inotify file descriptor
+        fd = _LIBC.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        # If have error
+        if fd < 0:
+            # Get error number
+            error_no = ctypes.get_errno()
+
+            # Raise error
+            raise OSError(error_no, os.strerror(error_no))
+
+        # Store inotify file descriptor
+        self._fd = fd
+
+        # Dict that maps watch descriptor to directory path
+        self._wd_to_path = {}
+
+        # Dict that maps watch descriptor to set of `InotifyWatch` objects
+        # that own it.
+        #
+        # Watches of the same directory share one watch descriptor, e.g. a
+        # recursive watch of a directory and a watch of its sub-directory.
+        #
+        self._wd_to_watches = {}
+
+        # Reusable read buffer
+        self._buffer = bytearray(READ_BUFFER_SIZE)
+
+        # Reader thread started by `start`
+        self._thread = None
+
+        # Pipe file descriptors used to wake up the reader thread on `stop`
+        self._wake_fds = None
+
+    def fileno(self):
+        """
+        Get inotify file descriptor.
+
+        :return:
+            File descriptor.
+        """
+        # Return file descriptor
+        return self._fd
+
+    def get_watch_count(self):
+        """
+        Get number of inotify watches in use.
+
+        :return:
+            Number of watches.
+        """
+        # Return number of watches
+        return len(self._wd_to_path)
+
+    def start(self):
+        """
+        Start reader thread that reads and dispatches events.
+
+        :return:
+            None.
+        """
+        # If the reader thread is started
+        if self._thread is not None:
+            # Ignore
+            return
+
+        # Create pipe used to wake up the reader thread
+        self._wake_fds = os.pipe()
+
+        # Create reader thread
+        self._thread = threading.Thread(target=self._run_reader)
+
+        # Use daemon thread like watchdog observer's threads
+        self._thread.daemon = True
+
+        # Start reader thread
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop reader thread, and close inotify file descriptor.
+
+        :return:
+            None.
+        """
+        # If the reader thread is started
+        if self._thread is not None:
+            # Wake up the reader thread
+            os.write(self._wake_fds[1], b'\0')
+
+            # If not called from the reader thread, e.g. by a handler
+            if self._thread is not threading.current_thread():
+                # Wait for the reader thread to exit
+                self._thread.join()
+
+            # Clear the reader thread
+            self._thread = None
+
+            # For each pipe file descriptor
+            for wake_fd in self._wake_fds:
+                # Close the file descriptor
+                os.close(wake_fd)
+
+            # Clear the pipe file descriptors
+            self._wake_fds = None
+
+        # Close inotify file descriptor
+        self.close()
+
+    def _run_reader(self):
+        """
+        Reader thread's function.
+
+        :return:
+            None.
+        """
+        # Get inotify file descriptor
+        inotify_fd = self._fd
+
+        # Get pipe's read end
+        wake_fd = self._wake_fds[0]
+
+        # Run in a loop until stopped
+        while True:
+            try:
+                # Wait until events are available or stopped
+                ready_fds, _, _ = select.select([inotify_fd, wake_fd], [], [])
+
+            # If have error
+            except (OSError, select.error) as exc:
+                # If interrupted
+                if exc.args and exc.args[0] == errno.EINTR:
+                    # Try again
+                    continue
+
+                # Stop reading
+                break
+
+            # If stopped
+            if wake_fd in ready_fds:
+                # Stop reading
+                break
+
+            # Read and dispatch events
+            self.read_events()
+
+    def schedule(self, handler, path, recursive=False):
+        """
+        Watch given directory.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Directory path.
+
+        :param recursive:
+            Whether watch sub-directories too, including sub-directories \
+            created later.
+
+        :return:
+            `InotifyWatch` object.
+        """
+        # Create watch object
+        watch = InotifyWatch(handler=handler, path=path, recursive=recursive)
+
+        # Add inotify watch of the directory, raise `OSError` if failed
+        self._add_dir_watch(watch, path)
+
+        # If watch recursively
+        if recursive:
+            # Add inotify watches of sub-directories
+            self._add_sub_dir_watches(watch, path)
+
+        # Return watch object
+        return watch
+
+    def unschedule(self, watch):
+        """
+        Stop watching.
+
+        :param watch:
+            `InotifyWatch` object returned by `schedule`.
+
+        :return:
+            None.
+        """
+        # For each watch descriptor of the watch
+        for wd in list(watch.wds):
+            # Remove from the watch's watch descriptors
+            watch.wds.discard(wd)
+
+            # Get watches that own the watch descriptor
+            owner_watches = self._wd_to_watches.get(wd, None)
+
+            # If have owner watches
+            if owner_watches is not None:
+                # Remove the watch from the owners
+                owner_watches.discard(watch)
+
+                # If other watches still own the watch descriptor
+                if owner_watches:
+                    # Keep the inotify watch
+                    continue
+
+            # Remove the watch descriptor from maps
+            self._remove_wd(wd)
+
+            # Tell kernel to remove the inotify watch.
+            #
+            # Error is ignored because the directory may have been removed.
+            #
+            _LIBC.inotify_rm_watch(self._fd, wd)
+
+    def close(self):
+        """
+        Close inotify file descriptor, which removes all inotify watches.
+
+        :return:
+            None.
+        """
+        # If the file descriptor is not closed
+        if self._fd >= 0:
+            # Close the file descriptor
+            os.close(self._fd)
+
+            # Mark as closed
+            self._fd = -1
+
+            # Clear watch descriptor maps
+            self._wd_to_path.clear()
+
+            # Clear watch descriptor maps
+            self._wd_to_watches.clear()
+
+    def _add_dir_watch(self, watch, dir_path):
+        """
+        Add inotify watch of given directory.
+
+        :param watch:
+            `InotifyWatch` object the inotify watch belongs to.
+
+        :param dir_path:
+            Directory path.
+
+        :return:
+            None.
+        """
+        # Add inotify watch
+        wd = _LIBC.inotify_add_watch(
+            self._fd, _encode_path(dir_path), WATCH_MASK
+        )
+
+        # If have error
+        if wd < 0:
+            # Get error number
+            error_no = ctypes.get_errno()
+
+            # Raise error
+            raise OSError(error_no, os.strerror(error_no), dir_path)
+
+        # Store the mapping
+        self._wd_to_path[wd] = dir_path
+
+        # Add the watch to the watch descriptor's owners
+        self._wd_to_watches.setdefault(wd, set()).add(watch)
+
+        # Add to the watch's watch descriptors
+        watch.wds.add(wd)
+
+    def _add_sub_dir_watches(self, watch, dir_path):
+        """
+        Add inotify watches of given directory's sub-directories, \
+        recursively.
+
+        :param watch:
+            `InotifyWatch` object the inotify watches belong to.
+
+        :param dir_path:
+            Directory path.
+
+        :return:
+            None.
+        """
+        # For each directory in the tree
+        for parent_dir, child_dir_names, _ in os.walk(dir_path):
+            # Not descend into skipped directories
+            child_dir_names[:] = [
+                x for x in child_dir_names if x not in _SKIP_DIR_NAMES
+            ]
+
+            # For each child directory
+            for child_dir_name in child_dir_names:
+                try:
+                    # Add inotify watch of the child directory
+                    self._add_dir_watch(
+                        watch, os.path.join(parent_dir, child_dir_name)
+                    )
+
+                # If have error, e.g. the directory has been removed
+                except OSError:
+                    # Ignore
+                    pass
+
+    def _remove_wd(self, wd):
+        """
+        Remove given watch descriptor from maps.
+
+        :param wd:
+            Watch descriptor.
+
+        :return:
+            None.
+        """
+        # Remove from the map
+        self._wd_to_path.pop(wd, None)
+
+        # Remove from the map
+        owner_watches = self._wd_to_watches.pop(wd, None)
+
+        # For each watch that owns the watch descriptor
+        for watch in owner_watches or ():
+            # Remove from the watch's watch descriptors
+            watch.wds.discard(wd)
+
+    def _rescan(self):
+        """
+        Dispatch all files in watched directories, and add inotify watches \
+        of sub-directories created meanwhile in recursive watches.
+
+        Called when the event queue overflowed, in which case any file may \
+        have changed without an event.
+
+        :return:
+            None.
+        """
+        # Get all watches
+        watches = set()
+
+        # For each set of watches that own a watch descriptor
+        for owner_watches in list(self._wd_to_watches.values()):
+            # Add to all watches
+            watches.update(owner_watches)
+
+        # For each watch
+        for watch in watches:
+            # If watch recursively
+            if watch.recursive:
+                # Add inotify watches of sub-directories created meanwhile
+                self._add_sub_dir_watches(watch, watch.path)
+
+        # Dict that maps handler's id to set of dispatched file paths
+        dispatched_paths_map = {}
+
+        # For each watch
+        for watch in watches:
+            # Get dispatched file paths of the watch's handler
+            dispatched_paths = dispatched_paths_map.setdefault(
+                id(watch.handler), set()
+            )
+
+            # For each watch descriptor of the watch
+            for wd in list(watch.wds):
+                # Get directory path
+                dir_path = self._wd_to_path.get(wd, None)
+
+                # If the watch descriptor is removed
+                if dir_path is None:
+                    # Skip
+                    continue
+
+                try:
+                    # Get file names in the directory
+                    file_names = os.listdir(dir_path)
+
+                # If have error, e.g. the directory has been removed
+                except OSError:
+                    # Skip
+                    continue
+
+                # For each file name
+                for file_name in file_names:
+                    # Get file path
+                    file_path = os.path.join(dir_path, file_name)
+
+                    # If the file path has been dispatched to the handler
+                    if file_path in dispatched_paths:
+                        # Skip
+                        continue
+
+                    # Add to dispatched file paths
+                    dispatched_paths.add(file_path)
+
+                    # Dispatch the file path
+                    watch.handler.dispatch_path(file_path)
+
+    def read_events(self):
+        """
+        Read and dispatch all pending events.
+
+        For each event, the watch's handler's `dispatch_path` is called \
+        with the event's file path.
+
+        :return:
+            Number of events read.
+        """
+        # Number of events read
+        event_count = 0
+
+        # Get read buffer
+        buf = self._buffer
+
+        # Run in a loop until no more data
+        while self._fd >= 0:
+            try:
+                # If have `os.readv`, in Python 3.3+
+                if _HAS_READV:
+                    # Read events into the buffer.
+                    #
+                    # `os.readv` reads into the existing buffer without
+                    # allocating a new bytes object.
+                    #
+                    data_size = os.readv(self._fd, [buf])
+
+                # If not have `os.readv`
+                else:
+                    # Read events
+                    buf = os.read(self._fd, READ_BUFFER_SIZE)
+
+                    # Get data size
+                    data_size = len(buf)
+
+            # If have error
+            except OSError as exc:
+                # If no more data
+                if exc.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    # Stop reading
+                    break
+
+                # If interrupted
+                if exc.errno == errno.EINTR:
+                    # Try again
+                    continue
+
+                # Raise other errors
+                raise
+
+            # If read nothing
+            if data_size <= 0:
+                # Stop reading
+                break
+
+            # Decode and dispatch events
+            event_count += self._process_buffer(buf, data_size)
+
+        # Return number of events read
+        return event_count
+
+    def _process_buffer(self, buf, data_size):
+        """
+        Decode and dispatch events in given buffer.
+
+        :param buf:
+            Buffer that contains events.
+
+        :param data_size:
+            Data size in the buffer.
+
+        :return:
+            Number of events decoded.
+        """
+        # Number of events decoded
+        event_count = 0
+
+        # Get header unpack function
+        unpack_from = _EVENT_HEADER.unpack_from
+
+        # Get header size
+        header_size = _EVENT_HEADER_SIZE
+
+        # Get memory view of the buffer to slice names without copying
+        buffer_view = memoryview(buf)
+
+        # Get maps
+        wd_to_path = self._wd_to_path
+
+        # Get maps
+        wd_to_watches = self._wd_to_watches
+
+        # Current offset in the buffer
+        offset = 0
+
+        # While have events
+        while offset + header_size <= data_size:
+            # Decode event header
+            wd, mask, _, name_len = unpack_from(buf, offset)
+
+            # Get name's start offset
+            name_start = offset + header_size
+
+            # Move to next event
+            offset = name_start + name_len
+
+            # Increment number of events
+            event_count += 1
+
+            # If the event queue overflowed
+            if mask & IN_Q_OVERFLOW:
+                # Rescan watched directories because events have been lost
+                self._rescan()
+
+                # Skip
+                continue
+
+            # If the inotify watch was removed
+            if mask & IN_IGNORED:
+                # Remove the watch descriptor
+                self._remove_wd(wd)
+
+                # Skip
+                continue
+
+            # Get directory path
+            dir_path = wd_to_path.get(wd, None)
+
+            # Get watches that own the watch descriptor.
+            #
+            # Copied because adding sub-directory watches below may change
+            # the set.
+            #
+            owner_watches = list(wd_to_watches.get(wd, ()))
+
+            # If the watch descriptor is unknown, e.g. just unscheduled by
+            # another thread
+            if dir_path is None or not owner_watches:
+                # Skip
+                continue
+
+            # If the event has a file name
+            if name_len:
+                # Get file name bytes, without trailing NUL padding
+                name = buffer_view[name_start:offset].tobytes().rstrip(b'\0')
+
+                # Get file path
+                file_path = os.path.join(dir_path, _decode_name(name))
+
+            # If the event has no file name, e.g. `IN_DELETE_SELF`
+            else:
+                # Use directory path
+                file_path = dir_path
+
+            # Whether a sub-directory is created or moved in
+            is_new_sub_dir = (mask & IN_ISDIR) \
+                and (mask & (IN_CREATE | IN_MOVED_TO)) \
+                and os.path.basename(file_path) not in _SKIP_DIR_NAMES
+
+            # Handlers the file path has been dispatched to
+            dispatched_handlers = []
+
+            # For each watch that owns the watch descriptor
+            for watch in owner_watches:
+                # If a sub-directory is created or moved in, in a recursive
+                # watch
+                if is_new_sub_dir and watch.recursive:
+                    try:
+                        # Add inotify watch of the sub-directory
+                        self._add_dir_watch(watch, file_path)
+
+                        # Add inotify watches of the sub-directory's
+                        # sub-directories
+                        self._add_sub_dir_watches(watch, file_path)
+
+                    # If have error, e.g. the directory has been removed
+                    except OSError:
+                        # Ignore
+                        pass
+
+                # If the file path has been dispatched to the handler, e.g.
+                # the handler scheduled overlapping watches
+                if any(x is watch.handler for x in dispatched_handlers):
+                    # Skip
+                    continue
+
+                # Add to dispatched handlers
+                dispatched_handlers.append(watch.handler)
+
+                # Dispatch the file path
+                watch.handler.dispatch_path(file_path)
+
+        # If have `memoryview.release`, in Python 3.2+
+        if hasattr(buffer_view, 'release'):
+            # Release the memory view so that the buffer can be reused
+            buffer_view.release()
+
+        # Return number of events decoded
+        return event_count
@@ -0,0 +1,195 @@
+# coding: utf-8
+"""
+Tests of `inotify` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import unittest
+
+# Local imports
+from . import inotify
+from .watch_testing import RecordingHandler
+from .watch_testing import WatchDirTestCase
+
+
+@unittest.skipUnless(inotify.is_available(), 'inotify is not available.')
+class InotifyObserverTest(WatchDirTestCase):
+    """
+    Tests of `InotifyObserver` with overlapping watches.
+    """
+
+    def setUp(self):
+        """
+        Create directories `a` and `a/b`, and the observer.
+
+        :return:
+            None.
+        """
+        # Create directories
+        super(InotifyObserverTest, self).setUp()
+
+        # Create observer
+        self.observer = inotify.InotifyObserver()
+
+    def tearDown(self):
+        """
+        Close the observer, and remove the directories.
+
+        :return:
+            None.
+        """
+        # Close the observer
+        self.observer.close()
+
+        # Remove directories
+        super(InotifyObserverTest, self).tearDown()
+
+    def _touch(self):
+        """
+        Write the file in `a/b`, and read events.
+
+        :return:
+            None.
+        """
+        # Write the file
+        super(InotifyObserverTest, self)._touch()
+
+        # Read and dispatch events
+        self.observer.read_events()
+
+    def test_overlapping_watches(self):
+        """
+        Test a recursive watch of `a` and a watch of `a/b` both get events \
+        in `a/b`, and unscheduling one keeps the other's inotify watch.
+        """
+        # Create handlers
+        handler_a = RecordingHandler()
+
+        handler_b = RecordingHandler()
+
+        # Watch `a` recursively
+        watch_a = self.observer.schedule(handler_a, self.dir_a, True)
+
+        # Watch `a/b`
+        watch_b = self.observer.schedule(handler_b, self.dir_b, False)
+
+        # Write the file
+        self._touch()
+
+        # Both watches get the event
+        self.assertIn(self.file_path, handler_a.paths)
+
+        self.assertIn(self.file_path, handler_b.paths)
+
+        # Stop watching `a/b`
+        self.observer.unschedule(watch_b)
+
+        # Clear recorded paths
+        del handler_a.paths[:]
+
+        # Write the file again
+        self._touch()
+
+        # The watch of `a` still gets the event
+        self.assertIn(self.file_path, handler_a.paths)
+
+        # Stop watching `a`
+        self.observer.unschedule(watch_a)
+
+        # All inotify watches are removed
+        self.assertEqual(self.observer.get_watch_count(), 0)
+
+    def test_child_to_parent_watch_set(self):
+        """
+        Test changing watch set from {`a/b`} to {`a`} recursively, by \
+        scheduling the new watch before unscheduling the old one, keeps \
+        events in `a/b`.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a/b`
+        old_watch = self.observer.schedule(handler, self.dir_b, False)
+
+        # Watch `a` recursively
+        self.observer.schedule(handler, self.dir_a, True)
+
+        # Stop watching `a/b`
+        self.observer.unschedule(old_watch)
+
+        # Write the file
+        self._touch()
+
+        # The event is dispatched
+        self.assertIn(self.file_path, handler.paths)
+
+        # Only the inotify watches of `a` and `a/b` are left
+        self.assertEqual(self.observer.get_watch_count(), 2)
+
+    def test_parent_to_child_watch_set(self):
+        """
+        Test changing watch set from {`a`} recursively to {`a/b`} keeps \
+        events in `a/b`.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a` recursively
+        old_watch = self.observer.schedule(handler, self.dir_a, True)
+
+        # Watch `a/b`
+        self.observer.schedule(handler, self.dir_b, False)
+
+        # Stop watching `a`
+        self.observer.unschedule(old_watch)
+
+        # Write the file
+        self._touch()
+
+        # The event is dispatched
+        self.assertIn(self.file_path, handler.paths)
+
+        # Only the inotify watch of `a/b` is left
+        self.assertEqual(self.observer.get_watch_count(), 1)
+
+    def test_queue_overflow(self):
+        """
+        Test an event queue overflow dispatches files in watched \
+        directories, including a sub-directory created without an event.
+        """
+        # Create handler
+        handler = RecordingHandler()
+
+        # Watch `a` recursively
+        self.observer.schedule(handler, self.dir_a, True)
+
+        # Write the file
+        self._touch()
+
+        # Clear recorded paths
+        del handler.paths[:]
+
+        # Get sub-directory path
+        dir_c = os.path.join(self.dir_a, 'c')
+
+        # Create the sub-directory
+        os.mkdir(dir_c)
+
+        # Drop the sub-directory's creation event, as if it was lost
+        os.read(self.observer.fileno(), inotify.READ_BUFFER_SIZE)
+
+        # Create overflow event, which has watch descriptor -1
+        buf = inotify._EVENT_HEADER.pack(-1, inotify.IN_Q_OVERFLOW, 0, 0)
+
+        # Decode and dispatch the overflow event
+        self.observer._process_buffer(buf, len(buf))
+
+        # The file in `a/b` and the new sub-directory are dispatched
+        self.assertIn(self.file_path, handler.paths)
+
+        self.assertIn(dir_c, handler.paths)
+
+        # The new sub-directory is watched
+        self.assertEqual(self.observer.get_watch_count(), 3)
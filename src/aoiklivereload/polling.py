@@ -0,0 +1,592 @@
+# coding: utf-8
+"""
+Polling observer that detects file changes by comparing `stat` results.
+
+Used where file system events are not delivered, e.g. NFS, SMB, and bind \
+mounts of containers and virtual machines.
+
+A directory is re-listed only when its modification time has changed, \
+which happens when an entry is created, removed or renamed in it. Only \
+files given to `track_files`, e.g. loaded module files, are checked with \
+one `stat` call each, for in-place writes.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+
+
+# Whether have `os.scandir`, in Python 3.5+
+_HAS_SCANDIR = hasattr(os, 'scandir')
+
+
+# Directory names not to watch in recursive watches.
+#
+# `__pycache__` only contains bytecode files written on import.
+#
+_SKIP_DIR_NAMES = frozenset(['__pycache__'])
+
+
+def _get_stat_key(stat_obj):
+    """
+    Get the tuple of stat fields compared to detect changes.
+
+    :param stat_obj:
+        `os.stat_result` object.
+
+    :return:
+        Tuple of modification time in nanoseconds, size and inode number.
+    """
+    # Get modification time in nanoseconds, in Python 3.3+
+    mtime_ns = getattr(stat_obj, 'st_mtime_ns', None)
+
+    # If not have modification time in nanoseconds
+    if mtime_ns is None:
+        # Convert from modification time in seconds
+        mtime_ns = int(stat_obj.st_mtime * 1e9)
+
+    # Return the tuple
+    return (mtime_ns, stat_obj.st_size, stat_obj.st_ino)
+
+
+def _list_dir(dir_path):
+    """
+    List given directory's entries.
+
+    :param dir_path:
+        Directory path.
+
+    :return:
+        List of (entry path, whether is directory) tuples. Raise `OSError` \
+        if failed.
+    """
+    # If have `os.scandir`
+    if _HAS_SCANDIR:
+        # Entries list
+        entries = []
+
+        # Get directory iterator.
+        #
+        # `os.scandir` gets entry types from the directory listing, without
+        # calling `stat` on each entry.
+        #
+        dir_iter = os.scandir(dir_path)
+
+        try:
+            # For each entry
+            for entry in dir_iter:
+                try:
+                    # Get whether is directory, not following symlinks like
+                    # `os.walk`
+                    is_dir = entry.is_dir(follow_symlinks=False)
+
+                # If have error, e.g. the entry has been removed
+                except OSError:
+                    # Skip
+                    continue
+
+                # Add to entries list
+                entries.append((entry.path, is_dir))
+
+        finally:
+            # If have `close`, in Python 3.6+
+            if hasattr(dir_iter, 'close'):
+                # Close the iterator
+                dir_iter.close()
+
+        # Return entries list
+        return entries
+
+    # If not have `os.scandir`
+    else:
+        # Entries list
+        entries = []
+
+        # For each entry name
+        for entry_name in os.listdir(dir_path):
+            # Get entry path
+            entry_path = os.path.join(dir_path, entry_name)
+
+            # Add to entries list
+            entries.append((
+                entry_path,
+                os.path.isdir(entry_path) and not os.path.islink(entry_path),
+            ))
+
+        # Return entries list
+        return entries
+
+
+class PollingWatch(object):
+    """
+    Watch object returned by `PollingObserver.schedule`.
+    """
+
+    def __init__(self, handler, path, recursive):
+        """
+        Constructor.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Watched directory path.
+
+        :param recursive:
+            Whether watch sub-directories too.
+
+        :return:
+            None.
+        """
+        # Store event handler
+        self.handler = handler
+
+        # Store watched directory path
+        self.path = path
+
+        # Store whether recursive
+        self.recursive = recursive
+
+        # Dict that maps polled directory path to its modification time in
+        # nanoseconds
+        self.dir_mtimes = {}
+
+        # Dict that maps polled directory path to set of its file paths and
+        # polled sub-directory paths
+        self.dir_children = {}
+
+        # Dict that maps tracked file path to stat key tuple
+        self.file_keys = {}
+
+
+class PollingObserver(object):
+    """
+    Observer that has watchdog observer's `start`, `stop`, `schedule` and \
+    `unschedule` methods, using `stat` polling.
+
+    The owner calls `track_files` to tell which files to check for \
+    in-place changes, and calls `check` periodically to detect changes.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+            None.
+        """
+        # List of `PollingWatch` objects
+        self._watches = []
+
+        # Dict that maps polled directory path to `PollingWatch` object
+        self._dir_to_watch = {}
+
+    def start(self):
+        """
+        Start observer. Do nothing because `check` is called by the owner.
+
+        :return:
+            None.
+        """
+        # Do nothing
+        pass
+
+    def stop(self):
+        """
+        Stop observer, which removes all watches.
+
+        :return:
+            None.
+        """
+        # Remove all watches
+        del self._watches[:]
+
+        # Clear the map
+        self._dir_to_watch.clear()
+
+    def get_watch_count(self):
+        """
+        Get number of polled directories.
+
+        :return:
+            Number of polled directories.
+        """
+        # Return number of polled directories
+        return sum(len(x.dir_mtimes) for x in self._watches)
+
+    def schedule(self, handler, path, recursive=False):
+        """
+        Watch given directory.
+
+        :param handler:
+            Event handler that has `dispatch_path` method.
+
+        :param path:
+            Directory path.
+
+        :param recursive:
+            Whether watch sub-directories too, including sub-directories \
+            created later.
+
+        :return:
+            `PollingWatch` object.
+        """
+        # Create watch object
+        watch = PollingWatch(handler=handler, path=path, recursive=recursive)
+
+        # Take initial snapshot of the directory, raise `OSError` if failed
+        self._add_dir(watch, path, changed_paths=None)
+
+        # Add to watches list
+        self._watches.append(watch)
+
+        # Return watch object
+        return watch
+
+    def unschedule(self, watch):
+        """
+        Stop watching.
+
+        :param watch:
+            `PollingWatch` object returned by `schedule`.
+
+        :return:
+            None.
+        """
+        try:
+            # Remove from watches list
+            self._watches.remove(watch)
+
+        # If the watch is not scheduled
+        except ValueError:
+            # Ignore
+            return
+
+        # For each polled directory of the watch
+        for dir_path in watch.dir_mtimes:
+            # If the directory is mapped to the watch
+            if self._dir_to_watch.get(dir_path, None) is watch:
+                # Remove from the map
+                del self._dir_to_watch[dir_path]
+
+    def track_files(self, file_paths):
+        """
+        Check given files for in-place changes in later polls.
+
+        Files not in polled directories, and files already tracked, are \
+        ignored. Files not tracked are still reported when created or \
+        removed.
+
+        :param file_paths:
+            Iterable of file paths.
+
+        :return:
+            None.
+        """
+        # Get map
+        dir_to_watch = self._dir_to_watch
+
+        # For each file path
+        for file_path in file_paths:
+            # Get the watch that polls the file's directory
+            watch = dir_to_watch.get(os.path.dirname(file_path), None)
+
+            # If the file's directory is not polled, or the file is tracked
+            if watch is None or file_path in watch.file_keys:
+                # Skip
+                continue
+
+            # If the file is not listed in the directory, e.g. created after
+            # last listing
+            if file_path not in watch.dir_children[
+                    os.path.dirname(file_path)]:
+                # Skip, it is tracked after the directory is re-listed
+                continue
+
+            try:
+                # Store stat key
+                watch.file_keys[file_path] = \
+                    _get_stat_key(os.stat(file_path))
+
+            # If have error, e.g. the file has been removed
+            except OSError:
+                # Ignore
+                pass
+
+    def check(self):
+        """
+        Poll all watches, and dispatch changed paths.
+
+        For each changed path, the watch's handler's `dispatch_path` is \
+        called with the path.
+
+        :return:
+            Number of changed paths.
+        """
+        # Number of changed paths
+        changed_count = 0
+
+        # For each watch
+        for watch in list(self._watches):
+            # Changed paths list
+            changed_paths = []
+
+            # Poll the watch
+            self._check_watch(watch, changed_paths)
+
+            # For each changed path
+            for changed_path in changed_paths:
+                # Dispatch the path
+                watch.handler.dispatch_path(changed_path)
+
+            # Add to number of changed paths
+            changed_count += len(changed_paths)
+
+        # Return number of changed paths
+        return changed_count
+
+    def _check_watch(self, watch, changed_paths):
+        """
+        Poll given watch.
+
+        :param watch:
+            `PollingWatch` object.
+
+        :param changed_paths:
+            List to add changed paths to.
+
+        :return:
+            None.
+        """
+        # Get map
+        dir_mtimes = watch.dir_mtimes
+
+        # For each polled directory.
+        #
+        # Copied because directories may be added or removed in the loop.
+        #
+        for dir_path in list(dir_mtimes):
+            # Get old modification time, or None if removed in the loop
+            old_mtime = dir_mtimes.get(dir_path, None)
+
+            # If the directory has been removed in the loop
+            if old_mtime is None:
+                # Skip
+                continue
+
+            try:
+                # Get modification time
+                new_mtime = _get_stat_key(os.stat(dir_path))[0]
+
+            # If have error, e.g. the directory has been removed
+            except OSError:
+                # Remove the directory's states
+                self._remove_dir(watch, dir_path, changed_paths)
+
+                # Skip
+                continue
+
+            # If the directory's entries are changed
+            if new_mtime != old_mtime:
+                # Re-list the directory
+                self._rescan_dir(watch, dir_path, new_mtime, changed_paths)
+
+        # Get map
+        file_keys = watch.file_keys
+
+        # For each tracked file
+        for file_path, old_key in list(file_keys.items()):
+            try:
+                # Get stat key
+                new_key = _get_stat_key(os.stat(file_path))
+
+            # If have error, e.g. the file has been removed
+            except OSError:
+                # Ignore.
+                #
+                # The parent directory's modification time changes so the
+                # removal is found when the directory is re-listed.
+                #
+                continue
+
+            # If the file is changed
+            if new_key != old_key:
+                # Store new stat key
+                file_keys[file_path] = new_key
+
+                # Add to changed paths
+                changed_paths.append(file_path)
+
+    def _add_dir(self, watch, dir_path, changed_paths):
+        """
+        Start polling given directory, and its sub-directories if the watch \
+        is recursive.
+
+        :param watch:
+            `PollingWatch` object.
+
+        :param dir_path:
+            Directory path.
+
+        :param changed_paths:
+            List to add the directory's entries to as changed paths, or \
+            None if not add, e.g. for initial snapshot.
+
+        :return:
+            None. Raise `OSError` if the directory can not be listed.
+        """
+        # Get modification time before listing, so that changes during
+        # listing are found in next check
+        mtime = _get_stat_key(os.stat(dir_path))[0]
+
+        # Store modification time
+        watch.dir_mtimes[dir_path] = mtime
+
+        # Store empty children set
+        watch.dir_children[dir_path] = set()
+
+        # Map the directory to the watch
+        self._dir_to_watch[dir_path] = watch
+
+        # List the directory
+        self._rescan_dir(watch, dir_path, mtime, changed_paths)
+
+    def _rescan_dir(self, watch, dir_path, mtime, changed_paths):
+        """
+        List given directory, and update its children states.
+
+        :param watch:
+            `PollingWatch` object.
+
+        :param dir_path:
+            Directory path.
+
+        :param mtime:
+            Directory's current modification time in nanoseconds.
+
+        :param changed_paths:
+            List to add changed paths to, or None if not add.
+
+        :return:
+            None.
+        """
+        # Store modification time
+        watch.dir_mtimes[dir_path] = mtime
+
+        try:
+            # List the directory
+            entries = _list_dir(dir_path)
+
+        # If have error, e.g. the directory has been removed
+        except OSError:
+            # If is initial snapshot
+            if changed_paths is None:
+                # Raise the error
+                raise
+
+            # Remove the directory's states
+            self._remove_dir(watch, dir_path, changed_paths)
+
+            # Return
+            return
+
+        # Get old children set
+        old_children = watch.dir_children[dir_path]
+
+        # New children set
+        new_children = set()
+
+        # For each entry
+        for entry_path, is_dir in entries:
+            # If the entry is a directory
+            if is_dir:
+                # If the watch is not recursive, or the directory is skipped
+                if not watch.recursive \
+                        or os.path.basename(entry_path) in _SKIP_DIR_NAMES:
+                    # Skip
+                    continue
+
+                # Add to new children set
+                new_children.add(entry_path)
+
+                # If the directory is new
+                if entry_path not in old_children:
+                    try:
+                        # Start polling the directory
+                        self._add_dir(watch, entry_path, changed_paths)
+
+                    # If have error, e.g. the directory has been removed
+                    except OSError:
+                        # Discard from new children set
+                        new_children.discard(entry_path)
+
+                # Continue
+                continue
+
+            # Add to new children set
+            new_children.add(entry_path)
+
+            # If the file is new, and need add changed paths
+            if entry_path not in old_children and changed_paths is not None:
+                # Add to changed paths
+                changed_paths.append(entry_path)
+
+        # Store new children set
+        watch.dir_children[dir_path] = new_children
+
+        # For each removed child
+        for child_path in old_children - new_children:
+            # If the child is a polled directory
+            if child_path in watch.dir_mtimes:
+                # Remove the directory's states
+                self._remove_dir(watch, child_path, changed_paths)
+
+            # If the child is a file
+            else:
+                # Remove the file's stat key
+                watch.file_keys.pop(child_path, None)
+
+                # Add to changed paths
+                changed_paths.append(child_path)
+
+    def _remove_dir(self, watch, dir_path, changed_paths):
+        """
+        Stop polling given directory and its sub-directories.
+
+        :param watch:
+            `PollingWatch` object.
+
+        :param dir_path:
+            Directory path.
+
+        :param changed_paths:
+            List to add removed paths to.
+
+        :return:
+            None.
+        """
+        # Remove the directory's modification time
+        watch.dir_mtimes.pop(dir_path, None)
+
+        # If the directory is mapped to the watch
+        if self._dir_to_watch.get(dir_path, None) is watch:
+            # Remove from the map
+            del self._dir_to_watch[dir_path]
+
+        # For each child
+        for child_path in watch.dir_children.pop(dir_path, ()):
+            # If the child is a polled directory
+            if child_path in watch.dir_mtimes:
+                # Remove the directory's states
+                self._remove_dir(watch, child_path, changed_paths)
+
+            # If the child is a file
+            else:
+                # Remove the file's stat key
+                watch.file_keys.pop(child_path, None)
+
+                # Add to changed paths
+                changed_paths.append(child_path)
+
+        # Add to changed paths
+        changed_paths.append(dir_path)
@@ -0,0 +1,137 @@
+# coding: utf-8
+"""
+Tests of `polling` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import shutil
+
+# Local imports
+from . import polling
+from .watch_testing import RecordingHandler
+from .watch_testing import WatchDirTestCase
+from .watch_testing import write_file
+
+
+class PollingObserverTest(WatchDirTestCase):
+    """
+    Tests of `PollingObserver` with a recursive watch of `a`.
+    """
+
+    def setUp(self):
+        """
+        Create directories `a` and `a/b`, and the observer watching `a` \
+        recursively.
+
+        :return:
+            None.
+        """
+        # Create directories
+        super(PollingObserverTest, self).setUp()
+
+        # Create observer
+        self.observer = polling.PollingObserver()
+
+        # Create handler
+        self.handler = RecordingHandler()
+
+        # Watch `a` recursively
+        self.observer.schedule(self.handler, self.dir_a, recursive=True)
+
+    def _check(self):
+        """
+        Poll the observer, and pop dispatched paths.
+
+        :return:
+            Set of dispatched paths.
+        """
+        # Poll the observer
+        self.observer.check()
+
+        # Get dispatched paths
+        paths = set(self.handler.paths)
+
+        # Clear recorded paths
+        del self.handler.paths[:]
+
+        # Return dispatched paths
+        return paths
+
+    def test_tracked_file_changed(self):
+        """
+        Test a created file is reported, and an in-place write of a \
+        tracked file is reported.
+        """
+        # Write the file in `a/b`
+        self._touch()
+
+        # The created file is reported
+        self.assertEqual(self._check(), set([self.file_path]))
+
+        # Nothing else is reported
+        self.assertEqual(self._check(), set())
+
+        # Track the file
+        self.observer.track_files([self.file_path])
+
+        # Get the file's stat
+        stat_obj = os.stat(self.file_path)
+
+        # Write the file in place, keeping the directory unchanged
+        write_file(self.file_path)
+
+        # Make sure the modification time changed
+        os.utime(
+            self.file_path, (stat_obj.st_atime, stat_obj.st_mtime + 10)
+        )
+
+        # The tracked file is reported
+        self.assertEqual(self._check(), set([self.file_path]))
+
+    def test_sub_dir_created_and_removed(self):
+        """
+        Test a sub-directory created later is polled, and its removal is \
+        reported.
+        """
+        # Get sub-directory path
+        dir_c = os.path.join(self.dir_a, 'c')
+
+        # Get file path in the sub-directory
+        file_path_c = os.path.join(dir_c, 'y.py')
+
+        # Create the sub-directory
+        os.mkdir(dir_c)
+
+        # Write a file in the sub-directory
+        write_file(file_path_c)
+
+        # The new file is reported
+        self.assertIn(file_path_c, self._check())
+
+        # The sub-directory is polled, along with `a` and `a/b`
+        self.assertEqual(self.observer.get_watch_count(), 3)
+
+        # Remove the sub-directory
+        shutil.rmtree(dir_c)
+
+        # The removed file and directory are reported
+        self.assertEqual(self._check(), set([file_path_c, dir_c]))
+
+        # The sub-directory is not polled
+        self.assertEqual(self.observer.get_watch_count(), 2)
+
+    def test_missing_dir(self):
+        """
+        Test watching a directory that does not exist raises `OSError`, \
+        and adds no watch.
+        """
+        # Watch a directory that does not exist
+        with self.assertRaises(OSError):
+            self.observer.schedule(
+                RecordingHandler(), os.path.join(self.temp_dir, 'x')
+            )
+
+        # Only `a` and `a/b` are polled
+        self.assertEqual(self.observer.get_watch_count(), 2)
@@ -0,0 +1,470 @@
+# coding: utf-8
+"""
+Supervisor that runs the target program in a child process and restarts \
+the child process on module file changes.
+
+Used by `python -m aoiklivereload`.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Local imports
+from .aoiklivereload import LiveReloader
+
+
+# Logger
+_LOGGER = logging.getLogger(__name__)
+
+
+# Bootstrap script's file path
+BOOTSTRAP_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'bootstrap.py'
+)
+
+
+# Make sure the bootstrap script is a source file, e.g. not the `.pyc` file
+# in Python 2
+if BOOTSTRAP_PATH.endswith(('.pyc', '.pyo')):
+    BOOTSTRAP_PATH = BOOTSTRAP_PATH[:-1]
+
+
+class Supervisor(LiveReloader):
+    """
+    Supervisor that runs the target program in a child process and restarts \
+    the child process on module file changes.
+
+    The child process reports its imported module file paths over a pipe, \
+    and the supervisor watches them. Watches and fingerprints are kept in \
+    the supervisor across restarts.
+    """
+
+    # Environment variable name that passes the pipe file descriptor the
+    # child process writes module file paths to
+    MODULE_PATHS_FD_ENV_KEY = 'AOIKLIVERELOAD_MODULE_PATHS_FD'
+
+    def __init__(self, cmd_args, stop_timeout=5, **kwargs):
+        """
+        Constructor.
+
+        :param cmd_args:
+            Target program's arguments, e.g. `['script.py', 'arg']` or \
+            `['-m', 'module', 'arg']`.
+
+        :param stop_timeout:
+            Time to wait for the child process to exit after sending \
+            `SIGTERM`, in seconds, before killing it.
+
+        :param kwargs:
+            Keyword arguments for `LiveReloader`. `reload_mode` and \
+            `discovery_mode` are not allowed. `preflight_import` and \
+            `precompile_dependents` are not supported because the target \
+            program's modules are not imported in the supervisor.
+
+        :return:
+            None.
+        """
+        # For each option that needs the target program's modules
+        for option_name in ('preflight_import', 'precompile_dependents'):
+            # If the option is enabled
+            if kwargs.get(option_name, False):
+                # Get error message
+                error_msg = 'Option {} is not supported in supervisor.' \
+                    .format(repr(option_name))
+
+                # Raise error
+                raise ValueError(error_msg)
+
+        # Initialize the reloader.
+        #
+        # `spawn_wait` is the reload mode closest to restarting the child
+        # process, and is reported in reload stats.
+        #
+        super(Supervisor, self).__init__(
+            reload_mode=self.RELOAD_MODE_V_SPAWN_WAIT,
+            discovery_mode=self.DISCOVERY_MODE_V_SCAN,
+            **kwargs
+        )
+
+        # Store target program's arguments
+        self._cmd_args = list(cmd_args)
+
+        # Store stop timeout
+        self._stop_timeout = stop_timeout
+
+        # Lock for child process states
+        self._process_lock = threading.Lock()
+
+        # Child process
+        self._process = None
+
+        # Event set when the child process is restarted
+        self._restart_event = threading.Event()
+
+        # Lock for child module file paths
+        self._child_module_lock = threading.Lock()
+
+        # Set of module file paths reported by the current child process.
+        #
+        # Replaced with a new set when a new child process is started, so
+        # that modules the new child process no longer imports are not
+        # watched, and paths reported late by the old child process's
+        # reader thread go to the old set.
+        #
+        self._child_module_file_paths = set()
+
+    def run(self):
+        """
+        Run the child process, and restart it on module file changes, \
+        until interrupted.
+
+        :return:
+            The last child process's exit code.
+        """
+        # Start child process
+        self._start_child()
+
+        # Start watcher thread
+        self.start_watcher_thread()
+
+        # Child process's exit code
+        exit_code = 0
+
+        try:
+            # Run in a loop until interrupted
+            while True:
+                # With the lock
+                with self._process_lock:
+                    # Get child process
+                    process = self._process
+
+                # Wait for the child process to exit
+                exit_code = process.wait()
+
+                # With the lock
+                with self._process_lock:
+                    # Whether the child process has been restarted
+                    is_restarted = self._process is not process
+
+                # If the child process has been restarted
+                if is_restarted:
+                    # Wait for the new child process
+                    continue
+
+                # Log message
+                _LOGGER.info(
+                    'Child process exited with code %s.'
+                    ' Waiting for file changes to restart.',
+                    exit_code,
+                )
+
+                # Wait for restart.
+                #
+                # Timeout is used so that `KeyboardInterrupt` is raised in
+                # Python 2.
+                #
+                while not self._restart_event.wait(1):
+                    # Wait again
+                    pass
+
+                # Clear the event
+                self._restart_event.clear()
+
+        # If interrupted
+        except KeyboardInterrupt:
+            # With the lock
+            with self._process_lock:
+                # Stop child process
+                exit_code = self._stop_child()
+
+        finally:
+            # Stop the watcher thread
+            self.stop_watcher()
+
+        # Return exit code
+        return exit_code
+
+    def reload(self):
+        """
+        Restart the child process.
+
+        This function overrides `LiveReloader.reload`.
+
+        :return:
+            None.
+        """
+        try:
+            # If the pre-reload steps failed, e.g. a changed file does not
+            # compile in preflight, keep the child process running
+            if not self._prepare_reload():
+                # Return
+                return
+
+            # Call pre-reload hooks
+            self._run_pre_reload_hooks()
+
+            # With the lock
+            with self._process_lock:
+                # Stop child process
+                self._stop_child()
+
+                # Start new child process
+                self._start_child()
+
+            # Wake up `run` if it is waiting for restart
+            self._restart_event.set()
+
+        finally:
+            # With the lock
+            with self._debounce_lock:
+                # Allow next reload
+                self._is_reloading = False
+
+    def _get_module_file_paths(self):
+        """
+        Get module file paths reported by child processes.
+
+        This function overrides `LiveReloader._get_module_file_paths`.
+
+        :return:
+            List of module file paths.
+        """
+        # With the lock
+        with self._child_module_lock:
+            # Return module file paths
+            return list(self._child_module_file_paths)
+
+    def _start_child(self):
+        """
+        Start child process. Called with `_process_lock` held.
+
+        :return:
+            None.
+        """
+        # If this is a restart
+        if self._reload_times:
+            # Get env dict with reload times, so that the child process can
+            # call `mark_ready` to report reload stats
+            env_copy = self._get_reload_env()
+
+        # If this is the first start
+        else:
+            # Get env dict copy
+            env_copy = os.environ.copy()
+
+        # With the lock
+        with self._child_module_lock:
+            # Use new set for the new child process's module file paths
+            self._child_module_file_paths = set()
+
+        # Start child process
+        self._process = self._spawn_process(env_copy)
+
+    def _spawn_process(self, env_copy, pass_fds=()):
+        """
+        Spawn a process that runs the target program via the bootstrap \
+        script, and start a reader thread that reads its module file paths.
+
+        :param env_copy:
+            Env dict for the process. Modified.
+
+        :param pass_fds:
+            Extra file descriptors to pass to the process.
+
+        :return:
+            `subprocess.Popen` object.
+        """
+        # Create pipe the process writes module file paths to
+        read_fd, write_fd = os.pipe()
+
+        # Put pipe file descriptor in env dict
+        env_copy[self.MODULE_PATHS_FD_ENV_KEY] = str(write_fd)
+
+        # Get `subprocess.Popen` keyword arguments
+        popen_kwargs = self._get_popen_kwargs()
+
+        # If is Python 2.
+        #
+        # `pass_fds` is not supported.
+        #
+        if sys.version_info[0] == 2:
+            # Not close file descriptors so that the pipe is inherited
+            popen_kwargs['close_fds'] = False
+
+        # If is not Python 2
+        else:
+            # Pass the pipe's write end and extra file descriptors too
+            popen_kwargs['pass_fds'] = \
+                list(popen_kwargs.get('pass_fds', ())) + [write_fd] + \
+                list(pass_fds)
+
+        try:
+            # Start process
+            process = subprocess.Popen(
+                [sys.executable, BOOTSTRAP_PATH] + self._cmd_args,
+                env=env_copy,
+                **popen_kwargs
+            )
+
+        finally:
+            # Close the pipe's write end in this process
+            os.close(write_fd)
+
+        # With the lock
+        with self._child_module_lock:
+            # Get the set the process's module file paths are added to
+            module_file_paths = self._child_module_file_paths
+
+        # Create reader thread
+        thread = threading.Thread(
+            target=self._run_reader, args=(read_fd, module_file_paths)
+        )
+
+        # Use daemon thread
+        thread.daemon = True
+
+        # Start reader thread
+        thread.start()
+
+        # Return the process
+        return process
+
+    def _stop_child(self):
+        """
+        Stop child process. Called with `_process_lock` held.
+
+        :return:
+            Child process's exit code.
+        """
+        # Stop child process, and return exit code
+        return self._stop_processes([self._process])[0]
+
+    def _stop_processes(self, processes):
+        """
+        Stop given processes.
+
+        Send `SIGTERM` to all of them, wait for them to exit, and kill the \
+        ones that do not exit in time.
+
+        :param processes:
+            List of `subprocess.Popen` objects.
+
+        :return:
+            List of exit codes.
+        """
+        # For each process
+        for process in processes:
+            # If the process has not exited
+            if process.poll() is None:
+                try:
+                    # Send `SIGTERM`
+                    process.terminate()
+
+                # If have error, e.g. the process has exited
+                except OSError:
+                    # Ignore
+                    pass
+
+        # Get deadline
+        deadline = time.time() + self._stop_timeout
+
+        # While some process has not exited and not timed out.
+        #
+        # `wait` with timeout is not used because it is not supported in
+        # Python 2.
+        #
+        while any(x.poll() is None for x in processes) \
+                and time.time() < deadline:
+            # Sleep before next check
+            time.sleep(0.05)
+
+        # For each process
+        for process in processes:
+            # If the process has not exited
+            if process.poll() is None:
+                # Log message
+                _LOGGER.warning(
+                    'Child process %s did not exit in %s seconds.'
+                    ' Killing it.',
+                    process.pid,
+                    self._stop_timeout,
+                )
+
+                try:
+                    # Kill the process
+                    process.kill()
+
+                # If have error, e.g. the process has exited
+                except OSError:
+                    # Ignore
+                    pass
+
+        # Return exit codes
+        return [x.wait() for x in processes]
+
+    def _run_reader(self, read_fd, module_file_paths):
+        """
+        Reader thread's function that reads module file paths from the pipe.
+
+        :param read_fd:
+            Pipe's read end file descriptor.
+
+        :param module_file_paths:
+            Set to add the module file paths to.
+
+        :return:
+            None.
+        """
+        # Get file system encoding
+        encoding = sys.getfilesystemencoding() or 'utf-8'
+
+        # Incomplete line
+        buf = b''
+
+        try:
+            # Run in a loop until the child process closes the pipe
+            while True:
+                # Read data
+                data = os.read(read_fd, 65536)
+
+                # If the pipe is closed
+                if not data:
+                    # Stop reading
+                    break
+
+                # Split lines, the last part is incomplete
+                lines = (buf + data).split(b'\n')
+
+                # Store incomplete line
+                buf = lines.pop()
+
+                # Get module file paths
+                paths = [x.decode(encoding) for x in lines if x]
+
+                # With the lock
+                with self._child_module_lock:
+                    # Get number of module file paths
+                    old_count = len(module_file_paths)
+
+                    # Add module file paths
+                    module_file_paths.update(paths)
+
+                    # Whether have new module file paths of the current
+                    # child process
+                    is_changed = len(module_file_paths) != old_count \
+                        and module_file_paths is self._child_module_file_paths
+
+                # If have new module file paths
+                if is_changed:
+                    # Wake up the watcher thread to watch them soon
+                    self._watcher_wake_event.set()
+
+        finally:
+            # Close the pipe's read end
+            os.close(read_fd)
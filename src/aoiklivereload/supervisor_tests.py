@@ -0,0 +1,150 @@
+# coding: utf-8
+"""
+Tests of `supervisor` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Local imports
+from .supervisor import Supervisor
+
+
+def _write_file(file_path, text):
+    """
+    Write text to file.
+
+    :param file_path:
+        File path.
+
+    :param text:
+        Text.
+
+    :return:
+        None.
+    """
+    # Open the file
+    with open(file_path, 'w') as file_obj:
+        # Write the text
+        file_obj.write(text)
+
+
+@unittest.skipIf(sys.platform == 'win32', 'Requires Unix.')
+class SupervisorReloadTest(unittest.TestCase):
+    """
+    Tests of `Supervisor.reload`.
+    """
+
+    def setUp(self):
+        """
+        Create a program that imports module `mod`, and a supervisor that \
+        runs it with preflight.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get file paths
+        app_path = os.path.join(self.temp_dir, 'app.py')
+
+        self.mod_path = os.path.join(self.temp_dir, 'mod.py')
+
+        # Write the program
+        _write_file(app_path, 'import time\nimport mod\ntime.sleep(60)\n')
+
+        # Write module `mod`
+        _write_file(self.mod_path, 'X = 1\n')
+
+        # Create supervisor
+        self.supervisor = Supervisor([app_path], preflight=True)
+
+        # Hook calls
+        self.hook_calls = []
+
+        # Add pre-reload hook that records calls
+        self.supervisor.add_pre_reload_hook(self.hook_calls.append)
+
+        # Start child process
+        self.supervisor._start_child()
+
+    def tearDown(self):
+        """
+        Stop the child process, and remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Stop child process
+        self.supervisor._stop_child()
+
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _reload(self):
+        """
+        Start a reload for the change of module `mod`.
+
+        :return:
+            None.
+        """
+        # Set the flag like `_start_reload`
+        self.supervisor._is_reloading = True
+
+        # Set changed file paths
+        self.supervisor._reload_file_paths = set([self.mod_path])
+
+        # Reload
+        self.supervisor.reload()
+
+    def test_preflight_failure_keeps_child(self):
+        """
+        Test a changed module that does not compile keeps the child \
+        process, and a fixed module restarts it after calling hooks.
+        """
+        # Get child process
+        process = self.supervisor._process
+
+        # Break module `mod`
+        _write_file(self.mod_path, 'X = (\n')
+
+        # Reload
+        self._reload()
+
+        # The child process is kept, and hooks are not called
+        self.assertIs(self.supervisor._process, process)
+
+        self.assertIsNone(process.poll())
+
+        self.assertEqual(self.hook_calls, [])
+
+        # Next reload is allowed
+        self.assertFalse(self.supervisor._is_reloading)
+
+        # Fix module `mod`
+        _write_file(self.mod_path, 'X = 2\n')
+
+        # Reload
+        self._reload()
+
+        # The child process is restarted after calling hooks
+        self.assertIsNot(self.supervisor._process, process)
+
+        self.assertIsNotNone(process.poll())
+
+        self.assertEqual(len(self.hook_calls), 1)
+
+    def test_unsupported_option(self):
+        """
+        Test options that need the program's modules in the supervisor \
+        are rejected.
+        """
+        # Create supervisor with `preflight_import`
+        with self.assertRaises(ValueError):
+            Supervisor(['app.py'], preflight_import=True)
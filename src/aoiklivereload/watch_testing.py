@@ -0,0 +1,134 @@
+# coding: utf-8
+"""
+Helpers shared by tests of observers.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+
+class RecordingHandler(object):
+    """
+    Event handler that records dispatched file paths.
+    """
+
+    def __init__(self):
+        """
+        Constructor.
+
+        :return:
+            None.
+        """
+        # Dispatched file paths
+        self.paths = []
+
+    def dispatch_path(self, file_path):
+        """
+        Record dispatched file path.
+
+        :param file_path:
+            File path.
+
+        :return:
+            None.
+        """
+        # Record the file path
+        self.paths.append(file_path)
+
+
+def wait_until(func, timeout=5):
+    """
+    Wait until given function returns true.
+
+    :param func:
+        Function that takes no arguments.
+
+    :param timeout:
+        Timeout in seconds.
+
+    :return:
+        Whether the function returned true before timeout.
+    """
+    # Get end time
+    end_time = time.time() + timeout
+
+    # While not timed out
+    while time.time() < end_time:
+        # If the function returns true
+        if func():
+            # Return success
+            return True
+
+        # Sleep before next check
+        time.sleep(0.05)
+
+    # Return timed out
+    return False
+
+
+def write_file(file_path):
+    """
+    Write given file.
+
+    :param file_path:
+        File path.
+
+    :return:
+        None.
+    """
+    # Write the file
+    with open(file_path, 'w') as file_obj:
+        file_obj.write('X = 1\n')
+
+
+class WatchDirTestCase(unittest.TestCase):
+    """
+    Base test case that creates directories `a` and `a/b` in a temporary \
+    directory.
+    """
+
+    def setUp(self):
+        """
+        Create directories `a` and `a/b`.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get directory paths
+        self.dir_a = os.path.join(self.temp_dir, 'a')
+
+        self.dir_b = os.path.join(self.dir_a, 'b')
+
+        # Create directories
+        os.makedirs(self.dir_b)
+
+        # Get file path in `a/b`
+        self.file_path = os.path.join(self.dir_b, 'z.py')
+
+    def tearDown(self):
+        """
+        Remove the directories.
+
+        :return:
+            None.
+        """
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _touch(self):
+        """
+        Write the file in `a/b`.
+
+        :return:
+            None.
+        """
+        # Write the file
+        write_file(self.file_path)
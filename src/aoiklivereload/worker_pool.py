@@ -0,0 +1,493 @@
+# coding: utf-8
+"""
+Worker pool that runs the target program in several worker processes, \
+watches module files once for all of them, and restarts them in rolling \
+batches on module file changes.
+
+Usage in the master program:
+```
+pool = WorkerPool(['app.py'], worker_count=8, batch_size=2)
+
+pool.get_listening_socket('0.0.0.0', 8000)
+
+pool.run()
+```
+
+Usage in the worker program `app.py`:
+```
+reloader = LiveReloader()
+
+sock = reloader.get_listening_socket('0.0.0.0', 8000)
+
+reloader.mark_ready()
+```
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import logging
+import os
+import time
+
+# Local imports
+from .supervisor import Supervisor
+
+
+# Logger
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Worker(object):
+    """
+    Worker process's states.
+    """
+
+    def __init__(self, process, ready_fd):
+        """
+        Constructor.
+
+        :param process:
+            `subprocess.Popen` object.
+
+        :param ready_fd:
+            Ready pipe's read end file descriptor.
+
+        :return:
+            None.
+        """
+        # Worker process
+        self.process = process
+
+        # Ready pipe's read end file descriptor, or None if closed
+        self.ready_fd = ready_fd
+
+        # Whether the worker process's exit has been logged and handled
+        self.is_exit_logged = False
+
+    def close_ready_fd(self):
+        """
+        Close the ready pipe's read end if not closed.
+
+        :return:
+            None.
+        """
+        # If the ready pipe is not closed
+        if self.ready_fd is not None:
+            # Close the ready pipe
+            os.close(self.ready_fd)
+
+            # Clear the file descriptor
+            self.ready_fd = None
+
+
+class WorkerPool(Supervisor):
+    """
+    Worker pool that runs the target program in several worker processes, \
+    and restarts them in rolling batches on module file changes.
+
+    Module files are watched once, in the master process, for all workers.
+
+    On reload, for each batch of workers, new workers are started first, \
+    and old workers are stopped only after all new workers in the batch \
+    have called `mark_ready`. So at most one batch runs old and new code \
+    side by side, and the number of serving workers does not drop.
+
+    If a new worker exits or is not ready in `ready_timeout`, the new \
+    workers in the batch are stopped, the rolling restart is aborted, and \
+    remaining old workers keep running until next file change.
+
+    A worker that exits, e.g. crashes, is restarted right away.
+
+    Listening sockets registered in the master process, e.g. by \
+    `get_listening_socket`, are passed to all workers. Workers get them \
+    using `get_listening_socket` or `get_inherited_socket`, and should not \
+    start their own watchers.
+    """
+
+    def __init__(self, cmd_args, worker_count=4, batch_size=1, **kwargs):
+        """
+        Constructor.
+
+        :param cmd_args:
+            Worker program's arguments, e.g. `['app.py', 'arg']` or \
+            `['-m', 'module', 'arg']`.
+
+        :param worker_count:
+            Number of worker processes.
+
+        :param batch_size:
+            Number of workers restarted at a time.
+
+        :param kwargs:
+            Keyword arguments for `Supervisor`, e.g. `stop_timeout`, and \
+            for `LiveReloader`, e.g. `ready_timeout`.
+
+        :return:
+            None.
+        """
+        # If worker count is not valid
+        if worker_count < 1:
+            # Get error message
+            error_msg = 'Invalid worker count: {}.'.format(repr(worker_count))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # If batch size is not valid
+        if batch_size < 1:
+            # Get error message
+            error_msg = 'Invalid batch size: {}.'.format(repr(batch_size))
+
+            # Raise error
+            raise ValueError(error_msg)
+
+        # Initialize the supervisor
+        super(WorkerPool, self).__init__(cmd_args, **kwargs)
+
+        # Store worker count
+        self._worker_count = worker_count
+
+        # Store batch size
+        self._batch_size = batch_size
+
+        # List of workers, guarded by `_process_lock`
+        self._workers = []
+
+    def run(self):
+        """
+        Run the workers, and restart them on module file changes, until \
+        interrupted.
+
+        A worker that exits is restarted. If the restarted worker is not \
+        ready either, it is restarted on next file change.
+
+        :return:
+            0 if interrupted, 1 if the workers were not ready at start, or \
+            all workers have exited and can not be restarted.
+        """
+        # Start workers
+        workers = [self._start_worker() for _ in range(self._worker_count)]
+
+        # With the lock
+        with self._process_lock:
+            # Store workers
+            self._workers = workers
+
+        # Wait until the workers are ready
+        error_msg = self._wait_workers_ready(workers)
+
+        # If some worker is not ready
+        if error_msg is not None:
+            # Stop workers
+            self._stop_processes([x.process for x in workers])
+
+            # Log message
+            _LOGGER.error('%s Workers not started.', error_msg)
+
+            # Return error code
+            return 1
+
+        # Start watcher thread
+        self.start_watcher_thread()
+
+        # Exit code
+        exit_code = 0
+
+        try:
+            # Run in a loop until interrupted, or all workers have exited
+            while True:
+                # With the lock
+                with self._process_lock:
+                    # Get workers
+                    workers = list(self._workers)
+
+                # For each worker
+                for index, worker in enumerate(workers):
+                    # Get exit code, or None if running
+                    worker_exit_code = worker.process.poll()
+
+                    # If the worker is running, or its exit has been handled
+                    if worker_exit_code is None or worker.is_exit_logged:
+                        # Skip
+                        continue
+
+                    # Set the flag
+                    worker.is_exit_logged = True
+
+                    # Log message
+                    _LOGGER.warning(
+                        'Worker %s exited with code %s. Restarting it.',
+                        index,
+                        worker_exit_code,
+                    )
+
+                    # Restart the worker
+                    self._restart_worker(index, worker)
+
+                # With the lock
+                with self._process_lock:
+                    # Whether all workers have exited, and can not be
+                    # restarted
+                    is_all_exited = all(
+                        x.is_exit_logged and x.process.poll() is not None
+                        for x in self._workers
+                    )
+
+                # With the lock
+                with self._debounce_lock:
+                    # Whether a reload is starting new workers
+                    is_reloading = self._is_reloading
+
+                # If all workers have exited, and no reload is starting new
+                # workers
+                if is_all_exited and not is_reloading:
+                    # Log message
+                    _LOGGER.error('All workers have exited.')
+
+                    # Set exit code
+                    exit_code = 1
+
+                    # Stop running
+                    break
+
+                # Sleep before next check
+                time.sleep(1)
+
+        # If interrupted
+        except KeyboardInterrupt:
+            # With the lock
+            with self._process_lock:
+                # Stop workers
+                self._stop_processes([x.process for x in self._workers])
+
+        finally:
+            # Stop the watcher thread
+            self.stop_watcher()
+
+        # Return exit code
+        return exit_code
+
+    def _restart_worker(self, index, worker):
+        """
+        Restart given worker that has exited.
+
+        :param index:
+            Worker index.
+
+        :param worker:
+            `_Worker` object that has exited.
+
+        :return:
+            None.
+        """
+        # Start new worker
+        new_worker = self._start_worker()
+
+        # Wait until the new worker is ready
+        error_msg = self._wait_workers_ready([new_worker])
+
+        # If the new worker is not ready
+        if error_msg is not None:
+            # Stop the new worker
+            self._stop_processes([new_worker.process])
+
+            # Log message
+            _LOGGER.warning(
+                '%s Worker %s is restarted on next file change.',
+                error_msg,
+                index,
+            )
+
+            # Return
+            return
+
+        # With the lock
+        with self._process_lock:
+            # Whether the worker has not been replaced by a reload meanwhile
+            is_current = self._workers[index] is worker
+
+            # If the worker has not been replaced
+            if is_current:
+                # Replace the worker
+                self._workers[index] = new_worker
+
+        # If the worker has been replaced by a reload
+        if not is_current:
+            # Stop the new worker
+            self._stop_processes([new_worker.process])
+
+            # Return
+            return
+
+        # Log message
+        _LOGGER.info('Restarted worker %s.', index)
+
+    def reload(self):
+        """
+        Restart the workers in rolling batches.
+
+        This function overrides `Supervisor.reload`.
+
+        :return:
+            None.
+        """
+        try:
+            # If the pre-reload steps failed, e.g. a changed file does not
+            # compile in preflight, keep the workers running
+            if not self._prepare_reload():
+                # Return
+                return
+
+            # Call pre-reload hooks
+            self._run_pre_reload_hooks()
+
+            # With the lock
+            with self._process_lock:
+                # Get number of workers
+                worker_count = len(self._workers)
+
+            # For each batch's start index
+            for start_index in range(0, worker_count, self._batch_size):
+                # Get the batch's worker indexes
+                indexes = list(range(
+                    start_index,
+                    min(start_index + self._batch_size, worker_count),
+                ))
+
+                # Start new workers
+                new_workers = [self._start_worker() for _ in indexes]
+
+                # Wait until the new workers are ready
+                error_msg = self._wait_workers_ready(new_workers)
+
+                # If some new worker is not ready
+                if error_msg is not None:
+                    # Stop the new workers
+                    self._stop_processes([x.process for x in new_workers])
+
+                    # Log message
+                    _LOGGER.warning(
+                        '%s Rolling restart aborted.'
+                        ' Waiting for file changes.',
+                        error_msg,
+                    )
+
+                    # Return
+                    return
+
+                # With the lock
+                with self._process_lock:
+                    # Get old workers
+                    old_workers = [self._workers[x] for x in indexes]
+
+                    # For each worker index and new worker
+                    for index, new_worker in zip(indexes, new_workers):
+                        # Replace the old worker
+                        self._workers[index] = new_worker
+
+                # Stop the old workers
+                self._stop_processes([x.process for x in old_workers])
+
+                # Log message
+                _LOGGER.info(
+                    'Restarted workers %s-%s of %s.',
+                    indexes[0],
+                    indexes[-1],
+                    worker_count,
+                )
+
+        finally:
+            # With the lock
+            with self._debounce_lock:
+                # Allow next reload
+                self._is_reloading = False
+
+    def _start_worker(self):
+        """
+        Start a worker process.
+
+        :return:
+            `_Worker` object.
+        """
+        # Get env dict with listening socket infos
+        env_copy = self._get_reload_env()
+
+        # If this is the first start
+        if not self._reload_times:
+            # Remove reload times so that the worker does not report reload
+            # stats
+            env_copy.pop(self.RELOAD_TIMES_ENV_KEY, None)
+
+        # Create pipe the worker writes to in `mark_ready`
+        read_fd, write_fd = os.pipe()
+
+        # Put pipe file descriptor in env dict
+        env_copy[self.READY_FD_ENV_KEY] = str(write_fd)
+
+        try:
+            # Start worker process
+            process = self._spawn_process(env_copy, pass_fds=[write_fd])
+
+        # If have error
+        except BaseException:
+            # Close the pipe's read end
+            os.close(read_fd)
+
+            # Raise the error
+            raise
+
+        finally:
+            # Close the pipe's write end in this process, so that the read
+            # end gets EOF if the worker exits
+            os.close(write_fd)
+
+        # Return worker
+        return _Worker(process, read_fd)
+
+    def _wait_workers_ready(self, workers):
+        """
+        Wait until given workers call `mark_ready`.
+
+        Ready pipes of the workers are closed.
+
+        :param workers:
+            List of `_Worker` objects, started at the same time.
+
+        :return:
+            None if all workers are ready, otherwise error message.
+        """
+        # Get start time
+        start_time = time.time()
+
+        try:
+            # For each worker
+            for worker in workers:
+                # Wait until the worker is ready.
+                #
+                # Workers are started at the same time, so waiting for them
+                # one by one takes about as long as the slowest one.
+                #
+                error_msg = self._wait_process_ready(
+                    worker.process, worker.ready_fd
+                )
+
+                # If the worker is not ready
+                if error_msg is not None:
+                    # Return error message
+                    return error_msg
+
+        finally:
+            # For each worker
+            for worker in workers:
+                # Close the ready pipe
+                worker.close_ready_fd()
+
+        # Log message
+        _LOGGER.debug(
+            '%s workers ready in %.3f seconds.',
+            len(workers),
+            time.time() - start_time,
+        )
+
+        # Return success
+        return None
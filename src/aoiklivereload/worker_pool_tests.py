@@ -0,0 +1,249 @@
+# coding: utf-8
+"""
+Tests of `worker_pool` module.
+"""
+from __future__ import absolute_import
+
+# Standard imports
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+# Local imports
+from .watch_testing import wait_until
+from .watch_testing import write_file
+from .worker_pool import WorkerPool
+
+
+# Worker program.
+#
+# Exits before ready if file `die` or `broken` exists. Exits with code 1
+# after ready if file `crash` exists, removing the file so that only one
+# worker crashes. Otherwise runs until file `die` exists.
+#
+_WORKER_PROGRAM = """
+import os
+import sys
+import time
+
+sys.path.insert(0, {src_dir!r})
+
+from aoiklivereload import LiveReloader
+
+die_path = os.path.join({temp_dir!r}, 'die')
+
+crash_path = os.path.join({temp_dir!r}, 'crash')
+
+broken_path = os.path.join({temp_dir!r}, 'broken')
+
+if os.path.exists(die_path) or os.path.exists(broken_path):
+    sys.exit(2)
+
+LiveReloader().mark_ready()
+
+try:
+    os.remove(crash_path)
+    sys.exit(1)
+except OSError:
+    pass
+
+while not os.path.exists(die_path):
+    time.sleep(0.05)
+"""
+
+
+@unittest.skipIf(sys.platform == 'win32', 'Requires Unix.')
+class WorkerPoolTest(unittest.TestCase):
+    """
+    Tests of `WorkerPool`.
+    """
+
+    def setUp(self):
+        """
+        Write the worker program, and create a pool of two workers.
+
+        :return:
+            None.
+        """
+        # Create temporary directory
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Get program file path
+        program_path = os.path.join(self.temp_dir, 'app.py')
+
+        # Write the program
+        with open(program_path, 'w') as file_obj:
+            file_obj.write(_WORKER_PROGRAM.format(
+                src_dir=os.path.dirname(os.path.dirname(
+                    os.path.abspath(__file__)
+                )),
+                temp_dir=self.temp_dir,
+            ))
+
+        # Create pool
+        self.pool = WorkerPool(
+            [program_path], worker_count=2, ready_timeout=10
+        )
+
+    def tearDown(self):
+        """
+        Stop the workers, and remove the temporary directory.
+
+        :return:
+            None.
+        """
+        # Stop the workers
+        self.pool._stop_processes([x.process for x in self.pool._workers])
+
+        # Remove temporary directory
+        shutil.rmtree(self.temp_dir)
+
+    def _create_file(self, name):
+        """
+        Create file in the temporary directory.
+
+        :param name:
+            File name.
+
+        :return:
+            None.
+        """
+        # Create the file
+        write_file(os.path.join(self.temp_dir, name))
+
+    def test_not_ready_at_start(self):
+        """
+        Test `run` returns error code if the workers are not ready.
+        """
+        # Make workers exit before ready
+        self._create_file('die')
+
+        # The pool fails to start
+        self.assertEqual(self.pool.run(), 1)
+
+    def test_crashed_worker_restarted(self):
+        """
+        Test a crashed worker is restarted, and `run` returns error code \
+        when all workers have exited and can not be restarted.
+        """
+        # Make one worker crash after ready
+        self._create_file('crash')
+
+        # Exit codes of `run`
+        exit_codes = []
+
+        # Create thread that runs the pool
+        thread = threading.Thread(
+            target=lambda: exit_codes.append(self.pool.run())
+        )
+
+        # Start the thread
+        thread.start()
+
+        try:
+            # Wait until the workers are started
+            self.assertTrue(
+                wait_until(lambda: len(self.pool._workers) == 2)
+            )
+
+            # Get the started workers
+            old_workers = list(self.pool._workers)
+
+            # The crashed worker is replaced, and both workers run
+            self.assertTrue(wait_until(
+                lambda: self.pool._workers != old_workers
+                and all(
+                    x.process.poll() is None for x in self.pool._workers
+                ),
+                timeout=20,
+            ))
+
+        finally:
+            # Make all workers exit, and fail restarts
+            self._create_file('die')
+
+            # Wait for the thread
+            thread.join(30)
+
+        # The pool stops with error code
+        self.assertEqual(exit_codes, [1])
+
+    def _start_workers(self):
+        """
+        Start the workers without running the pool's loop.
+
+        :return:
+            List of `_Worker` objects.
+        """
+        # Start workers
+        workers = [self.pool._start_worker() for _ in range(2)]
+
+        # Store workers
+        self.pool._workers = list(workers)
+
+        # The workers are ready
+        self.assertIsNone(self.pool._wait_workers_ready(workers))
+
+        # Return workers
+        return workers
+
+    def _reload(self):
+        """
+        Start a rolling restart.
+
+        :return:
+            None.
+        """
+        # Set the flag like `_start_reload`
+        self.pool._is_reloading = True
+
+        # Reload
+        self.pool.reload()
+
+        # Next reload is allowed
+        self.assertFalse(self.pool._is_reloading)
+
+    def test_rolling_restart(self):
+        """
+        Test all workers are replaced by ready new workers.
+        """
+        # Start workers
+        old_workers = self._start_workers()
+
+        # Restart the workers
+        self._reload()
+
+        # For each old worker and its new worker
+        for old_worker, new_worker in zip(old_workers, self.pool._workers):
+            # The worker is replaced by a running new worker
+            self.assertIsNot(new_worker, old_worker)
+
+            self.assertIsNone(new_worker.process.poll())
+
+            # The old worker has been stopped
+            self.assertIsNotNone(old_worker.process.poll())
+
+    def test_batch_failure(self):
+        """
+        Test a batch whose new workers are not ready aborts the rolling \
+        restart, and old workers keep running.
+        """
+        # Start workers
+        old_workers = self._start_workers()
+
+        # Make new workers exit before ready
+        self._create_file('broken')
+
+        # Restart the workers
+        self._reload()
+
+        # The old workers are kept and running
+        self.assertEqual(self.pool._workers, old_workers)
+
+        # For each old worker
+        for old_worker in old_workers:
+            # The old worker is running
+            self.assertIsNone(old_worker.process.poll())